@@ -29,12 +29,33 @@
 # Authors: Robert Scheffel
 
 import argparse
-import ConfigParser
+import json
 import logging
 import logging.handlers
 import os
 import shutil
+import sys
+import time
+
+try:
+    import ConfigParser as configparser
+except ImportError:
+    import configparser
+
+from modelparsing import profiling
+from modelparsing.batch import OUTPUT
+from modelparsing.batch import Batch
+from modelparsing.batch import configurations
+from modelparsing.daemon import Client
+from modelparsing.daemon import Daemon
+from modelparsing.exceptions import ConsistencyError
+from modelparsing.exceptions import LockError
+from modelparsing.exceptions import OpcodeError
+from modelparsing.exceptions import ParseError
+from modelparsing.exceptions import StageError
 from modelparsing.parser import Parser
+from modelparsing.parser import discover
+from modelparsing.watcher import Watcher
 
 # get root logger
 root_logger = logging.getLogger()
@@ -71,7 +92,7 @@ class ModelParser():
     '''
 
     def __init__(self):
-        config = ConfigParser.ConfigParser()
+        config = configparser.ConfigParser()
         conffile = os.path.join(
             os.path.dirname(os.path.realpath(__file__)), '../config.ini')
         config.read(conffile)
@@ -82,7 +103,24 @@ class ModelParser():
         assert(self.modelpath)
         assert(self.tcpath)
 
+    def sources(self):
+        '''
+        Return the model files and the custom register files. Together
+        with their includes, the generated files depend on those.
+        '''
+        if os.path.isdir(self.modelpath):
+            models, regfiles = discover(self.modelpath)
+            return models + regfiles
+        return [self.modelpath]
+
     def parse(self):
+        # a running daemon has the models parsed already
+        response = Client().build(self.tcpath, self.modelpath)
+        if response is not None:
+            logger.info('Daemon built in {:.0f} ms'.format(response['ms']))
+            return
+        logger.info('No daemon running, parse in process')
+
         modelparser = Parser(self.tcpath, self.modelpath)
 
         buildpath = os.path.join(
@@ -92,8 +130,7 @@ class ModelParser():
             os.makedirs(buildpath)
 
         modelparser.parse_models()
-        modelparser.extend_compiler()
-        modelparser.extend_gem5()
+        modelparser.extend()
 
 
 def main():
@@ -112,6 +149,51 @@ def main():
                         action='store_true',
                         help='If set, the toolchain and Gem5 will be ' +
                         'rebuild.')
+    parser.add_argument('--batch',
+                        nargs='+',
+                        metavar='PATH',
+                        help='Build several configurations in one ' +
+                        'process. A configuration is a model directory, ' +
+                        'a model file or a config file. The generated ' +
+                        'files of each are written to its own directory ' +
+                        'in the output directory.')
+    parser.add_argument('--batch-jobs',
+                        type=int,
+                        default=1,
+                        help='Number of processes used to build the ' +
+                        'configurations of a batch.')
+    parser.add_argument('--build-dir',
+                        default=os.path.join(
+                            os.path.dirname(os.path.realpath(__file__)),
+                            '../build'),
+                        help='Directory of the generated gem5 files and ' +
+                        'the build state. Jobs, that run at the same ' +
+                        'time, can use their own.')
+    parser.add_argument('--daemon',
+                        choices=['start', 'status', 'stop'],
+                        help='Start the daemon, that keeps the models ' +
+                        'parsed for the SConscript, print its status or ' +
+                        'stop it.')
+    parser.add_argument('--fast',
+                        action='store_true',
+                        help='If set, models are parsed by a pure Python ' +
+                        'front-end. libclang is only used for models it ' +
+                        'does not understand.')
+    parser.add_argument('--force',
+                        action='store_true',
+                        help='If set, all files are generated again, ' +
+                        'even if their inputs did not change.')
+    parser.add_argument('-j',
+                        '--jobs',
+                        type=int,
+                        default=1,
+                        help='Number of processes used to parse models.')
+    parser.add_argument('--lock-timeout',
+                        type=float,
+                        help='Seconds to wait for another job, that ' +
+                        'generates into the same toolchain or build ' +
+                        'directory. By default, it is waited until the ' +
+                        'other job finished.')
     parser.add_argument('-m',
                         '--modelpath',
                         type=str,
@@ -120,22 +202,77 @@ def main():
                             '../extensions'),
                         help='Path to model definition. ' +
                         'Can be a folder or a single file.')
+    parser.add_argument('-o',
+                        '--output',
+                        default=OUTPUT,
+                        help='Output directory of a batch.')
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help='If set, all models are parsed again instead ' +
+                        'of loading unchanged ones from the cache.')
+    parser.add_argument('--no-pch',
+                        action='store_true',
+                        help='If set, no precompiled header is used for ' +
+                        'the includes shared by all models.')
+    parser.add_argument('--no-store',
+                        action='store_true',
+                        help='If set, generated files are neither ' +
+                        'activated from nor kept in the store of ' +
+                        'previously generated files.')
+    parser.add_argument('--plan',
+                        action='store_true',
+                        help='If set, the files, that would change, are ' +
+                        'printed instead of writing them.')
+    parser.add_argument('--profile',
+                        action='store_true',
+                        help='If set, the stages are timed. A summary is ' +
+                        'printed and a Chrome trace is written to ' +
+                        'build/profile/trace.json.')
+    parser.add_argument('--cprofile',
+                        action='store_true',
+                        help='Like --profile, but every stage is ' +
+                        'additionally profiled with cProfile.')
     parser.add_argument('-r',
                         '--restore',
                         action='store_true',
                         help='If set, the toolchain will be restored ' +
                         'to its default.')
+    parser.add_argument('--strict',
+                        action='store_true',
+                        help='If set, models are validated by compiling ' +
+                        'them with g++ instead of using the libclang ' +
+                        'diagnostics.')
     parser.add_argument('-t',
                         '--toolchain',
                         default=os.path.join(
                             os.path.expanduser("~"),
                             'projects/riscv-gnu-toolchain'))
+    parser.add_argument('--timing',
+                        choices=['declared', 'estimated'],
+                        default='declared',
+                        help='Cycle count used for the timing of the ' +
+                        'instructions in gem5. Either the declared one ' +
+                        'or the one estimated from the definition.')
+    parser.add_argument('--timeline',
+                        action='store_true',
+                        help='If set, the start and end of the stages, ' +
+                        'that extend the compiler and gem5 concurrently, ' +
+                        'are printed.')
+    parser.add_argument('--timing-report',
+                        action='store_true',
+                        help='If set, the declared and the estimated ' +
+                        'cycle count of every instruction is printed.')
     parser.add_argument('--tc-only',
                         action='store_true',
                         help='If set, only the toolchain is extended.')
     parser.add_argument('--gem5-only',
                         action='store_true',
                         help='If set, only gem5 is extended')
+    parser.add_argument('--watch',
+                        action='store_true',
+                        help='If set, the models are watched and the ' +
+                        'outdated files are generated again, whenever ' +
+                        'a model changes.')
     parser.add_argument('-v',
                         '--verbose',
                         default=0,
@@ -145,14 +282,39 @@ def main():
     args = parser.parse_args()
     set_log_level_from_verbose(args)
 
-    logger.info('Start parsing models')
-    modelparser = Parser(args.toolchain, args.modelpath)
+    if args.daemon:
+        daemon(args)
+        return
 
-    buildpath = os.path.join(
-        os.path.dirname(os.path.realpath(__file__)), '../build')
+    buildpath = os.path.abspath(args.build_dir)
+    profilepath = os.path.join(buildpath, 'profile')
+
+    if args.profile or args.cprofile:
+        profiling.enable(profilepath if args.cprofile else None)
+
+    if args.batch:
+        failed = batch(args)
+        finish(profilepath)
+        if failed:
+            sys.exit(1)
+        return
+
+    logger.info('Start parsing models')
+    modelparser = Parser(args.toolchain, args.modelpath,
+                         cache=not args.no_cache,
+                         jobs=args.jobs,
+                         strict=args.strict,
+                         pch=not args.no_pch,
+                         fast=args.fast,
+                         timing=args.timing,
+                         force=args.force,
+                         plan=args.plan,
+                         store=not args.no_store,
+                         buildpath=buildpath,
+                         timeout=args.lock_timeout)
 
     if args.restore:
-        if os.path.exists(buildpath):
+        if os.path.exists(buildpath) and not args.plan:
             try:
                 logger.info('Remove build directory')
                 shutil.rmtree(buildpath)
@@ -160,21 +322,134 @@ def main():
                 logger.error("Error: %s - %s" % (e.filename, e.strerror))
         modelparser.restore()
     else:
-        if not os.path.exists(buildpath):
+        if not os.path.exists(buildpath) and not args.plan:
             os.makedirs(buildpath)
 
         modelparser.parse_models()
 
-        if not args.gem5_only:
-            # extend compiler with models
-            modelparser.extend_compiler()
-        if not args.tc_only:
-            # extend gem5
-            modelparser.extend_gem5()
+        if args.timing_report:
+            print(modelparser.report_timing())
+
+        # extend compiler and gem5 with models
+        orchestrator = modelparser.extend(compiler=not args.gem5_only,
+                                          gem5=not args.tc_only)
+        if args.timeline:
+            print(orchestrator.timeline())
+
+        if args.watch:
+            watch(modelparser, args)
+
+    if args.plan:
+        for action, path in modelparser.changes():
+            print('{} {}'.format(action, path))
+
+    finish(profilepath)
 
     # modelparser.remove_models()
 
 
+def finish(profilepath):
+    '''
+    Write the trace and print the summary, if profiling is enabled.
+    '''
+    profiler = profiling.disable()
+    if profiler is not None:
+        profiler.write_trace(os.path.join(profilepath, 'trace.json'))
+        print(profiler.summary())
+
+
+def batch(args):
+    '''
+    Build the configurations of a batch. Returns the number of
+    configurations, that failed.
+    '''
+    start = time.time()
+    modelbatch = Batch(configurations(args.batch), args.output,
+                       cache=not args.no_cache,
+                       jobs=args.jobs,
+                       strict=args.strict,
+                       pch=not args.no_pch,
+                       fast=args.fast,
+                       timing=args.timing,
+                       plan=args.plan)
+    results = modelbatch.run(args.batch_jobs)
+
+    failed = 0
+    for result in results:
+        if result['error'] is not None:
+            failed += 1
+            print('{:<24} failed: {}'.format(result['name'], result['error']))
+            continue
+        print('{:<24} {:>3} models {:>3} file(s) {:>8.0f} ms'.format(
+            result['name'], result['models'], len(result['changes']),
+            result['ms']))
+        if args.plan:
+            for action, path in result['changes']:
+                print('  {} {}'.format(action, path))
+    print('{} configuration(s) built in {:.0f} ms, {} failed'.format(
+        len(results), (time.time() - start) * 1000, failed))
+    return failed
+
+
+def daemon(args):
+    '''
+    Run the daemon in the foreground or send it a command.
+    '''
+    if args.daemon == 'start':
+        modeldaemon = Daemon()
+        modeldaemon.start()
+        print('Daemon listening on {}'.format(modeldaemon.path))
+        try:
+            modeldaemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    client = Client()
+    if args.daemon == 'status':
+        response = client.status()
+    else:
+        response = client.stop()
+    if response is None:
+        print('No daemon running on {}'.format(client.path))
+    elif args.daemon == 'status':
+        print(json.dumps(response, indent=1, sort_keys=True))
+
+
+def watch(modelparser, args):
+    '''
+    Generate the outdated files again, whenever the models change.
+    Runs until interrupted.
+    '''
+    watcher = Watcher(args.modelpath)
+    print('Watching {} ({}), press Ctrl-C to stop'.format(
+        args.modelpath, watcher.backend))
+    try:
+        while True:
+            changed = watcher.wait()
+            start = time.time()
+            try:
+                modelparser.reset()
+                modelparser.parse_models()
+                modelparser.extend(compiler=not args.gem5_only,
+                                   gem5=not args.tc_only)
+            except (ConsistencyError, LockError, OpcodeError, ParseError,
+                    StageError, ValueError) as e:
+                # keep watching, the model is probably not finished yet
+                logger.error('Error: {}'.format(e))
+                continue
+            changes = modelparser.changes()
+            print('{} changed, {} file(s) generated in {:.0f} ms'.format(
+                ', '.join(os.path.basename(path) for path in changed),
+                len(changes), (time.time() - start) * 1000))
+            for action, path in changes:
+                logger.info('{} {}'.format(action, path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
 def set_log_level_from_verbose(args):
     if not args.verbose:
         console_handler.setLevel('ERROR')
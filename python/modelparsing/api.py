@@ -0,0 +1,219 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import logging
+import os
+
+from .compiler import Compiler
+from .depgraph import DependencyGraph
+from .export import manifest
+from .extensions import Extensions
+from .gem5 import Gem5
+from .locking import locked
+from .model import Model
+from .model import ModelFile
+from .registers import Registers
+from .writer import FileWriter
+
+logger = logging.getLogger(__name__)
+
+# models given as source are parsed, as if they were located here,
+# the directory does not have to exist
+ROOT = '/modelparsing'
+
+
+def parse(source, name='model/model.cc', headers=None, fast=False,
+          strict=False, timing='declared'):
+    '''
+    Parse the source of a model file. Name and the names of the headers,
+    that the source includes, are relative to ROOT. Like in the model
+    directory, a model is in a subdirectory by default, so it includes
+    ../registers.hh. Returns a Model for each instruction of the file.
+    '''
+    headers = dict((os.path.join(ROOT, path), content)
+                   for path, content in (headers or {}).items())
+    modelfile = ModelFile(os.path.join(ROOT, name), strict=strict,
+                          fast=fast, source=source, headers=headers)
+    return modelfile.models(timing)
+
+
+def spec(name, form, opc, funct3, cycles, definition, funct7=0xff,
+         timing='declared'):
+    '''
+    Return the Model of an instruction, that is given by its encoding,
+    cycle count and definition instead of a model file. The operands of
+    the definition are Rd, Rs1 and Rs2 or imm, depending on the form.
+    '''
+    definition = definition.strip()
+    if not definition.startswith('{'):
+        definition = '{\n    ' + definition + '\n}'
+    entry = {'name': name, 'form': form, 'opc': opc, 'funct3': funct3,
+             'funct7': funct7, 'cycles': cycles, 'dfn': definition,
+             'rettype': 'void', 'check_rd': True, 'check_rs1': True,
+             'check_op2': form in ('R', 'I')}
+    return Model(entry=entry, timing=timing)
+
+
+def build(models, registers=None, lock=None, timing='declared'):
+    '''
+    Generate the extensions of the given models in memory. A model is
+    given as Model, as source of a model file or as dictionary with the
+    arguments of spec. The custom registers are given as dictionary of
+    name and address or as content of a register file, which the sources
+    can include as registers.hh. If an EncodingLock is given, the
+    instructions are generated in its order.
+    '''
+    regs = Registers()
+    headers = {}
+    if isinstance(registers, dict):
+        regs.regmap.update(registers)
+    elif registers is not None:
+        regs.parse(registers)
+        headers['registers.hh'] = registers
+
+    parsed = []
+    for model in models:
+        if isinstance(model, Model):
+            parsed.append(model)
+        elif isinstance(model, dict):
+            parsed.append(spec(timing=timing, **model))
+        else:
+            parsed.extend(parse(model, headers=headers, timing=timing))
+    return Build(parsed, regs, lock)
+
+
+def render(exts, regs):
+    '''
+    Return the files generated for the extensions and the custom
+    registers by name. The opcode table entries are not a file of their
+    own, they are patched into riscv-opc.c.
+    '''
+    compiler = Compiler(exts, regs, None)
+    gem5 = Gem5(exts, regs)
+    return {
+        'riscv-custom-opc.h': exts.cust_header,
+        'riscvintr.h': compiler.render_intrinsics(),
+        'custom.isa': gem5.render_decoder(),
+        'minor_custom_timings.py': gem5.render_timings(),
+        'regsintr.hh': gem5.render_regsintr(),
+    }
+
+
+class Build:
+    '''
+    The generated extensions of a set of models, held in memory.
+    '''
+
+    def __init__(self, models, regs, lock=None):
+        # the instructions to access the custom registers
+        self._models = models + [Model(read=True), Model(write=True)]
+        self._regs = regs
+        self._exts = Extensions(self._models, lock)
+
+        self._opcode_entries = Compiler(self._exts, self._regs,
+                                        None).render_entries()
+        self._files = render(self._exts, self._regs)
+
+    def files(self):
+        '''
+        Return the generated files by name.
+        '''
+        return dict(self._files)
+
+    def install(self, tcpath=None, gem5=False, writer=None, buildpath=None,
+                timeout=None):
+        '''
+        Write the extensions into the toolchain at tcpath and, if gem5
+        is set, into gem5, generating into buildpath. The toolchain is
+        restored before, so no instructions of an earlier install are
+        left. Like the Parser, the toolchain and the build directory are
+        locked meanwhile, and the artifacts the Parser recorded in the
+        build directory are generated again by its next run. Returns the
+        applied changes.
+        '''
+        if buildpath is None:
+            buildpath = os.path.join(
+                os.path.dirname(os.path.realpath(__file__)), '../../build')
+        if writer is None:
+            writer = FileWriter(os.path.join(buildpath, 'outputs.json'),
+                                defer=True)
+        with locked([tcpath, buildpath], timeout):
+            if tcpath is not None:
+                compiler = Compiler(self._exts, self._regs, tcpath, writer)
+                compiler.restore()
+                compiler.extend_compiler()
+            if gem5:
+                Gem5(self._exts, self._regs, writer,
+                     buildpath).extend_gem5()
+            writer.flush()
+            DependencyGraph(os.path.join(buildpath, 'deps.json')).invalidate()
+        return writer.applied
+
+    @property
+    def custom_header(self):
+        return self._files['riscv-custom-opc.h']
+
+    @property
+    def decoder(self):
+        return self._files['custom.isa']
+
+    @property
+    def extensions(self):
+        return self._exts
+
+    @property
+    def instructions(self):
+        return self._exts.instructions
+
+    @property
+    def intrinsics(self):
+        return self._files['riscvintr.h']
+
+    @property
+    def manifest(self):
+        return manifest(self._exts, self._regs)
+
+    @property
+    def models(self):
+        return self._exts.models
+
+    @property
+    def opcode_entries(self):
+        return self._opcode_entries
+
+    @property
+    def regs(self):
+        return self._regs
+
+    @property
+    def regsintr(self):
+        return self._files['regsintr.hh']
+
+    @property
+    def timings(self):
+        return self._files['minor_custom_timings.py']
@@ -0,0 +1,224 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import logging
+import multiprocessing
+import os
+import time
+
+try:
+    import ConfigParser as configparser
+except ImportError:
+    import configparser
+
+from . import profiling
+from .api import render
+from .cache import ModelCache
+from .parser import Parser
+
+logger = logging.getLogger(__name__)
+
+# default directory, the configurations are emitted into
+OUTPUT = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                      '../../build/batch')
+
+# batch of the parent process in a worker
+_current = None
+
+
+def _init(batch):
+    '''
+    Set up a worker process. The batch is passed to the initializer, so
+    workers get it, however they are started: forked or spawned.
+    '''
+    global _current
+    _current = batch
+
+
+def _build(configuration):
+    '''
+    Build a configuration in a worker process.
+    '''
+    return _current.build(configuration)
+
+
+class Configuration:
+    '''
+    A set of models, that is built into its own output tree.
+    '''
+
+    def __init__(self, name, modelpath):
+        self.name = name
+        self.modelpath = modelpath
+
+    def __repr__(self):
+        return 'Configuration({!r}, {!r})'.format(self.name, self.modelpath)
+
+
+def configurations(paths):
+    '''
+    Return the configurations of the given paths. A path is a model
+    directory, a single model file or a config file like config.ini.
+    The DEFAULT section of a config file is a configuration, unless
+    the file has other sections. Then each of them is one, named after
+    the section. Relative model paths are relative to the config file,
+    the toolchain is ignored.
+    Configurations are named after their path, if two have the same
+    name, a number is appended.
+    '''
+    configs = []
+    for path in paths:
+        if not path.endswith('.ini'):
+            name = os.path.splitext(os.path.basename(
+                os.path.normpath(path)))[0]
+            configs.append(Configuration(name, path))
+            continue
+
+        config = configparser.ConfigParser()
+        if not config.read(path):
+            raise ValueError(path, 'Config file could not be read.')
+        dirname = os.path.dirname(os.path.abspath(path))
+        sections = config.sections() or ['DEFAULT']
+        for section in sections:
+            name = section
+            if section == 'DEFAULT':
+                name = os.path.splitext(os.path.basename(path))[0]
+            modelpath = os.path.join(dirname, os.path.expanduser(
+                config.get(section, 'MODELPATH')))
+            configs.append(Configuration(name, modelpath))
+
+    names = set()
+    for config in configs:
+        name, count = config.name, 1
+        while config.name in names:
+            count += 1
+            config.name = '{}-{}'.format(name, count)
+        names.add(config.name)
+    return configs
+
+
+class Batch:
+    '''
+    Builds several configurations in one process, so libclang is only
+    loaded once and the model cache, the parsed models, the encoded
+    opcodes and the compiled templates are shared by all of them.
+
+    The generated files of a configuration are emitted into
+    output/<name>, together with its build state. The toolchain and
+    gem5 are not extended. As for a single configuration, the encoding
+    lock is kept next to the models.
+    '''
+
+    def __init__(self, configs, output=OUTPUT, jobs=1, cache=True,
+                 strict=False, pch=True, fast=False, timing='declared',
+                 plan=False):
+        self._configs = configs
+        self._output = os.path.abspath(output)
+        self._cache = None
+        if cache:
+            self._cache = ModelCache(os.path.join(self._output, 'cache'),
+                                     readonly=plan)
+        self._options = {'jobs': jobs, 'strict': strict, 'pch': pch,
+                         'fast': fast, 'timing': timing, 'plan': plan}
+        # models of all parsed files, shared by the configurations
+        self._parsed = {}
+
+    def outpath(self, config):
+        '''
+        Output tree of a configuration.
+        '''
+        return os.path.join(self._output, config.name)
+
+    @profiling.profiled('build configuration')
+    def build(self, config):
+        '''
+        Parse the models of a configuration and emit its generated files.
+        Returns a dictionary with the name, the number of models, the
+        changes, the duration in ms and, if the build failed, the error.
+        Errors are returned instead of raised, so one configuration does
+        not stop the others.
+        '''
+        start = time.time()
+        result = {'name': config.name, 'models': 0, 'changes': [],
+                  'error': None}
+        try:
+            parser = Parser(None, config.modelpath, cache=self._cache,
+                            buildpath=self.outpath(config),
+                            parsed=self._parsed, **self._options)
+            parser.parse_models()
+            files = render(parser.extensions, parser.regs)
+            for name, content in sorted(files.items()):
+                parser.writer.write(
+                    os.path.join(self.outpath(config), name), content)
+            if parser.writer.plan:
+                result['changes'] = parser.writer.changes()
+            else:
+                parser.writer.flush()
+                result['changes'] = parser.writer.applied
+            # without the instructions, that access the custom registers
+            result['models'] = len(parser.models) - 2
+        except Exception as e:
+            logger.error('{}: {}'.format(config.name, e))
+            result['error'] = str(e) or repr(e)
+        result['ms'] = (time.time() - start) * 1000
+        return result
+
+    def run(self, processes=1):
+        '''
+        Build all configurations and return their results in order.
+        With more than one process, the configurations are built by a
+        pool of processes. The first configuration is built by this
+        process, so forked workers start with libclang loaded and the
+        templates compiled. Workers parse their models in a single
+        process.
+        '''
+        if processes <= 1 or len(self._configs) <= 2:
+            return [self.build(config) for config in self._configs]
+
+        results = [self.build(self._configs[0])]
+        self._options['jobs'] = 1
+        pool = multiprocessing.Pool(
+            min(processes, len(self._configs) - 1), _init, (self,))
+        try:
+            results.extend(pool.map(_build, self._configs[1:]))
+        finally:
+            pool.close()
+            pool.join()
+        return results
+
+    @property
+    def configurations(self):
+        return self._configs
+
+    @property
+    def output(self):
+        return self._output
+
+    @property
+    def parsed(self):
+        return self._parsed
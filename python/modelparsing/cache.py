@@ -0,0 +1,151 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import hashlib
+import logging
+import os
+import re
+import sys
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+logger = logging.getLogger(__name__)
+
+# bump, whenever the layout of a cache entry changes
+CACHE_VERSION = 4
+
+# local include directive
+INCLUDE = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.M)
+
+
+def includes(file):
+    '''
+    Return the file and all local headers it includes,
+    directly or transitively. System headers (<...>) are not followed.
+    '''
+    files = []
+    pending = [os.path.abspath(file)]
+    while pending:
+        current = pending.pop(0)
+        if current in files or not os.path.isfile(current):
+            continue
+        files.append(current)
+
+        with open(current, 'r') as fh:
+            content = fh.read()
+
+        for inc in INCLUDE.findall(content):
+            pending.append(os.path.normpath(
+                os.path.join(os.path.dirname(current), inc)))
+    return files
+
+
+class ModelCache:
+    '''
+    Content addressed on-disk cache for the information, that is
+    extracted from a model. An entry is keyed by the content of the
+    model file and all of its (transitive) local includes, together with
+    a salt that describes the tools and flags used for parsing.
+    A readonly cache, e.g. in plan mode, loads entries, but does not
+    store them.
+    '''
+
+    def __init__(self, cachedir, readonly=False):
+        self._cachedir = os.path.abspath(cachedir)
+        self._readonly = readonly
+
+    def includes(self, file):
+        '''
+        Return the model file and all local headers it includes.
+        System headers are covered by the salt instead.
+        '''
+        return includes(file)
+
+    def key(self, file, *salt):
+        '''
+        Compute the key of a model file.
+        '''
+        sha = hashlib.sha1()
+        # the pickles of Python 2 and 3 are not interchangeable
+        sha.update('{} {}'.format(
+            CACHE_VERSION, sys.version_info[0]).encode('utf-8'))
+        for entry in salt:
+            sha.update(b'\0' + str(entry).encode('utf-8'))
+        for inc in self.includes(file):
+            with open(inc, 'rb') as fh:
+                sha.update(b'\0' + fh.read())
+        return sha.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self._cachedir, key + '.pickle')
+
+    def load(self, key):
+        '''
+        Return the cached entry for key or None, if there is none.
+        '''
+        try:
+            with open(self.path(key), 'rb') as fh:
+                entry = pickle.load(fh)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        logger.debug('Cache hit {}'.format(key))
+        return entry
+
+    def store(self, key, entry):
+        '''
+        Store an entry. The file is written to a temporary location first
+        and renamed afterwards, so readers never see partial entries.
+        '''
+        if self._readonly:
+            return
+
+        if not os.path.exists(self._cachedir):
+            try:
+                os.makedirs(self._cachedir)
+            except OSError:
+                # created concurrently
+                pass
+
+        fd, tmp = tempfile.mkstemp(dir=self._cachedir)
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(entry, fh, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, self.path(key))
+        logger.debug('Cache store {}'.format(key))
+
+    @property
+    def cachedir(self):
+        return self._cachedir
+
+    @property
+    def readonly(self):
+        return self._readonly
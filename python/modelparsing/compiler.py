@@ -30,7 +30,9 @@ import logging
 import os
 import re
 
-from mako.template import Template
+from . import profiling
+from .templating import template
+from .writer import FileWriter
 
 logger = logging.getLogger(__name__)
 
@@ -39,12 +41,27 @@ class Compiler:
     '''
     Class that provides necessary functions to extend
     the riscv compiler
+
+    The generated content is returned by the render methods, the extend
+    methods write it into the toolchain. Without tcpath, only the render
+    methods can be used.
     '''
 
-    def __init__(self, exts, regs, tcpath):
+    def __init__(self, exts, regs, tcpath, writer=None):
         self._exts = exts
         self._regs = regs
+        # generated files are only written, if their content changes
+        self._writer = writer if writer is not None else FileWriter()
+
+        # without toolchain, the files can only be rendered
+        self.opch = self.opch_cust = self.opcc = self.stdlibs = None
+        if tcpath is not None:
+            self.find_toolchain(tcpath)
 
+    def find_toolchain(self, tcpath):
+        '''
+        Locate the files of the toolchain, that are extended.
+        '''
         # header file that needs to be edited
         self.opch = os.path.abspath(
             os.path.join(
@@ -107,28 +124,19 @@ class Compiler:
 
         logger.info('Restore original header file')
         opchold = self.opch + '_old'
-        if os.path.exists(opchold):
+        if self._writer.exists(opchold):
             logger.info('Restore contents from file {}'.format(opchold))
 
-            with open(opchold, 'r') as fh:
-                content = fh.read()
-
-            with open(self.opch, 'w') as fh:
-                fh.write(content)
+            content = self._writer.read(opchold)
+            self._writer.write(self.opch, content)
 
             logger.info('Original header restored')
 
-            try:
-                logger.info('Remove {} from system'.format(opchold))
-                os.remove(opchold)
-            except OSError:
-                pass
+            logger.info('Remove {} from system'.format(opchold))
+            self._writer.remove(opchold)
             # remove custom file
-            try:
-                logger.info('Remove {} from system'.format(self.opch_cust))
-                os.remove(self.opch_cust)
-            except OSError:
-                pass
+            logger.info('Remove {} from system'.format(self.opch_cust))
+            self._writer.remove(self.opch_cust)
         else:
             logger.info('Nothing to do')
 
@@ -139,21 +147,15 @@ class Compiler:
 
         logger.info('Restore original source file')
         opccold = self.opcc + '_old'
-        if os.path.exists(opccold):
+        if self._writer.exists(opccold):
             logger.info('Restore contents from file {}'.format(opccold))
-            with open(opccold, 'r') as fh:
-                content = fh.read()
-
-            with open(self.opcc, 'w') as fh:
-                fh.write(content)
+            content = self._writer.read(opccold)
+            self._writer.write(self.opcc, content)
 
             logger.info('Original source restored')
 
-            try:
-                logger.info('Remove {} from system'.format(opccold))
-                os.remove(opccold)
-            except OSError:
-                pass
+            logger.info('Remove {} from system'.format(opccold))
+            self._writer.remove(opccold)
         else:
             logger.info('Nothing to do')
 
@@ -163,12 +165,9 @@ class Compiler:
         '''
         logger.info('Remove intrinsic header file')
         riscvintr = os.path.join(self.stdlibs, 'riscvintr.h')
-        if os.path.exists(riscvintr):
-            try:
-                logger.info('Remove {} from system'.format(riscvintr))
-                os.remove(riscvintr)
-            except OSError:
-                pass
+        if self._writer.exists(riscvintr):
+            logger.info('Remove {} from system'.format(riscvintr))
+            self._writer.remove(riscvintr)
         else:
             logger.info('Nothing to do')
 
@@ -179,8 +178,10 @@ class Compiler:
         '''
 
         logger.info('Extending the toolchain')
-        self.extend_header()
-        self.extend_source()
+        with profiling.span('patch riscv-opc.h', 'patch'):
+            self.extend_header()
+        with profiling.span('patch riscv-opc.c', 'patch'):
+            self.extend_source()
         self.extend_stdlibs()
 
     def extend_header(self):
@@ -190,31 +191,27 @@ class Compiler:
         '''
 
         # read the content of riscv opc header
-        with open(self.opch, 'r') as fh:
-            content = fh.read()
+        content = self._writer.read(self.opch)
 
         # if not existing
         # copy the old header file
         # basically generate new file with old content
         opchold = self.opch + '_old'
-        if not os.path.exists(opchold):
+        if not self._writer.exists(opchold):
             logger.info('Copy original {}'.format(self.opch))
-            with open(opchold, 'w') as fh:
-                fh.write(content)
+            self._writer.write(opchold, content)
 
         # we include a whole directory
         # at first, we create our own custom opc header file
         # write file
-        with open(self.opch_cust, 'w') as fh:
-            fh.write(self._exts.cust_header)
+        self._writer.write(self.opch_cust, self._exts.cust_header)
 
         # write the include statement for our custom header
         if '#include "riscv-custom-opc.h"\n' not in content:
             content = '#include "riscv-custom-opc.h"\n' + content
 
         # write back generated header file
-        with open(self.opch, 'w') as fh:
-            fh.write(content)
+        self._writer.write(self.opch, content)
 
     def extend_source(self):
         '''
@@ -223,26 +220,20 @@ class Compiler:
         '''
 
         # read source file
-        with open(self.opcc, 'r') as fh:
-            content = fh.readlines()
+        content = self._writer.read(self.opcc).splitlines(True)
 
         # if not existing
         # copy the old source file
         # basically generate new file with old content
         opccold = self.opcc + '_old'
-        if not os.path.exists(opccold):
+        if not self._writer.exists(opccold):
             logger.info('Copy original {}'.format(self.opcc))
-            with open(opccold, 'w') as fh:
-                data = ''.join(content)
-                fh.write(data)
-
-        for inst in self._exts.instructions:
-            # build string that has to be added to the content of the file
-            dfn = '{{"{}",  "I",  "{}", {}, {}, match_opcode, 0 }},\n'.format(
-                inst.name, inst.operands, inst.matchname, inst.maskname)
+            self._writer.write(opccold, ''.join(content))
 
+        for inst, dfn in zip(self._exts.instructions,
+                             self.render_entries()):
             if dfn in content:
-                logger.warn('Instruction already taken, skip')
+                logger.warning('Instruction already taken, skip')
                 continue
 
             # we simply add the instruction right before the termination of the
@@ -257,84 +248,38 @@ class Compiler:
             content.insert(line, dfn)
 
         # write back modified content
-        with open(self.opcc, 'w') as fh:
-            content = ''.join(content)
-            fh.write(content)
+        self._writer.write(self.opcc, ''.join(content))
+
+    def render_entries(self):
+        '''
+        Return the entries of the custom instructions in the opcode
+        table of riscv-opc.c.
+        '''
+        return ['{{"{}",  "I",  "{}", {}, {}, match_opcode, 0 }},\n'.format(
+            inst.name, inst.operands, inst.matchname, inst.maskname)
+            for inst in self._exts.instructions]
 
     def extend_stdlibs(self):
-        # first: we need to find the location of the installed toolchain
-        # this is simply done by parsing the makefile in the
-        # riscv-gnu-toolchain project, which is available via args
-
-        # create a new file
-        riscvintr_templ = Template(r"""<%
-%>\
-// === AUTO GENERATED FILE ===
-
-#ifndef __RISCVINTR_H__
-#define __RISCVINTR_H__
-
-#include <stdint.h>
-
-% for reg, addr in regmap.items():
-#define ${reg} ${hex(addr)}
-% endfor
-
-uint32_t READ_CUSTOM_REG(uint32_t reg)
-{
-    // uint32_t *val;
-    // val = (uint32_t *)reg;
-    // return *val;
-    uint32_t val;
-    __asm__ __volatile__(
-        "read_custreg %0, zero, %1"
-        : "=r" (val)
-        : "r" (reg)
-    );
-    return val;
-}
-
-void WRITE_CUSTOM_REG(uint32_t reg, uint32_t val)
-{
-    // uint32_t *addr = (uint32_t *)reg;
-    // *addr = val;
-    __asm__ __volatile__(
-        "write_custreg zero, %1, %0"
-        :
-        : "r" (reg), "r" (val)
-    );
-}
-
-// access methods for custom instructions
-% for inst in insts:
-% if inst.form is 'R':
-% if not inst.name in ('read_custreg', 'write_custreg'):
-<% print(inst.name)%>\
-
-void ${inst.name.upper()}(uint32_t* rd, uint32_t rs1, uint32_t rs2)
-{
-    __asm__ __volatile__(
-        "${inst.name} %0, %1, %2"
-        : "=r" (*rd)
-        : "r" (rs1), "r" (rs2)
-    );
-}
-% endif
-% endif
-% endfor
-
-#endif // __RISCVINTR_H__
-""")
-
-        intr_file = riscvintr_templ.render(
-            regmap=self._regs.regmap, insts=self._exts.instructions)
+        # the location of the installed toolchain was found by parsing
+        # the makefile in the riscv-gnu-toolchain project
+        intr_file = self.render_intrinsics()
 
         # lets put a new file there
         riscvintr = os.path.join(self.stdlibs, 'riscvintr.h')
         logger.info("Create intrinsics file @ {}". format(riscvintr))
 
-        with open(riscvintr, 'w') as fh:
-            fh.write(intr_file)
+        self._writer.write(riscvintr, intr_file)
+
+    def render_intrinsics(self):
+        '''
+        Return the content of riscvintr.h, the intrinsics to access the
+        custom registers and instructions.
+        '''
+        riscvintr_templ = template('riscvintr.h.mako')
+
+        with profiling.span('render riscvintr.h', 'render'):
+            return riscvintr_templ.render(
+                regmap=self._regs.regmap, insts=self._exts.instructions)
 
     @property
     def exts(self):
@@ -351,3 +296,7 @@ void ${inst.name.upper()}(uint32_t* rd, uint32_t rs1, uint32_t rs2)
     @regs.setter
     def regs(self, regs):
         self._regs = regs
+
+    @property
+    def writer(self):
+        return self._writer
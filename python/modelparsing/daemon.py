@@ -0,0 +1,346 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import collections
+import errno
+import hashlib
+import json
+import logging
+import os
+import resource
+import socket
+import threading
+import time
+
+try:
+    import SocketServer as socketserver
+except ImportError:
+    import socketserver
+
+from .exceptions import DaemonError
+from .parser import Parser
+
+logger = logging.getLogger(__name__)
+
+# keyword arguments of Parser, a client may set
+OPTIONS = ('cache', 'jobs', 'strict', 'pch', 'fast', 'timing', 'force',
+           'store', 'buildpath', 'timeout')
+
+
+def socketpath():
+    '''
+    Default socket of the daemon of this checkout. It is kept outside of
+    the build directory, so restoring does not remove it while the
+    daemon runs.
+    '''
+    rundir = os.environ.get('XDG_RUNTIME_DIR')
+    if rundir is None:
+        rundir = os.environ.get('XDG_CACHE_HOME',
+                                os.path.join(os.path.expanduser('~'),
+                                             '.cache'))
+    top = os.path.dirname(os.path.realpath(__file__))
+    checkout = hashlib.sha1(top.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(rundir, 'riscv-custom-extension',
+                        'modelparser-{}.sock'.format(checkout))
+
+
+def source_version():
+    '''
+    Digest of the modelparsing sources. A daemon, that runs outdated
+    code, refuses requests and stops.
+    '''
+    sha = hashlib.sha1()
+    top = os.path.dirname(os.path.realpath(__file__))
+    for file in sorted(os.listdir(top)):
+        if file.endswith('.py'):
+            st = os.stat(os.path.join(top, file))
+            sha.update('{} {} {}\n'.format(
+                file, st.st_size, st.st_mtime).encode('utf-8'))
+    return sha.hexdigest()
+
+
+class Handler(socketserver.StreamRequestHandler):
+    '''
+    Handles a connection. A request is a single line of JSON, so is the
+    response.
+    '''
+
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {'ok': False, 'error': 'Invalid request'}
+        else:
+            response = self.server.modelparser.handle(request)
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    '''
+    Long running modelparser, reached over a Unix domain socket.
+
+    It keeps the parsers warm: libclang stays loaded and model files are
+    only parsed again, once they change. Parsers are kept per model path
+    and toolchain. The least recently used ones are evicted, if there
+    are more than max_parsers or they hold more than max_models models.
+    Builds are done one at a time, status requests are answered while
+    a build runs.
+    '''
+
+    def __init__(self, path=None, max_parsers=4, max_models=1024):
+        self._path = os.path.abspath(path or socketpath())
+        self._max_parsers = max_parsers
+        self._max_models = max_models
+        self._version = source_version()
+        # parsers by configuration, least recently used first
+        self._parsers = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._server = None
+        self._metrics = {
+            'started': time.time(),
+            'requests': 0,
+            'builds': 0,
+            'failures': 0,
+            'evictions': 0,
+            'build_ms': 0.0,
+            'last_build_ms': None,
+        }
+
+    def start(self):
+        '''
+        Bind the socket. A stale socket of a daemon, that is not
+        running anymore, is replaced.
+        '''
+        if os.path.exists(self._path):
+            if Client(self._path).available():
+                raise DaemonError(
+                    'A daemon is already running on {}'.format(self._path))
+            os.remove(self._path)
+        dirname = os.path.dirname(self._path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self._server = Server(self._path, Handler)
+        self._server.modelparser = self
+        logger.info('Daemon listening on {}'.format(self._path))
+
+    def serve_forever(self):
+        if self._server is None:
+            self.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        '''
+        Stop serving. It has to be called from another thread than
+        serve_forever.
+        '''
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            if os.path.exists(self._path):
+                os.remove(self._path)
+
+    def handle(self, request):
+        '''
+        Handle a request and return the response.
+        '''
+        self._metrics['requests'] += 1
+        command = request.get('command')
+        if command == 'status':
+            return dict(self.status(), ok=True)
+        if command == 'stop':
+            self.shutdown()
+            return {'ok': True}
+        if command == 'build':
+            if source_version() != self._version:
+                # the client parses in process with the current sources
+                logger.warning('Sources changed, stop the daemon')
+                self.shutdown()
+                return {'ok': False, 'stale': True,
+                        'error': 'The daemon runs outdated sources'}
+            return self.build(request)
+        return {'ok': False, 'error': 'Unknown command {}'.format(command)}
+
+    def build(self, request):
+        '''
+        Parse the models and extend the toolchain and gem5 with them.
+        '''
+        start = time.time()
+        with self._lock:
+            try:
+                parser = self.parser(request['tcpath'], request['modelpath'],
+                                     request.get('options', {}))
+                parser.reset()
+                parser.parse_models()
+                parser.extend()
+                changes = parser.changes()
+            except Exception as e:
+                logger.error('Build failed: {}'.format(e))
+                self._metrics['failures'] += 1
+                return {'ok': False, 'error': str(e),
+                        'type': type(e).__name__}
+            finally:
+                self.evict()
+
+            elapsed = (time.time() - start) * 1000
+            self._metrics['builds'] += 1
+            self._metrics['build_ms'] += elapsed
+            self._metrics['last_build_ms'] = elapsed
+        return {'ok': True, 'changes': changes, 'ms': elapsed}
+
+    def parser(self, tcpath, modelpath, options):
+        '''
+        Return the parser of a configuration, create it if necessary.
+        '''
+        unknown = set(options) - set(OPTIONS)
+        if unknown:
+            raise DaemonError('Unknown options {}'.format(sorted(unknown)))
+        key = json.dumps([tcpath, modelpath, options], sort_keys=True)
+        parser = self._parsers.pop(key, None)
+        if parser is None:
+            logger.info('New parser for {}'.format(modelpath))
+            parser = Parser(tcpath, modelpath, **options)
+        # most recently used last
+        self._parsers[key] = parser
+        return parser
+
+    def evict(self):
+        '''
+        Evict the least recently used parsers, until the limits are
+        kept. The most recently used parser is always kept.
+        '''
+        while len(self._parsers) > 1 and (
+                len(self._parsers) > self._max_parsers or
+                self.models() > self._max_models):
+            key, _ = self._parsers.popitem(last=False)
+            logger.info('Evict parser {}'.format(key))
+            self._metrics['evictions'] += 1
+
+    def models(self):
+        '''
+        Number of models held by all parsers.
+        '''
+        return sum(len(models) for parser in self._parsers.values()
+                   for _, models in parser.parsed.values())
+
+    def status(self):
+        metrics = dict(self._metrics)
+        builds = metrics.pop('build_ms')
+        metrics.update({
+            'pid': os.getpid(),
+            'socket': self._path,
+            'uptime': time.time() - self._metrics['started'],
+            'parsers': len(self._parsers),
+            'models': self.models(),
+            'mean_build_ms': builds / metrics['builds']
+            if metrics['builds'] else None,
+            # kilobytes on Linux
+            'peak_rss_kb': resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss,
+        })
+        return metrics
+
+    @property
+    def path(self):
+        return self._path
+
+
+class Client:
+    '''
+    Client of the modelparser daemon.
+    '''
+
+    def __init__(self, path=None, timeout=None):
+        self._path = os.path.abspath(path or socketpath())
+        self._timeout = timeout
+
+    def request(self, request):
+        '''
+        Send a request and return the response. Returns None, if no
+        daemon is running or the daemon is outdated. Raises DaemonError,
+        if the daemon could not handle the request.
+        '''
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(1.0)
+            try:
+                sock.connect(self._path)
+            except socket.error as e:
+                if e.errno in (errno.ENOENT, errno.ECONNREFUSED):
+                    return None
+                raise
+            # builds take as long, as they take
+            sock.settimeout(self._timeout)
+            sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+            data = sock.makefile('r').readline()
+        finally:
+            sock.close()
+
+        if not data:
+            raise DaemonError('The daemon closed the connection')
+        response = json.loads(data)
+        if response.get('stale'):
+            return None
+        if not response.get('ok'):
+            raise DaemonError(response.get('error'))
+        return response
+
+    def available(self):
+        try:
+            return self.request({'command': 'status'}) is not None
+        except (socket.error, DaemonError):
+            return False
+
+    def build(self, tcpath, modelpath, **options):
+        '''
+        Let the daemon build. Returns the response or None, if no daemon
+        is available.
+        '''
+        return self.request({'command': 'build', 'tcpath': tcpath,
+                             'modelpath': modelpath, 'options': options})
+
+    def status(self):
+        return self.request({'command': 'status'})
+
+    def stop(self):
+        return self.request({'command': 'stop'})
+
+    @property
+    def path(self):
+        return self._path
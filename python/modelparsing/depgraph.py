@@ -0,0 +1,252 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from .writer import synchronized
+
+logger = logging.getLogger(__name__)
+
+# bump, whenever the layout of the graph or a facet changes
+DEPS_VERSION = 2
+
+
+def encoding(model):
+    return [model.name, model.form, model.opc, model.funct3, model.funct7]
+
+
+def definition(model):
+    return [model.name, model.definition]
+
+
+def effects(model):
+    return [model.name, list(model.reads), list(model.writes)]
+
+
+def timing(model):
+    return [model.name, model.cycles]
+
+
+# information of a model, an artifact can depend on
+FACETS = {
+    'encoding': encoding,
+    'definition': definition,
+    'effects': effects,
+    'timing': timing,
+}
+
+# generated artifacts and the facets they depend on, the custom
+# registers are given by the facet registers, the order of the
+# instructions by the facet order
+ARTIFACTS = {
+    # riscv-custom-opc.h, riscv-opc.c
+    'opcodes': ('encoding', 'order'),
+    # riscvintr.h
+    'intrinsics': ('encoding', 'order', 'registers'),
+    # custom.isa and the isa_parser outputs
+    'decoder': ('encoding', 'definition', 'effects'),
+    # regsintr.hh
+    'regsintr': ('registers',),
+    # minor_custom_timings.py
+    'timings': ('encoding', 'order', 'timing'),
+}
+
+
+def stamp(file):
+    '''
+    Size and modification time of a file, None if it does not exist.
+    '''
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime]
+
+
+class DependencyGraph:
+    '''
+    Persisted dependencies of the generated artifacts.
+
+    For every artifact, the graph records a digest of the information it
+    is generated from, the input files (models, included headers and
+    register files) and the output files. An artifact is outdated, if
+    the digest changed or one of its outputs is missing or was changed
+    since, e.g. by another job, that shares the toolchain. Since only the
+    facets an artifact depends on are digested, editing the definition
+    of a model outdates the decoder, but not the binutils sources.
+    '''
+
+    def __init__(self, path):
+        self._path = os.path.abspath(path)
+        # digests of the current run
+        self._digests = {}
+        # input files of the current run by facet kind
+        self._inputs = {'models': [], 'registers': []}
+        self._artifacts = {}
+        self._lock = threading.RLock()
+
+        try:
+            with open(self._path, 'r') as fh:
+                graph = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return
+        if graph.get('version') == DEPS_VERSION:
+            self._artifacts = graph.get('artifacts', {})
+
+    @synchronized
+    def update(self, models, regmap, modelfiles=(), regfiles=(),
+               generator=None):
+        '''
+        Compute the digests of all artifacts for the given models and
+        custom registers. The models are given in the order, that the
+        instructions are generated in. The files are recorded as inputs.
+        The digest of the generators, see store.generator, outdates all
+        artifacts, when the generators change.
+        '''
+        self._inputs = {'models': sorted(modelfiles),
+                        'registers': sorted(regfiles)}
+        for artifact, facets in ARTIFACTS.items():
+            data = []
+            for facet in facets:
+                if facet == 'registers':
+                    data.append(sorted(regmap.items()))
+                elif facet == 'order':
+                    data.append([model.name for model in models])
+                else:
+                    data.append(sorted(FACETS[facet](model)
+                                       for model in models))
+            sha = hashlib.sha1()
+            sha.update(json.dumps([DEPS_VERSION, generator, data],
+                                  sort_keys=True).encode('utf-8'))
+            self._digests[artifact] = sha.hexdigest()
+
+    def digest(self, artifact):
+        '''
+        Return the digest of an artifact in the current run.
+        '''
+        return self._digests.get(artifact)
+
+    def inputs(self, artifact):
+        '''
+        Return the input files of an artifact in the current run.
+        '''
+        files = []
+        if any(facet != 'registers' for facet in ARTIFACTS[artifact]):
+            files.extend(self._inputs['models'])
+        if 'registers' in ARTIFACTS[artifact]:
+            files.extend(self._inputs['registers'])
+        return files
+
+    def outdated(self, artifact, outputs):
+        '''
+        Whether an artifact has to be generated again into the
+        given outputs.
+        '''
+        recorded = self._artifacts.get(artifact)
+        if recorded is None:
+            logger.info('{} was not generated before'.format(artifact))
+            return True
+        if recorded['outputs'] != [os.path.abspath(file)
+                                   for file in outputs]:
+            logger.info('{} is outdated, outputs moved'.format(artifact))
+            return True
+        if recorded['digest'] != self._digests.get(artifact):
+            changed = [file for file in self.inputs(artifact)
+                       if stamp(file) != recorded['inputs'].get(file)]
+            logger.info('{} is outdated, changed inputs: {}'.format(
+                artifact, changed))
+            return True
+        missing = [file for file in recorded['outputs']
+                   if not os.path.exists(file)]
+        if missing:
+            logger.info('{} is outdated, missing outputs: {}'.format(
+                artifact, missing))
+            return True
+        changed = [file for file, filestamp in
+                   recorded.get('stamps', {}).items()
+                   if stamp(file) != filestamp]
+        if changed:
+            logger.info('{} is outdated, outputs changed by another job: '
+                        '{}'.format(artifact, changed))
+            return True
+        logger.info('{} is up to date'.format(artifact))
+        return False
+
+    @synchronized
+    def commit(self, artifact, outputs):
+        '''
+        Record, that an artifact was generated into the given outputs.
+        The graph is saved immediately, so an interrupted run only
+        repeats the artifacts, that were not finished.
+        '''
+        self._artifacts[artifact] = {
+            'digest': self._digests[artifact],
+            'inputs': dict((file, stamp(file))
+                           for file in self.inputs(artifact)),
+            'outputs': [os.path.abspath(file) for file in outputs],
+            # other jobs may generate into the same outputs,
+            # directories change with their content and are left out
+            'stamps': dict((os.path.abspath(file), stamp(file))
+                           for file in outputs if os.path.isfile(file)),
+        }
+        self.save()
+
+    @synchronized
+    def invalidate(self):
+        '''
+        Forget all artifacts, e.g. after the toolchain was restored.
+        '''
+        self._artifacts = {}
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    @synchronized
+    def save(self):
+        '''
+        Write the graph. It is written to a temporary file first and
+        renamed afterwards, so readers never see a partial graph.
+        '''
+        dirname = os.path.dirname(self._path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        fd, tmp = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump({'version': DEPS_VERSION,
+                       'artifacts': self._artifacts},
+                      fh, indent=1, sort_keys=True)
+        os.rename(tmp, self._path)
+
+    @property
+    def path(self):
+        return self._path
@@ -0,0 +1,85 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import logging
+
+from .exceptions import FrontendError
+from .frontend import TYPES
+from .frontend import tokenize
+
+logger = logging.getLogger(__name__)
+
+# functions, that access custom registers
+ACCESSES = {'READ_CUSTOM_REG': 'reads', 'WRITE_CUSTOM_REG': 'writes'}
+# a custom register, that is only known at run time
+DYNAMIC = '*'
+# parameters of an instruction, their values are only known at run time
+OPERANDS = ('Rd', 'Rs1', 'Rs2', 'imm')
+
+
+def custom_registers(dfn):
+    '''
+    Determine the custom registers read and written by a definition.
+    Returns the reads and the writes as sorted tuples. A register, that
+    is computed at run time, is given as DYNAMIC. If the definition
+    cannot be analysed, any register might be read and written.
+    '''
+    try:
+        tokens = [text for _, text, _ in tokenize(dfn)]
+    except FrontendError as e:
+        logger.warning('Custom registers unknown: {}'.format(e))
+        return (DYNAMIC,), (DYNAMIC,)
+
+    # variables declared in the definition
+    local = set(tokens[i + 1] for i in range(len(tokens) - 1)
+                if tokens[i] in TYPES)
+
+    found = {'reads': set(), 'writes': set()}
+    for i, text in enumerate(tokens):
+        if text not in ACCESSES or tokens[i + 1:i + 2] != ['(']:
+            continue
+        # the first argument is the register
+        arg = []
+        depth = 0
+        for token in tokens[i + 2:]:
+            if depth == 0 and token in (',', ')'):
+                break
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+            arg.append(token)
+
+        register = DYNAMIC
+        if len(arg) == 1 and arg[0] not in local and \
+                not arg[0].startswith(OPERANDS):
+            # a literal or a register name defined in registers.hh
+            register = arg[0]
+        found[ACCESSES[text]].add(register)
+
+    return tuple(sorted(found['reads'])), tuple(sorted(found['writes']))
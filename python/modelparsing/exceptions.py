@@ -37,3 +37,53 @@ class ConsistencyError(Exception):
 class OpcodeError(Exception):
     # exception that is thrown, if opcodes could not be generated
     pass
+
+
+class ParseError(Exception):
+    # exception that is thrown, if one or more models could not be parsed
+    # holds a list of (file, exception) tuples
+    def __init__(self, errors):
+        super(ParseError, self).__init__(
+            '{} model(s) could not be parsed: {}'.format(
+                len(errors), ', '.join(f for f, _ in errors)))
+        self.errors = errors
+
+
+class LibraryError(Exception):
+    # exception that is thrown, if libclang could not be found
+    pass
+
+
+class FrontendError(Exception):
+    # exception that is thrown, if the fast front-end does not
+    # understand a model, libclang is used instead
+    pass
+
+
+class GeneratorError(Exception):
+    # exception that is thrown, if a generator of gem5, e.g. the
+    # isa parser, failed
+    pass
+
+
+class StageError(Exception):
+    # exception that is thrown, if one or more stages failed
+    # holds a list of (stage, exception) tuples
+    def __init__(self, errors):
+        super(StageError, self).__init__(
+            '{} stage(s) failed: {}'.format(
+                len(errors), '; '.join('{}: {}'.format(stage, error)
+                                       for stage, error in errors)))
+        self.errors = errors
+
+
+class DaemonError(Exception):
+    # exception that is thrown, if the modelparser daemon could not
+    # handle a request
+    pass
+
+
+class LockError(Exception):
+    # exception that is thrown, if a shared directory could not be
+    # locked in time, because another job holds it
+    pass
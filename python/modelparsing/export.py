@@ -0,0 +1,203 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import json
+import struct
+
+# bump, whenever the layout of the manifest changes
+MANIFEST_VERSION = 2
+
+# file names of the manifest in the build directory
+MANIFEST_JSON = 'manifest.json'
+MANIFEST_BIN = 'manifest.bin'
+
+# layout of the binary manifest, all integers are little endian:
+# header, instruction records, register records, string table
+# strings are given as offset into the string table, they are utf-8 and
+# terminated by a null byte, lists of names are joined by commas
+MAGIC = b'RVCX'
+# magic, version, instructions, registers, size of the string table
+HEADER = struct.Struct('<4sHHHxxI')
+# name, operands, mask name, match name, definition, reads, writes,
+# mask, match, form, opc, funct3, funct7, cycles, declared cycles,
+# estimated cycles, critical path
+INSTRUCTION = struct.Struct('<7I2IcBBBHHHH')
+# name, address
+REGISTER = struct.Struct('<II')
+# estimated cycles and critical path, that are not known
+UNKNOWN = 0xffff
+
+
+def manifest(exts, regs):
+    '''
+    Return the manifest of the extensions and the custom registers. It
+    holds what downstream tools, e.g. assemblers or trace analyzers,
+    need to know about the instructions, so they do not have to parse
+    the models again.
+    '''
+    instructions = []
+    for model, inst in zip(exts.models, exts.instructions):
+        instructions.append({
+            'name': inst.name,
+            'form': inst.form,
+            'operands': inst.operands,
+            'opc': model.opc,
+            'funct3': model.funct3,
+            'funct7': model.funct7,
+            'mask': inst.maskvalue,
+            'match': inst.matchvalue,
+            'maskname': inst.maskname,
+            'matchname': inst.matchname,
+            'cycles': inst.cycles,
+            'declared_cycles': model.declared_cycles,
+            'estimated_cycles': model.estimated_cycles,
+            'critical_path': model.critical_path,
+            'reads': list(model.reads),
+            'writes': list(model.writes),
+            'definition': model.definition,
+        })
+    return {'version': MANIFEST_VERSION,
+            'instructions': instructions,
+            'registers': dict(regs.regmap)}
+
+
+def dumps(manifest):
+    '''
+    Return the manifest as JSON.
+    '''
+    return json.dumps(manifest, indent=1, sort_keys=True) + '\n'
+
+
+def pack(manifest):
+    '''
+    Return the manifest in its binary form.
+    '''
+    strings = bytearray()
+    offsets = {}
+
+    def string(value):
+        value = value.encode('utf-8')
+        if value not in offsets:
+            offsets[value] = len(strings)
+            strings.extend(value + b'\0')
+        return offsets[value]
+
+    def optional(value):
+        return UNKNOWN if value is None else value
+
+    records = []
+    for inst in manifest['instructions']:
+        records.append(INSTRUCTION.pack(
+            string(inst['name']), string(inst['operands']),
+            string(inst['maskname']), string(inst['matchname']),
+            string(inst['definition']), string(','.join(inst['reads'])),
+            string(','.join(inst['writes'])),
+            inst['mask'], inst['match'], inst['form'].encode('ascii'),
+            inst['opc'], inst['funct3'], inst['funct7'], inst['cycles'],
+            inst['declared_cycles'], optional(inst['estimated_cycles']),
+            optional(inst['critical_path'])))
+    for name, address in sorted(manifest['registers'].items()):
+        records.append(REGISTER.pack(string(name), address))
+
+    header = HEADER.pack(MAGIC, manifest['version'],
+                         len(manifest['instructions']),
+                         len(manifest['registers']), len(strings))
+    return header + b''.join(records) + bytes(strings)
+
+
+def unpack(data):
+    '''
+    Return the manifest of its binary form, as loaded from JSON.
+    '''
+    magic, version, ninsts, nregs, size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(magic, 'Not a binary manifest.')
+    if version != MANIFEST_VERSION:
+        raise ValueError(version, 'Unsupported manifest version.')
+    base = (HEADER.size + ninsts * INSTRUCTION.size +
+            nregs * REGISTER.size)
+
+    def string(offset):
+        end = data.index(b'\0', base + offset)
+        return data[base + offset:end].decode('utf-8')
+
+    def names(offset):
+        value = string(offset)
+        return value.split(',') if value else []
+
+    def optional(value):
+        return None if value == UNKNOWN else value
+
+    instructions = []
+    offset = HEADER.size
+    for _ in range(ninsts):
+        (name, operands, maskname, matchname, definition, reads, writes,
+         mask, match, form, opc, funct3, funct7, cycles, declared,
+         estimated, critical) = INSTRUCTION.unpack_from(data, offset)
+        offset += INSTRUCTION.size
+        instructions.append({
+            'name': string(name),
+            'form': form.decode('ascii'),
+            'operands': string(operands),
+            'opc': opc,
+            'funct3': funct3,
+            'funct7': funct7,
+            'mask': mask,
+            'match': match,
+            'maskname': string(maskname),
+            'matchname': string(matchname),
+            'cycles': cycles,
+            'declared_cycles': declared,
+            'estimated_cycles': optional(estimated),
+            'critical_path': optional(critical),
+            'reads': names(reads),
+            'writes': names(writes),
+            'definition': string(definition),
+        })
+
+    registers = {}
+    for _ in range(nregs):
+        name, address = REGISTER.unpack_from(data, offset)
+        offset += REGISTER.size
+        registers[string(name)] = address
+
+    return {'version': version,
+            'instructions': instructions,
+            'registers': registers}
+
+
+def load(path):
+    '''
+    Load a manifest, that was written as JSON or in its binary form.
+    The file is read at once.
+    '''
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if data.startswith(MAGIC):
+        return unpack(data)
+    return json.loads(data.decode('utf-8'))
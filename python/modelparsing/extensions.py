@@ -29,32 +29,38 @@
 import logging
 import os
 import subprocess
+import threading
 
-from mako.template import Template
-
-from exceptions import OpcodeError
-from instruction import Instruction
+from . import profiling
+from .exceptions import OpcodeError
+from .instruction import Instruction
+from .templating import template
 
 logger = logging.getLogger(__name__)
 
+# output of parse-opcodes by its input, shared by all extensions of the
+# process
+_encoded = {}
+_lock = threading.Lock()
+
 
 class Extensions:
     '''
     Has all necessary information about the custom instructions
     that is needed to extend the RISC-V compiler.
+    If an encoding lock is given, the instructions are generated in its
+    order and it is updated with them.
     '''
 
-    def __init__(self, models):
-        self._models = models
+    def __init__(self, models, lock=None):
+        self._models = models if lock is None else lock.order(models)
         self._insts = []
+        self._lock = lock
 
         # riscv-opcodes path
         self._rv_opc = os.path.join(os.path.dirname(
             os.path.realpath(__file__)), '../../riscv-opcodes')
 
-        self._opc_templ = os.path.join(os.path.dirname(
-            os.path.realpath(__file__)), 'opcodes-custom.mako')
-
         # files of riscv-opcodes project
         self._rv_opc_parser = os.path.join(self._rv_opc, 'parse-opcodes')
 
@@ -68,6 +74,8 @@ class Extensions:
         self._rv_opc_files.append(os.path.join(self._rv_opc, 'opcodes-custom'))
 
         self.gen_instructions()
+        if lock is not None:
+            lock.update(self._models, self._insts)
 
     def check_opcodes(self, inst):
         # check for overlapping opcodes
@@ -113,37 +121,12 @@ class Extensions:
         logger.info('Generate instructions from operations')
         # use a mako template to generate files, that are equal to the ones
         # in the riscv-opcodes project
-        opcodes_cust = Template(r"""<%
-%>\
-% for operation in operations:
-% if operation.form == 'R':
-${operation.name} rd rs1 rs2 31..25=${operation.funct7} 14..12=${operation.funct3} 6..2=${operation.opc} 1..0=3
-% elif operation.form == 'I':
-${operation.name} rd rs1 imm12 14..12=${operation.funct3} 6..2=${operation.opc} 1..0=3
-% else:
-Format not supported.
-<% return STOP_RENDERING %>
-%endif
-% endfor""")
-
-        content = opcodes_cust.render(operations=self._models)
+        opcodes_cust = template('opcodes-custom.mako')
 
-        # start parse_opcodes script with our custom instructions
-        p = subprocess.Popen([self._rv_opc_parser,
-                              '-c'],
-                             stdin=subprocess.PIPE,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-        defines, err = p.communicate(input=content)
+        with profiling.span('render opcodes', 'render'):
+            content = opcodes_cust.render(operations=self._models)
 
-        if not defines or err:
-            # an error occured
-            # try:
-            #     os.remove(opc_cust)
-            # except OSError:
-            #     pass
-            logger.error(err.rstrip())
-            raise OpcodeError('Function opcode could not be generated')
+        defines = self.encode(content)
 
         # adapt the defines
         defines = defines.replace(
@@ -182,10 +165,50 @@ Format not supported.
         for inst in self._insts:
             self.check_opcodes(inst)
 
+    def encode(self, content):
+        '''
+        Return the defines, that parse-opcodes generates for the custom
+        opcodes in content. The defines are kept for the process, so
+        the same instructions are only encoded once, e.g. when building
+        several configurations or rebuilding unchanged models.
+        '''
+        key = (self._rv_opc_parser, content)
+        with _lock:
+            defines = _encoded.get(key)
+        if defines is not None:
+            return defines
+
+        # start parse_opcodes script with our custom instructions
+        with profiling.span('parse-opcodes', 'subprocess'):
+            p = subprocess.Popen([self._rv_opc_parser,
+                                  '-c'],
+                                 stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+            defines, err = p.communicate(input=content)
+
+        if not defines or err:
+            # an error occured
+            # try:
+            #     os.remove(opc_cust)
+            # except OSError:
+            #     pass
+            logger.error(err.rstrip())
+            raise OpcodeError('Function opcode could not be generated')
+
+        with _lock:
+            _encoded[key] = defines
+        return defines
+
     @property
     def models(self):
         return self._models
 
+    @property
+    def lock(self):
+        return self._lock
+
     @property
     def instructions(self):
         return self._insts
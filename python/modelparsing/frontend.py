@@ -0,0 +1,502 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import logging
+import re
+
+from .cache import includes
+from .exceptions import FrontendError
+
+logger = logging.getLogger(__name__)
+
+# tokens of the model dialect, everything else is not understood
+TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<unterminated>/\*)
+  | (?P<directive>\#[^\n]*)
+  | (?P<number>\d\w*)
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<punct>[{}()\[\];,=.+\-*/%&|^~!<>?:])
+''', re.S | re.X)
+
+# the only directive, that is allowed
+INCLUDE = re.compile(r'^#\s*include\s*(<[^>]+>|"[^"]+")\s*$')
+
+# types of variables and parameters
+TYPES = set(['uint8_t', 'uint16_t', 'uint32_t', 'uint64_t',
+             'int8_t', 'int16_t', 'int32_t', 'int64_t',
+             'char', 'short', 'int', 'long', 'unsigned', 'signed'])
+
+# qualifiers, that don't change the meaning of a declaration
+QUALIFIERS = set(['const', 'constexpr', 'static'])
+
+# keywords in a function body, that need a real compiler to be checked
+UNSUPPORTED = set(['return'])
+
+# literals, that are no numbers
+CONSTANTS = set(['true', 'false'])
+
+# operators of a function body by precedence, the tokenizer splits
+# operators of several characters into adjacent punctuation tokens
+BINARY = {'||': 1, '&&': 2, '|': 3, '^': 4, '&': 5, '==': 6, '!=': 6,
+          '<': 7, '>': 7, '<=': 7, '>=': 7, '<<': 8, '>>': 8,
+          '+': 9, '-': 9, '*': 10, '/': 10, '%': 10}
+ASSIGNMENTS = set(['=', '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=',
+                   '<<=', '>>='])
+PREFIX = set(['+', '-', '~', '!', '++', '--'])
+POSTFIX = set(['++', '--'])
+OPERATORS = set(BINARY) | ASSIGNMENTS | PREFIX | set(['?', ':'])
+
+# integer literal with an optional suffix
+LITERAL = re.compile(r'^(0[xX][0-9a-fA-F]+|0[bB][01]+|0[0-7]*|[1-9]\d*)'
+                     r'([uU][lL]{0,2}|[lL]{1,2}[uU]?)?$')
+
+# declarations of a header, that a function body may use
+COMMENT = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+DEFINE = re.compile(r'^\s*#\s*define\s+([A-Za-z_]\w*)(\(([^)]*)\))?', re.M)
+DECLARATION = re.compile(
+    r'\b([A-Za-z_]\w*)\s+([A-Za-z_]\w*)\s*(\(([^()]*)\)\s*[;{]|=|;)')
+
+
+def tokenize(source):
+    '''
+    Split the source into (kind, text, offset) tuples.
+    Whitespace and comments are dropped.
+    '''
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = TOKEN.match(source, pos)
+        if not match or match.lastgroup == 'unterminated':
+            raise FrontendError(
+                'Unknown token {!r}'.format(source[pos:pos + 10]))
+        kind = match.lastgroup
+        if kind not in ('space', 'comment'):
+            tokens.append((kind, match.group(), pos))
+        pos = match.end()
+    return tokens
+
+
+def arity(params):
+    params = params.strip()
+    if params in ('', 'void'):
+        return 0
+    return params.count(',') + 1
+
+
+def declared(header):
+    '''
+    Return the values and the functions, that a header declares. Values
+    map to False, they are not assigned in a model. Functions map to
+    their return type, which is None for a macro, and their arity.
+    '''
+    header = COMMENT.sub('', header)
+    values = {}
+    functions = {}
+    for name, params, inner in DEFINE.findall(header):
+        if params:
+            functions[name] = (None, arity(inner))
+        else:
+            values[name] = False
+    for rettype, name, rest, params in DECLARATION.findall(header):
+        if rest.startswith('(') and (rettype in TYPES or rettype == 'void'):
+            functions[name] = (rettype, arity(params))
+        elif not rest.startswith('(') and rettype in TYPES:
+            values[name] = False
+    return values, functions
+
+
+class Frontend:
+    '''
+    Parser for the constrained dialect models are written in:
+    a couple of integer constants and one void function with the
+    parameters Rd, Rs1 and Rs2 or imm. The same information as with
+    libclang is extracted. A FrontendError is raised for everything,
+    that is not understood.
+    Function bodies are not compiled, but checked: they may only use
+    statements and operators on integers, the parameters, variables
+    and functions declared in the file or in the given headers.
+    Everything else is left to libclang and its diagnostics.
+    '''
+
+    def __init__(self, source, headers=None):
+        self._source = source
+        self._tokens = tokenize(source)
+        self._pos = 0
+        self._info = {}
+        # names a function body may use, values map to whether they
+        # can be assigned, functions to their return type and arity
+        self._values = {}
+        self._functions = {}
+        for header in headers or []:
+            values, functions = declared(header)
+            self._values.update(values)
+            self._functions.update(functions)
+        # the variables of the enclosing blocks of a body
+        self._scopes = []
+
+    def parse(self):
+        '''
+        Parse the source and return the extracted information as a
+        dictionary, using the keys of Model.to_dict.
+        '''
+        while self._pos < len(self._tokens):
+            kind, text, _ = self._tokens[self._pos]
+            if kind == 'directive':
+                if not INCLUDE.match(text):
+                    raise FrontendError('Unsupported directive ' + text)
+                self._pos += 1
+            else:
+                self.declaration()
+        return self._info
+
+    def next(self, kind=None, text=None):
+        '''
+        Consume the next token, which has to match kind and text.
+        '''
+        if self._pos >= len(self._tokens):
+            raise FrontendError('Unexpected end of file')
+        token = self._tokens[self._pos]
+        if (kind is not None and token[0] != kind) or \
+                (text is not None and token[1] != text):
+            raise FrontendError('Unexpected token ' + token[1])
+        self._pos += 1
+        return token
+
+    def peek(self, ahead=0):
+        if self._pos + ahead >= len(self._tokens):
+            raise FrontendError('Unexpected end of file')
+        return self._tokens[self._pos + ahead][1]
+
+    def operator(self):
+        '''
+        Return the operator at the current token and the number of its
+        tokens. Returns None and 0, if there is no operator.
+        '''
+        for count in (3, 2, 1):
+            tokens = self._tokens[self._pos:self._pos + count]
+            if len(tokens) < count or \
+                    any(kind != 'punct' for kind, _, _ in tokens) or \
+                    any(tokens[i + 1][2] != tokens[i][2] + 1
+                        for i in range(count - 1)):
+                continue
+            text = ''.join(text for _, text, _ in tokens)
+            if text in OPERATORS:
+                return text, count
+        return None, 0
+
+    def typename(self, void=False, qualifiers=None):
+        '''
+        Consume qualifiers and a type, return the type. The qualifiers
+        are appended to the given list.
+        '''
+        while self.peek() in QUALIFIERS:
+            text = self.next()[1]
+            if qualifiers is not None:
+                qualifiers.append(text)
+        _, text, _ = self.next('ident')
+        if text not in TYPES and not (void and text == 'void'):
+            raise FrontendError('Unsupported type ' + text)
+        return text
+
+    def declaration(self):
+        qualifiers = []
+        rettype = self.typename(void=True, qualifiers=qualifiers)
+        _, name, _ = self.next('ident')
+
+        token = self.next('punct')[1]
+        if token == '=' and rettype != 'void':
+            self.variable(name)
+            self._values[name] = 'const' not in qualifiers
+        elif token == '(':
+            self.function(rettype, name)
+        else:
+            raise FrontendError('Unsupported declaration ' + name)
+
+    def variable(self, name):
+        _, text, _ = self.next('number')
+        self.next('punct', ';')
+        try:
+            value = int(text, 0)
+        except ValueError:
+            raise FrontendError('Unsupported literal ' + text)
+
+        if name in ('opc', 'funct3', 'funct7', 'cycles'):
+            logger.debug('Model {}: {}'.format(name, value))
+            self._info[name] = value
+
+    def function(self, rettype, name):
+        # the first function is the instruction
+        if 'name' not in self._info:
+            logger.info('Function name: {}'.format(name))
+            self._info['name'] = name
+            self._info['rettype'] = rettype
+        instruction = self._info['name'] == name
+
+        params = self.parameters()
+        if instruction:
+            for param in params:
+                self.parameter(param)
+        self._functions[name] = (rettype, len(params))
+
+        if self.peek() == ';':
+            self.next()
+            return
+
+        start = self._tokens[self._pos][2]
+        offset = self.block(params)
+
+        if instruction and 'dfn' not in self._info:
+            self._info['dfn'] = self._source[start:offset + 1]
+
+    def block(self, names=()):
+        '''
+        Check a block and return the offset of its closing brace.
+        '''
+        self.next('punct', '{')
+        self._scopes.append(dict((name, True) for name in names))
+        while self.peek() != '}':
+            self.statement()
+        self._scopes.pop()
+        return self.next('punct', '}')[2]
+
+    def statement(self):
+        kind, text, _ = self._tokens[self._pos]
+        if kind == 'directive' or text in UNSUPPORTED:
+            raise FrontendError('Unsupported statement ' + text)
+        if text == '{':
+            self.block()
+        elif text == ';':
+            self.next()
+        elif text == 'if':
+            self.next()
+            self.next('punct', '(')
+            self.expression()
+            self.next('punct', ')')
+            self.substatement()
+            if self._pos < len(self._tokens) and self.peek() == 'else':
+                self.next()
+                self.substatement()
+        elif text in TYPES or text in QUALIFIERS:
+            self.local()
+        elif text == '(' and self.peek(1) == 'void':
+            # a discarded value
+            self.next()
+            self.next()
+            self.next('punct', ')')
+            self.expression()
+            self.next('punct', ';')
+        elif self._functions.get(text, (None,))[0] == 'void' and \
+                self.peek(1) == '(':
+            # a function without result is only called as a statement
+            self.next()
+            self.call(text)
+            self.next('punct', ';')
+        else:
+            self.expression()
+            self.next('punct', ';')
+
+    def substatement(self):
+        # the statement of an if has a scope of its own
+        self._scopes.append({})
+        self.statement()
+        self._scopes.pop()
+
+    def local(self):
+        qualifiers = []
+        self.typename(qualifiers=qualifiers)
+        while True:
+            _, name, _ = self.next('ident')
+            if name in self._scopes[-1] or name in TYPES or \
+                    name in QUALIFIERS or name in CONSTANTS:
+                raise FrontendError('Invalid declaration of ' + name)
+            if self.operator()[0] == '=':
+                self.next()
+                self.assignment()
+            # a variable is visible after its initializer
+            self._scopes[-1][name] = 'const' not in qualifiers
+            if self.peek() != ',':
+                break
+            self.next()
+        self.next('punct', ';')
+
+    def expression(self):
+        '''
+        Check an expression, returns whether it can be assigned.
+        '''
+        return self.assignment()
+
+    def assignment(self):
+        assignable = self.conditional()
+        op, count = self.operator()
+        if op in ASSIGNMENTS:
+            if not assignable:
+                raise FrontendError('Assignment to an expression')
+            self._pos += count
+            self.assignment()
+            return False
+        return assignable
+
+    def conditional(self):
+        assignable = self.binary(1)
+        if self.operator()[0] == '?':
+            self.next()
+            self.assignment()
+            if self.operator()[0] != ':':
+                raise FrontendError('Incomplete conditional expression')
+            self.next()
+            self.assignment()
+            return False
+        return assignable
+
+    def binary(self, level):
+        assignable = self.unary()
+        while True:
+            op, count = self.operator()
+            if op not in BINARY or BINARY[op] < level:
+                return assignable
+            self._pos += count
+            self.binary(BINARY[op] + 1)
+            assignable = False
+
+    def unary(self):
+        op, count = self.operator()
+        if op in PREFIX:
+            self._pos += count
+            if not self.unary() and op in POSTFIX:
+                raise FrontendError('Increment of an expression')
+            return False
+        if self.peek() == '(' and self.peek(1) in TYPES:
+            # a cast
+            self.next()
+            self.typename()
+            self.next('punct', ')')
+            self.unary()
+            return False
+        assignable = self.primary()
+        while self._pos < len(self._tokens):
+            op, count = self.operator()
+            if op not in POSTFIX:
+                break
+            if not assignable:
+                raise FrontendError('Increment of an expression')
+            self._pos += count
+            assignable = False
+        return assignable
+
+    def primary(self):
+        kind, text, _ = self.next()
+        if kind == 'number':
+            if not LITERAL.match(text):
+                raise FrontendError('Unsupported literal ' + text)
+            return False
+        if kind == 'ident' and text in CONSTANTS:
+            return False
+        if kind == 'ident' and self.peek() == '(':
+            if self._functions.get(text, (None,))[0] == 'void':
+                raise FrontendError('Function {} has no result'.format(text))
+            self.call(text)
+            return False
+        if kind == 'ident':
+            for scope in reversed(self._scopes):
+                if text in scope:
+                    return scope[text]
+            if text in self._values:
+                return self._values[text]
+            raise FrontendError('Unknown identifier ' + text)
+        if text == '(':
+            assignable = self.expression()
+            self.next('punct', ')')
+            return assignable
+        raise FrontendError('Unexpected token ' + text)
+
+    def call(self, name):
+        if name not in self._functions:
+            raise FrontendError('Unknown function ' + name)
+        self.next('punct', '(')
+        args = 0
+        if self.peek() != ')':
+            while True:
+                self.assignment()
+                args += 1
+                if self.peek() != ',':
+                    break
+                self.next()
+        self.next('punct', ')')
+        if args != self._functions[name][1]:
+            raise FrontendError('Wrong number of arguments for ' + name)
+
+    def parameters(self):
+        '''
+        Consume the parameter list and return the parameter names.
+        '''
+        params = []
+        if self.peek() == 'void':
+            self.next()
+            self.next('punct', ')')
+            return params
+
+        while self.peek() != ')':
+            self.typename()
+            params.append(self.next('ident')[1])
+            if self.peek() == ',':
+                self.next()
+        self.next('punct', ')')
+        return params
+
+    def parameter(self, name):
+        # check if Rd and Rs1 exists
+        if name.startswith('Rd'):
+            self._info['check_rd'] = True
+        if name.startswith('Rs1'):
+            self._info['check_rs1'] = True
+
+        # determine, if function is R-Type or I-Type
+        if name.startswith('Rs2'):
+            logger.debug('Model is of format R-Type')
+            self._info['form'] = 'R'
+            self._info['check_op2'] = True
+        if name.startswith('imm'):
+            logger.debug('Model is of format I-Type')
+            self._info['form'] = 'I'
+            self._info['check_op2'] = True
+
+
+def parse(file):
+    '''
+    Parse a model file with the fast front-end. The local headers, that
+    the file includes, declare what its functions may use.
+    '''
+    with open(file, 'r') as fh:
+        source = fh.read()
+    headers = []
+    for header in includes(file)[1:]:
+        with open(header, 'r') as fh:
+            headers.append(fh.read())
+    return Frontend(source, headers).parse()
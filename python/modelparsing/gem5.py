@@ -28,24 +28,49 @@
 
 import logging
 import os
+import re
+import shutil
+import subprocess
 import sys
+import tempfile
 
-from mako.template import Template
+from . import profiling
+from .exceptions import GeneratorError
+from .templating import template
+from .writer import FileWriter
 
 logger = logging.getLogger(__name__)
 
+# runs the gem5 isa parser in its own interpreter, so neither its imports
+# nor its globals leak into the modelparser
+# arguments: gem5 path, main isa file, output directory
+ISA_PARSER = '''
+import os
+import sys
+gem5, isamain, outdir = sys.argv[1:]
+sys.path[0:0] = [os.path.join(gem5, 'src/python'),
+                 os.path.join(gem5, 'ext/ply'),
+                 os.path.join(gem5, 'src/arch')]
+import isa_parser
+isa_parser.ISAParser(outdir).parse_isa_desc(isamain)
+'''
+
 
 class Gem5:
     '''
     This class builds the code snippets, that are later integrated in the gem5
     decoder. It builds a custom decoder depending on the previously parsed
     models.
+    The render methods return the generated content, they do not need a
+    gem5 tree.
     '''
 
-    def __init__(self, exts, regs):
+    def __init__(self, exts, regs, writer=None, buildpath=None):
         self._exts = exts
         self._regs = regs
         self._decoder = ''
+        # generated files are only written, if their content changes
+        self._writer = writer if writer is not None else FileWriter()
 
         self._gem5_path = os.path.abspath(
             os.path.join(
@@ -61,42 +86,36 @@ class Gem5:
             os.path.join(
                 self._gem5_arch_path,
                 'riscv/isa/decoder/rv32.isa'))
-        assert os.path.exists(self._isa_decoder)
 
-        self._buildpath = os.path.abspath(
-            os.path.join(
-                os.path.dirname(os.path.realpath(__file__)),
-                '../../build'))
+        # generated files are written to the build directory of the job
+        if buildpath is None:
+            buildpath = os.path.join(
+                os.path.dirname(os.path.realpath(__file__)), '../../build')
+        self._buildpath = os.path.abspath(buildpath)
 
         self._isamain = os.path.abspath(
             os.path.join(
                 os.path.dirname(os.path.realpath(__file__)),
                 '../../src/isa/main.isa'))
-        assert os.path.exists(self._isamain)
 
     def restore(self):
         '''
         Remove the custom extensions from the isa decoder.
         Restore the saved decoder.
         '''
+        assert os.path.exists(self._isa_decoder)
         logger.info('Restore original ISA decoder.')
         decoder_old = self._isa_decoder + '_old'
-        if os.path.exists(decoder_old):
+        if self._writer.exists(decoder_old):
             logger.info('Restore contents from file {}'.format(decoder_old))
 
-            with open(decoder_old, 'r') as fh:
-                content = fh.read()
-
-            with open(self._isa_decoder, 'w') as fh:
-                fh.write(content)
+            content = self._writer.read(decoder_old)
+            self._writer.write(self._isa_decoder, content)
 
             logger.info('Original decoder restored')
 
-            try:
-                logger.info('Remove {} from system'.format(decoder_old))
-                os.remove(decoder_old)
-            except OSError:
-                pass
+            logger.info('Remove {} from system'.format(decoder_old))
+            self._writer.remove(decoder_old)
         else:
             logger.info('Nothing to do')
 
@@ -115,152 +134,142 @@ class Gem5:
         self.create_FU_timings()
 
     def gen_decoder(self):
-        assert os.path.exists(self._buildpath)
-        assert os.path.exists(self._gem5_arch_path)
+        '''
+        Generate the decoder of the custom instructions, gen_cxx_files
+        writes it.
+        '''
+        self._decoder = self.render_decoder()
+        logger.debug('custom decoder: \n' + self._decoder)
+
+    def render_decoder(self):
+        '''
+        Return the decoder of the custom instructions.
+        Instructions, that write custom registers, are serialized and
+        executed non-speculatively. Pure instructions and readers are
+        emitted without flags, so they can overlap freely.
+        '''
         # iterate of all custom extensions and generate a custom decoder
         # first sort models:
         # opcode > funct3 (> funct7)
         logger.info('Generate custom decoder from models.')
 
-        # sort models
-        self._exts.models.sort(key=lambda x: (x.opc, x.funct3, x.funct7))
-
-        dec_templ = Template(r"""<%
-dfn = {}
-for model in models:
-    if model.opc in dfn:
-        dfn[model.opc].append(model)
-    else:
-        dfn[model.opc] = [model]
-for opc, mdls in dfn.items():
-    funct3 = {}
-    for mdl in mdls:
-        if mdl.form == 'I':
-            funct3[mdl.funct3] = mdl
-        else:
-            if mdl.funct3 in funct3:
-                funct3[mdl.funct3].append(mdl)
-            else:
-                funct3[mdl.funct3] = [mdl]
-    dfn[opc] = funct3
-%>\
-// === AUTO GENERATED FILE ===
-
-% if dfn.items():
-decode OPCODE default Unknown::unknown() {
-% for opc,funct3_dict in dfn.items():
-${hex(opc)}: decode FUNCT3 {
-% for funct3, val in funct3_dict.items():
-% if type(val) != list:
-${hex(funct3)}: I32Op::${val.name}({${val.definition}}, uint32_t, IntCustOp);
-% else:
-${hex(funct3)}: decode FUNCT7 {
-% for mdl in val:
-${hex(mdl.funct7)}: R32Op::${mdl.name}({${mdl.definition}}, IntCustOp);
-% endfor
-}
-% endif
-% endfor
-}
-% endfor
-}
-% else:
-decode OPCODE {
-default: Unknown::unknown();
-}
-% endif
-""")
-
-        self._decoder = dec_templ.render(models=self._exts.models)
-        logger.debug('custom decoder: \n' + self._decoder)
+        # sort models, the extensions are shared with the compiler stage,
+        # so they are left untouched
+        models = sorted(self._exts.models,
+                        key=lambda x: (x.opc, x.funct3, x.funct7))
 
-    def gen_cxx_files(self):
-        # now generate the cxx files using the isa parser
-        isabuildpath = os.path.join(self._buildpath, 'isa')
-        if not os.path.exists(isabuildpath):
-            os.makedirs(isabuildpath)
+        dec_templ = template('custom.isa.mako')
 
-        isafile = os.path.join(isabuildpath, 'custom.isa')
+        with profiling.span('render custom.isa', 'render'):
+            return dec_templ.render(models=models)
 
-        with open(isafile, 'w') as fh:
-            fh.write(self._decoder)
+    def gen_cxx_files(self):
+        '''
+        Generate the cxx files of the decoder using the gem5 isa parser.
+        The isa parser writes into a staging directory, only files with
+        a changed content are moved to the build directory.
+        '''
+        assert os.path.exists(self._gem5_arch_path)
+        assert os.path.exists(self._isamain)
+        isafile = os.path.join(self._buildpath, 'isa/custom.isa')
+        self._writer.write(isafile, self._decoder)
+        # the isa parser reads the decoder of this build directory
+        isamain = os.path.join(self._buildpath, 'isa/main.isa')
+        self._writer.write(isamain, self.render_isamain())
 
-        # create a builddir
         gen_build_dir = os.path.join(self._buildpath, 'generated')
-        if not os.path.exists(gen_build_dir):
-            os.makedirs(gen_build_dir)
 
-        # add some paths to call the gem5 isa parser
-        sys.path[0:0] = [self._gem5_arch_path]
-        sys.path[0:0] = [self._gem5_ply_path]
-        sys.path[0:0] = [os.path.join(self._gem5_path, 'src/python')]
-        import isa_parser
+        if self._writer.plan:
+            # the isa parser reads custom.isa from disk
+            logger.info('Plan mode, isa_parser is not run')
+            return
+        self._writer.flush()
 
         logger.info('Let gem5 isa_parser generate decoder files')
-        parser = isa_parser.ISAParser(gen_build_dir)
-        parser.parse_isa_desc(self._isamain)
+        staging = tempfile.mkdtemp(dir=self._buildpath)
+        try:
+            self.isa_parser(staging, isamain)
+
+            for dirpath, _, files in os.walk(staging):
+                for file in files:
+                    path = os.path.join(dirpath, file)
+                    with open(path, 'r') as fh:
+                        content = fh.read()
+                    self._writer.write(
+                        os.path.join(gen_build_dir,
+                                     os.path.relpath(path, staging)),
+                        content)
+            self._writer.flush()
+        finally:
+            shutil.rmtree(staging)
+
+    def render_isamain(self):
+        '''
+        Return the main isa file of the build directory. It is the one
+        of the module, its includes are resolved relative to it, except
+        for custom.isa, which is included from the build directory.
+        '''
+        srcdir = os.path.dirname(self._isamain)
+        isafile = os.path.join(self._buildpath, 'isa/custom.isa')
+
+        def include(match):
+            path = match.group(1)
+            if os.path.basename(path) == 'custom.isa':
+                path = isafile
+            return '##include "{}"'.format(
+                os.path.normpath(os.path.join(srcdir, path)))
+
+        with open(self._isamain, 'r') as fh:
+            return re.sub(r'##include "([^"]+)"', include, fh.read())
+
+    def isa_parser(self, outdir, isamain):
+        '''
+        Run the gem5 isa parser in a separate process, it generates the
+        decoder files for the main isa file isamain into outdir.
+        '''
+        with profiling.span('isa_parser', 'subprocess'):
+            p = subprocess.Popen([sys.executable, '-c', ISA_PARSER,
+                                  self._gem5_path, isamain, outdir],
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+            out, err = p.communicate()
+
+        if out:
+            logger.debug(out.rstrip())
+        if p.returncode != 0:
+            logger.error(err.rstrip())
+            raise GeneratorError(
+                'isa_parser failed: {}'.format(
+                    err.strip().splitlines()[-1] if err.strip()
+                    else 'exit code {}'.format(p.returncode)))
 
     def patch_decoder(self):
         # patch the gem5 isa decoder
 
-        dec_templ = Template(r"""<%
-dfn = {}
-for model in models:
-    if model.opc in dfn:
-        dfn[model.opc].append(model)
-    else:
-        dfn[model.opc] = [model]
-for opc, mdls in dfn.items():
-    funct3 = {}
-    for mdl in mdls:
-        if mdl.form == 'I':
-            funct3[mdl.funct3] = mdl
-        else:
-            if mdl.funct3 in funct3:
-                funct3[mdl.funct3].append(mdl)
-            else:
-                funct3[mdl.funct3] = [mdl]
-    dfn[opc] = funct3
-%>\
-% for opc,funct3_dict in dfn.items():
-${hex(opc)}: decode FUNCT3 {
-% for funct3, val in funct3_dict.items():
-% if type(val) != list:
-${hex(funct3)}: I32Op::${val.name}({${val.definition}}, uint32_t, IntCustOp);
-% else:
-${hex(funct3)}: decode FUNCT7 {
-% for mdl in val:
-${hex(mdl.funct7)}: R32Op::${mdl.name}({${mdl.definition}}, IntCustOp);
-% endfor
-}
-% endif
-% endfor
-}
-% endfor""")
-
-        decoder_patch = dec_templ.render(models=self._exts.models)
+        dec_templ = template('decoder-patch.isa.mako')
+
+        decoder_patch = dec_templ.render(
+            models=sorted(self._exts.models,
+                          key=lambda x: (x.opc, x.funct3, x.funct7)))
 
         # for now: always choose rv32.isa
+        assert os.path.exists(self._isa_decoder)
         logger.info("Patch the gem5 isa file " + self._isa_decoder)
-        with open(self._isa_decoder, 'r') as fh:
-            content = fh.readlines()
+        content = self._writer.read(self._isa_decoder).splitlines(True)
 
         # if not existing
         # copy the old .isa file
         gem5_isa_old = self._isa_decoder + '_old'
-        if not os.path.exists(gem5_isa_old):
+        if not self._writer.exists(gem5_isa_old):
             logger.info('Copy original {}'.format(self._isa_decoder))
-            with open(gem5_isa_old, 'w') as fh:
-                data = ''.join(content)
-                fh.write(data)
+            self._writer.write(gem5_isa_old, ''.join(content))
 
         line = len(content) - 2
         content.insert(line, decoder_patch)
 
         # write back modified content
-        with open(self._isa_decoder, 'w') as fh:
-            content = ''.join(content)
-            fh.write(content)
+        self._writer.write(self._isa_decoder, ''.join(content))
 
     def create_FU_timings(self):
         '''
@@ -269,42 +278,19 @@ ${hex(mdl.funct7)}: R32Op::${mdl.name}({${mdl.definition}}, IntCustOp);
         every custom instruction.
         '''
 
-        assert os.path.exists(self._buildpath)
         logger.info("Create custom timing file for Minor CPU.")
-        timing_templ = Template(r"""<%
-%>\
-# === AUTO GENERATED FILE ===
-
-from m5.objects import *
-% for inst in insts:
+        timingfile = os.path.join(
+            self._buildpath, 'python/minor_custom_timings.py')
+        self._writer.write(timingfile, self.render_timings())
 
+    def render_timings(self):
+        '''
+        Return the timings of the custom instructions for the Minor CPU.
+        '''
+        timing_templ = template('minor_custom_timings.py.mako')
 
-class MinorFUTiming${inst.name.title()}(MinorFUTiming):
-    description = 'Custom${inst.name.title()}'
-    match = ${hex(inst.matchvalue)}
-    mask = ${hex(inst.maskvalue)}
-    srcRegsRelativeLats = [2]
-    extraCommitLat = ${inst.cycles - 1}
-% endfor
-
-
-custom_timings = [
-% for inst in insts:
-    MinorFUTiming${inst.name.title()}(),
-% endfor
-]
-""")
-
-        _FUtimings = timing_templ.render(insts=self._exts.instructions)
-
-        pythonbuildpath = os.path.join(self._buildpath, 'python')
-        if not os.path.exists(pythonbuildpath):
-            os.makedirs(pythonbuildpath)
-
-        timingfile = os.path.join(pythonbuildpath, 'minor_custom_timings.py')
-
-        with open(timingfile, 'w') as fh:
-            fh.write(_FUtimings)
+        with profiling.span('render timings', 'render'):
+            return timing_templ.render(insts=self._exts.instructions)
 
     def create_regsintr(self):
         '''
@@ -312,34 +298,20 @@ custom_timings = [
         custom registers within the execute function of the
         gem5 decoded instruction.
         '''
+        intrfile = os.path.join(self._buildpath, 'generated/regsintr.hh')
+        self._writer.write(intrfile, self.render_regsintr())
 
-        intr_templ = Template(r"""<%
-%>\
-// === AUTO GENERATED FILE ===
-
-#include <stdint.h>
-
-% for reg, addr in regmap.items():
-#define ${reg} ${hex(addr)}
-% endfor
-
-#define READ_CUSTOM_REG(reg) \
-({uint32_t val; \
-val = xc->readMiscReg(reg); \
-val;})
-
-#define WRITE_CUSTOM_REG(reg, val) \
-(xc->setMiscReg(reg,val))
-""")
-        intr = intr_templ.render(regmap=self._regs.regmap)
-
-        genpath = os.path.join(self._buildpath, 'generated')
-        if not os.path.exists(genpath):
-            os.makedirs(genpath)
+    def render_regsintr(self):
+        '''
+        Return the custom register access functions for gem5.
+        '''
+        intr_templ = template('regsintr.hh.mako')
+        with profiling.span('render regsintr.hh', 'render'):
+            return intr_templ.render(regmap=self._regs.regmap)
 
-        intrfile = os.path.join(genpath, 'regsintr.hh')
-        with open(intrfile, 'w') as fh:
-            fh.write(intr)
+    @property
+    def buildpath(self):
+        return self._buildpath
 
     @property
     def decoder(self):
@@ -349,6 +321,14 @@ val;})
     def extensions(self):
         return self._exts
 
+    @property
+    def isa_decoder(self):
+        return self._isa_decoder
+
     @property
     def regs(self):
         return self._regs
+
+    @property
+    def writer(self):
+        return self._writer
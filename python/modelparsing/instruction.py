@@ -64,9 +64,9 @@ class Instruction:
             # operands for Rd, Rs1, imm
             self._operands = 'd,s,j'
         else:
-            logger.warn('Instruction format unnokwn. ' +
-                        'Leaving operands field empty.')
-            self.operands = ''
+            logger.warning('Instruction format unnokwn. ' +
+                           'Leaving operands field empty.')
+            self._operands = ''
 
     @property
     def cycles(self):
@@ -0,0 +1,241 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import logging
+
+from . import libclang
+
+logger = logging.getLogger(__name__)
+
+# latency in cycles of the operators, comparable to a simple in-order core
+WEIGHTS = {
+    '+': 1, '-': 1, '&': 1, '|': 1, '^': 1, '~': 1, '!': 1,
+    '<<': 1, '>>': 1,
+    '==': 1, '!=': 1, '<': 1, '>': 1, '<=': 1, '>=': 1,
+    '&&': 1, '||': 1, '?': 1,
+    '*': 3,
+    '/': 20, '%': 20,
+}
+# latency of called functions, unknown ones are weighted with DEFAULT
+CALLS = {'READ_CUSTOM_REG': 1, 'WRITE_CUSTOM_REG': 1}
+DEFAULT = 1
+# latency and number of operations of the longest chain of dependent
+# operations, that leads to a value
+START = (0, 0)
+
+
+class Estimator:
+    '''
+    Estimate the latency of an instruction from the definition
+    of its model.
+
+    The operations of the definition are weighted by WEIGHTS and CALLS.
+    Following the data flow, the longest chain of dependent operations is
+    the critical path, its latency is the suggested cycle count.
+    Both branches of a condition are taken into account, loop bodies
+    are counted once.
+    '''
+
+    def __init__(self, source):
+        '''
+        Init method, that takes the source of the model file.
+        '''
+        self._source = source
+        # paths of the values of variables and custom registers
+        self._values = {}
+
+    def estimate(self, node):
+        '''
+        Estimate a function definition, given as its compound statement.
+        Returns the suggested cycle count and the depth of the
+        critical path.
+        '''
+        self._values = {}
+        self.statement(node)
+
+        latency, depth = max([START] + list(self._values.values()))
+        logger.debug('Critical path: {} cycles, {} operations'.format(
+            latency, depth))
+        return max(latency, 1), depth
+
+    def statement(self, node):
+        '''
+        Process a statement.
+        '''
+        CursorKind = libclang.cindex().CursorKind
+
+        if node.kind == CursorKind.IF_STMT:
+            children = list(node.get_children())
+            condition = self.expression(children[0])
+            before = dict(self._values)
+            branches = []
+            for branch in children[1:]:
+                self._values = dict(before)
+                self.statement(branch)
+                branches.append(self._values)
+            if len(branches) < 2:
+                branches.append(before)
+            self._values = self.merge(branches)
+            # values assigned in a branch are selected by the condition
+            for name, path in self._values.items():
+                if path is not before.get(name):
+                    self._values[name] = self.extend(max(path, condition),
+                                                     WEIGHTS['?'])
+        elif node.kind == CursorKind.DECL_STMT:
+            for decl in node.get_children():
+                children = [child for child in decl.get_children()
+                            if child.kind.is_expression()]
+                if children:
+                    self._values[decl.spelling] = self.expression(
+                        children[-1])
+        elif node.kind.is_expression():
+            self.expression(node)
+        else:
+            # compound statements, loops, ...
+            for child in node.get_children():
+                self.statement(child)
+
+    def expression(self, node):
+        '''
+        Process an expression. Returns the path of its value.
+        '''
+        CursorKind = libclang.cindex().CursorKind
+        children = list(node.get_children())
+
+        if node.kind == CursorKind.DECL_REF_EXPR:
+            return self._values.get(node.spelling, START)
+
+        if node.kind == CursorKind.BINARY_OPERATOR:
+            op = self.operator(node, children)
+            if op == '=':
+                path = self.expression(children[1])
+                self.assign(children[0], path)
+                return path
+            path = max(self.expression(child) for child in children)
+            return self.extend(path, WEIGHTS.get(op, DEFAULT))
+
+        if node.kind == CursorKind.COMPOUND_ASSIGNMENT_OPERATOR:
+            op = self.operator(node, children)[:-1]
+            path = max(self.expression(child) for child in children)
+            path = self.extend(path, WEIGHTS.get(op, DEFAULT))
+            self.assign(children[0], path)
+            return path
+
+        if node.kind == CursorKind.UNARY_OPERATOR:
+            op = self.operator(node, children)
+            path = self.expression(children[0])
+            if op in ('++', '--'):
+                path = self.extend(path, WEIGHTS['+'])
+                self.assign(children[0], path)
+                return path
+            if op in WEIGHTS:
+                return self.extend(path, WEIGHTS[op])
+            # e.g. unary plus, address of or dereference
+            return path
+
+        if node.kind == CursorKind.CONDITIONAL_OPERATOR:
+            path = max(self.expression(child) for child in children)
+            return self.extend(path, WEIGHTS['?'])
+
+        if node.kind == CursorKind.CALL_EXPR:
+            # the first child references the called function
+            args = [self.expression(child) for child in children[1:]]
+            name = node.spelling
+            register = None
+            if name in ('READ_CUSTOM_REG', 'WRITE_CUSTOM_REG') and args:
+                register = 'register ' + self.text(children[1])
+            if name == 'READ_CUSTOM_REG' and register is not None:
+                args.append(self._values.get(register, START))
+            path = self.extend(max([START] + args),
+                               CALLS.get(name, DEFAULT))
+            if name == 'WRITE_CUSTOM_REG' and register is not None:
+                self._values[register] = path
+            return path
+
+        # literals, casts, parentheses, ...
+        return max([START] + [self.expression(child) for child in children])
+
+    def assign(self, node, path):
+        '''
+        Assign a value to the variable referenced by node.
+        '''
+        CursorKind = libclang.cindex().CursorKind
+
+        # e.g. an element of an array is only a part of the variable
+        partial = node.kind != CursorKind.DECL_REF_EXPR
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.kind == CursorKind.DECL_REF_EXPR:
+                if partial and node.spelling in self._values:
+                    path = max(path, self._values[node.spelling])
+                self._values[node.spelling] = path
+                return
+            stack.extend(reversed(list(node.get_children())))
+
+    def extend(self, path, weight):
+        '''
+        Extend a path by an operation of the given weight.
+        '''
+        return (path[0] + weight, path[1] + 1)
+
+    def merge(self, branches):
+        '''
+        Merge the values of several branches, the longest path wins.
+        '''
+        values = {}
+        for branch in branches:
+            for name, path in branch.items():
+                if name not in values or path > values[name]:
+                    values[name] = path
+        return values
+
+    def operator(self, node, children):
+        '''
+        Return the spelling of the operator of an operator expression.
+        '''
+        start = node.extent.start.offset
+        end = node.extent.end.offset
+        if len(children) == 2:
+            # binary, between the operands
+            start = children[0].extent.end.offset
+            end = children[1].extent.start.offset
+        elif children[0].extent.start.offset > start:
+            # prefix
+            end = children[0].extent.start.offset
+        else:
+            # postfix
+            start = children[0].extent.end.offset
+        return self._source[start:end].strip()
+
+    def text(self, node):
+        '''
+        Return the source of a cursor.
+        '''
+        return self._source[node.extent.start.offset:
+                            node.extent.end.offset].strip()
@@ -0,0 +1,217 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import ctypes
+import fnmatch
+import glob
+import logging
+import os
+import re
+import subprocess
+import tempfile
+
+from .exceptions import LibraryError
+
+logger = logging.getLogger(__name__)
+
+# environment variable, that overrides the search for libclang
+ENV_LIBRARY = 'MODELPARSER_LIBCLANG'
+
+# locations that are searched, if llvm-config does not help
+SEARCH_PATHS = ['/usr/lib/llvm-*/lib',
+                '/usr/lib64/llvm',
+                '/usr/lib/x86_64-linux-gnu',
+                '/usr/lib64',
+                '/usr/lib',
+                '/usr/local/lib',
+                '/usr/local/opt/llvm/lib',
+                '/Library/Developer/CommandLineTools/usr/lib']
+
+# file names of libclang, libclang-cpp is a different library
+LIBRARY_NAMES = ['libclang.so', 'libclang-*.so', 'libclang.so.*',
+                 'libclang-*.so.*', 'libclang.dylib']
+EXCLUDED_NAMES = ['libclang-cpp*']
+
+# function of the C interface, that a usable libclang exports
+LIBRARY_SYMBOL = 'clang_getClangVersion'
+
+_cindex = None
+_library = None
+_is_from_main_file = None
+
+
+def cachefile():
+    '''
+    Small file, that remembers the libclang found by a previous search.
+    '''
+    cachehome = os.environ.get('XDG_CACHE_HOME',
+                               os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cachehome, 'riscv-custom-extension', 'libclang')
+
+
+def _version(path):
+    # sort key, that prefers the newest version
+    return [int(v) for v in re.findall(r'\d+', path)]
+
+
+def excluded(path):
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(name, pattern) for pattern in EXCLUDED_NAMES)
+
+
+def usable(path):
+    '''
+    Check, that path is a libclang, that can be loaded and exports the
+    C interface the bindings use.
+    '''
+    if excluded(path):
+        return False
+    try:
+        return hasattr(ctypes.CDLL(path), LIBRARY_SYMBOL)
+    except OSError as e:
+        logger.debug('Cannot load {}: {}'.format(path, e))
+        return False
+
+
+def find(libdir):
+    '''
+    Return the newest usable libclang in libdir or None.
+    '''
+    for name in LIBRARY_NAMES:
+        found = sorted(glob.glob(os.path.join(libdir, name)),
+                       key=_version, reverse=True)
+        for path in found:
+            if usable(path):
+                return path
+    return None
+
+
+def search():
+    '''
+    Search libclang using llvm-config and a list of common locations.
+    '''
+    dirs = []
+    try:
+        p = subprocess.Popen(['llvm-config', '--libdir'],
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             universal_newlines=True)
+        (out, _) = p.communicate()
+        if p.returncode == 0 and out.strip():
+            dirs.append(out.strip())
+    except OSError:
+        logger.debug('llvm-config not available')
+
+    for pattern in SEARCH_PATHS:
+        dirs.extend(sorted(glob.glob(pattern), key=_version, reverse=True))
+
+    for libdir in dirs:
+        path = find(libdir)
+        if path is not None:
+            return path
+    return None
+
+
+def library(cache=None):
+    '''
+    Return the path of the libclang to use. The environment variable
+    MODELPARSER_LIBCLANG takes precedence. Otherwise the result of a
+    previous search is taken from the cache file, or a new search is
+    started and its result is cached.
+    '''
+    global _library
+    if _library is not None:
+        return _library
+
+    if cache is None:
+        cache = cachefile()
+
+    path = os.environ.get(ENV_LIBRARY)
+    if path:
+        if not os.path.isfile(path):
+            raise LibraryError(path, 'libclang from {} not found.'.format(
+                ENV_LIBRARY))
+        _library = path
+        return _library
+
+    try:
+        with open(cache, 'r') as fh:
+            path = fh.read().strip()
+    except (IOError, OSError):
+        path = None
+
+    if not path or not os.path.isfile(path) or excluded(path):
+        logger.info('Search libclang')
+        path = search()
+        if path is None:
+            raise LibraryError(
+                'libclang not found. Set {} to its location.'.format(
+                    ENV_LIBRARY))
+        try:
+            if not os.path.exists(os.path.dirname(cache)):
+                os.makedirs(os.path.dirname(cache))
+            # other jobs may search at the same time
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache))
+            with os.fdopen(fd, 'w') as fh:
+                fh.write(path)
+            os.rename(tmp, cache)
+        except (IOError, OSError):
+            logger.debug('Could not cache libclang location')
+
+    _library = path
+    return _library
+
+
+def cindex():
+    '''
+    Return the clang.cindex module, configured to use the found libclang.
+    The bindings are imported on first use only.
+    '''
+    global _cindex
+    if _cindex is None:
+        import clang.cindex
+        path = library()
+        logger.info('Using libclang at {}'.format(path))
+        clang.cindex.Config.set_library_file(path)
+        _cindex = clang.cindex
+    return _cindex
+
+
+def in_main_file(cursor):
+    '''
+    Check whether a cursor is located in the main file of its translation
+    unit. This is much cheaper than comparing the file names.
+    '''
+    global _is_from_main_file
+    if _is_from_main_file is None:
+        cindex()
+        fn = _cindex.conf.lib.clang_Location_isFromMainFile
+        fn.argtypes = [_cindex.SourceLocation]
+        fn.restype = ctypes.c_int
+        _is_from_main_file = fn
+    return _is_from_main_file(cursor.location) != 0
@@ -0,0 +1,146 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# bump, whenever the layout of the lockfile changes
+LOCK_VERSION = 1
+
+# file name of the lockfile in the model directory
+LOCKFILE = 'encodings.lock'
+
+
+def encoding(model):
+    return {'form': model.form, 'opc': model.opc,
+            'funct3': model.funct3, 'funct7': model.funct7}
+
+
+class EncodingLock:
+    '''
+    Lockfile of the instruction encodings.
+
+    It records the name, encoding, mask, match and cycle count of every
+    instruction in the order, they were generated in. Later runs keep
+    that order: instructions of the lockfile keep their position, even
+    if their encoding changes, new ones are appended and removed ones
+    are dropped. So adding a model does not reorder the generated
+    tables and files of unchanged instructions stay byte-stable.
+    '''
+
+    def __init__(self, path):
+        self._path = os.path.abspath(path)
+        self._entries = []
+
+        try:
+            with open(self._path, 'r') as fh:
+                lock = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return
+        if lock.get('version') == LOCK_VERSION:
+            self._entries = lock.get('instructions', [])
+        else:
+            logger.warning('Ignore lockfile {} of version {}'.format(
+                self._path, lock.get('version')))
+
+    def order(self, models):
+        '''
+        Return the models in the order of the lockfile, models, that are
+        not locked yet, follow in their given order.
+        '''
+        position = dict((entry['name'], i)
+                        for i, entry in enumerate(self._entries))
+        locked = sorted([model for model in models
+                         if model.name in position],
+                        key=lambda model: position[model.name])
+        return locked + [model for model in models
+                         if model.name not in position]
+
+    def update(self, models, insts):
+        '''
+        Lock the given models with the instructions generated from them,
+        both in the same order. Returns the names of the added, changed
+        and removed instructions.
+        '''
+        previous = dict((entry['name'], entry) for entry in self._entries)
+        entries = []
+        added = []
+        changed = []
+        for model, inst in zip(models, insts):
+            entry = dict(encoding(model), name=model.name,
+                         mask=hex(inst.maskvalue), match=hex(inst.matchvalue),
+                         cycles=model.cycles)
+            old = previous.pop(model.name, None)
+            if old is None:
+                added.append(model.name)
+            elif old != entry:
+                same = all(old.get(key) == value
+                           for key, value in encoding(model).items())
+                if same and (old.get('mask'), old.get('match')) != \
+                        (entry['mask'], entry['match']):
+                    # same encoding, but riscv-opcodes assigns other values
+                    logger.warning('Mask or match of {} changed'.format(
+                        model.name))
+                changed.append(model.name)
+            entries.append(entry)
+        removed = sorted(previous)
+
+        for name in added:
+            logger.info('Lock new instruction {}'.format(name))
+        for name in changed:
+            logger.info('Lock changed instruction {}'.format(name))
+        for name in removed:
+            logger.info('Unlock removed instruction {}'.format(name))
+
+        self._entries = entries
+        return added, changed, removed
+
+    def dump(self):
+        '''
+        Return the content of the lockfile.
+        '''
+        return json.dumps({'version': LOCK_VERSION,
+                           'instructions': self._entries},
+                          indent=1, sort_keys=True) + '\n'
+
+    def entry(self, name):
+        for entry in self._entries:
+            if entry['name'] == name:
+                return entry
+        return None
+
+    @property
+    def entries(self):
+        return self._entries
+
+    @property
+    def path(self):
+        return self._path
@@ -0,0 +1,132 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import contextlib
+import errno
+import fcntl
+import logging
+import os
+import time
+
+from .exceptions import LockError
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    '''
+    Advisory lock of a shared directory, e.g. the toolchain or a build
+    directory, so modelparser jobs running at the same time on one host
+    do not modify it concurrently. The directory itself is locked with
+    flock, no lock file is created. A missing directory is created.
+    The lock is released, if the process dies.
+
+    Without timeout, acquire waits until the lock is free, otherwise
+    LockError is raised after timeout seconds.
+    '''
+
+    def __init__(self, path, timeout=None, interval=0.05):
+        self._path = os.path.abspath(path)
+        self._timeout = timeout
+        self._interval = interval
+        self._fd = None
+
+    def acquire(self):
+        if not os.path.exists(self._path):
+            try:
+                os.makedirs(self._path)
+            except OSError as e:
+                # created concurrently
+                if e.errno != errno.EEXIST:
+                    raise
+        fd = os.open(self._path, os.O_RDONLY)
+        start = time.time()
+        waiting = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except IOError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    os.close(fd)
+                    raise
+            if not waiting:
+                logger.info('Wait for the lock of {}'.format(self._path))
+                waiting = True
+            if (self._timeout is not None and
+                    time.time() - start >= self._timeout):
+                os.close(fd)
+                raise LockError('{} is locked by another job'.format(
+                    self._path))
+            time.sleep(self._interval)
+        self._fd = fd
+        logger.debug('Locked {}'.format(self._path))
+
+    def release(self):
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+        logger.debug('Unlocked {}'.format(self._path))
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @property
+    def locked(self):
+        return self._fd is not None
+
+    @property
+    def path(self):
+        return self._path
+
+
+@contextlib.contextmanager
+def locked(paths, timeout=None):
+    '''
+    Hold the locks of the given directories. None is ignored. The locks
+    are acquired in a fixed order, so jobs, that lock overlapping sets
+    of directories, do not deadlock.
+    '''
+    paths = sorted(set(os.path.abspath(path) for path in paths
+                       if path is not None))
+    locks = []
+    try:
+        for path in paths:
+            lock = FileLock(path, timeout)
+            lock.acquire()
+            locks.append(lock)
+        yield locks
+    finally:
+        for lock in reversed(locks):
+            lock.release()
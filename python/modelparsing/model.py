@@ -26,27 +26,456 @@
 #
 # Authors: Robert Scheffel
 
-import clang.cindex
 import logging
+import os
+import re
+import shutil
 import subprocess
+import tempfile
 
-from exceptions import ConsistencyError
+from . import effects
+from . import frontend
+from . import libclang
+from . import profiling
+from .cache import INCLUDE
+from .exceptions import ConsistencyError
+from .exceptions import FrontendError
+from .latency import Estimator
 
 logger = logging.getLogger(__name__)
 
+# flags used to check the model with g++ in strict mode
+COMPILE_ARGS = ['g++', '-fsyntax-only', '-Wall', '-std=c++11', '-c']
+# flags used to parse the model with libclang
+PARSE_ARGS = ['-x', 'c++', '-c', '-std=c++11', '-Wall']
+
+# first token of a declaration, that starts with a digit
+VALUE = re.compile(r'\b(\d\w*)')
+# annotation, that marks a function as instruction
+ANNOTATION = re.compile(r'\s*instruction\s*:(.*)$')
+# variables and annotation fields, that define encoding and latency
+ENCODING = ('opc', 'funct3', 'funct7', 'cycles')
+# sources of the cycle count used for the timing of an instruction
+TIMINGS = ('declared', 'estimated')
+
+
+def libclang_version():
+    '''
+    Identify the used libclang, so cached results of another
+    library are not reused.
+    '''
+    lib = libclang.library()
+    try:
+        st = os.stat(lib)
+    except (OSError, TypeError):
+        return str(lib)
+    return '{}:{}:{}'.format(lib, st.st_size, int(st.st_mtime))
+
+
+class ModelFile:
+    '''
+    A file containing the C++ reference of one or more custom
+    instructions.
+
+    Usually, the first function of the file is the instruction and the
+    variables opc, funct3, funct7 and cycles define its encoding and
+    latency. If that function is annotated with
+
+        __attribute__((annotate("instruction: opc=0x02, funct3=0x1")))
+
+    every annotated function of the file is an instruction. Values
+    missing in an annotation are taken from the variables of the file.
+    '''
+
+    def __init__(self, impl, cache=None, strict=False, pch=None,
+                 fast=False, source=None, headers=None):
+        '''
+        Init method, that takes the location of the file.
+        An optional ModelCache is used to skip compiling and parsing
+        of unchanged files.
+        The file is validated using the diagnostics of libclang. In strict
+        mode, it is compiled with g++ instead.
+        If a PrecompiledHeader is given, libclang uses it for the
+        shared includes.
+        With fast set, the file is parsed by the pure Python front-end.
+        If that one does not understand the file, libclang is used.
+        If source is given, it is the content of the file, which does not
+        have to exist then. Headers maps the paths of further files, that
+        the source includes, to their content. Nothing is read from disk
+        and no cache is used in that case.
+        '''
+        self._impl = impl
+        self._source = source
+        self._headers = headers or {}
+        # information extracted for each instruction, see Model.to_dict
+        self._entries = []
+
+        with profiling.span(os.path.basename(impl), 'model', file=impl):
+            self.load(cache, strict, pch, fast)
+
+    def load(self, cache, strict, pch, fast):
+        '''
+        Extract the information of the file, see __init__.
+        '''
+        impl = self._impl
+
+        if fast:
+            # parsing is cheaper than hashing, so no cache is used
+            try:
+                with profiling.span('frontend', 'parse'):
+                    if self._source is not None:
+                        entry = frontend.Frontend(
+                            self._source,
+                            list(self._headers.values())).parse()
+                    else:
+                        entry = frontend.parse(impl)
+            except FrontendError as e:
+                logger.info('Fast front-end failed for {}: {}'.format(
+                    impl, e))
+            else:
+                logger.info("Model @ %s parsed by fast front-end" % impl)
+                self._entries = [entry]
+                return
+
+        if pch is not None and not pch.build():
+            pch = None
+        args = PARSE_ARGS + (pch.args if pch is not None else [])
+
+        key = None
+        if cache is not None and self._source is None:
+            salt = [libclang_version()] + args
+            if strict:
+                salt += COMPILE_ARGS
+            key = cache.key(impl, *salt)
+            entries = cache.load(key)
+            if entries is not None:
+                logger.info("Model @ %s loaded from cache" % impl)
+                self._entries = entries
+                return
+
+        cindex = libclang.cindex()
+
+        if strict:
+            self.compile_model(impl)
+
+        with profiling.span('libclang', 'parse'):
+            index = cindex.Index.create()
+            if self._source is None:
+                tu = index.parse(impl, args)
+            else:
+                tu = index.parse(impl, args, unsaved_files=self.unsaved())
+
+        if not strict:
+            self.check_diagnostics(tu)
+
+        logger.info("Parsing model @ %s" % impl)
+
+        with profiling.span('traverse', 'parse'):
+            self.parse_model(tu)
+        # the extracted information is cached, not the result of the
+        # checks, those are cheap and redone on every load
+        if key is not None:
+            cache.store(key, self._entries)
+
+    def unsaved(self):
+        '''
+        Return the source and the headers as unsaved files for libclang.
+        libclang looks up an include like "../registers.hh" without
+        normalizing the path, which fails for a directory, that does not
+        exist. So headers are given under the included path as well.
+        '''
+        files = dict((os.path.normpath(path), content)
+                     for path, content in self._headers.items())
+        files[os.path.normpath(self._impl)] = self._source
+        unsaved = dict(files)
+        for path, content in files.items():
+            for include in INCLUDE.findall(content):
+                spelled = os.path.join(os.path.dirname(path), include)
+                if os.path.normpath(spelled) in files:
+                    unsaved[spelled] = files[os.path.normpath(spelled)]
+        unsaved[self._impl] = self._source
+        return sorted(unsaved.items())
+
+    def compile_model(self, file):
+        logger.info('Compile model {}'.format(file))
+        if self._source is None:
+            self.compile(file, file)
+            return
+
+        # g++ reads the includes of a source from disk, so the source
+        # and its headers are written to a temporary directory, at
+        # their paths below it
+        tmpdir = tempfile.mkdtemp()
+        try:
+            files = [(file, self._source)] + list(self._headers.items())
+            for path, content in files:
+                local = os.path.join(tmpdir,
+                                     os.path.abspath(path).lstrip(os.sep))
+                if not os.path.isdir(os.path.dirname(local)):
+                    os.makedirs(os.path.dirname(local))
+                with open(local, 'w') as fh:
+                    fh.write(content)
+            self.compile(file, os.path.join(
+                tmpdir, os.path.abspath(file).lstrip(os.sep)))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def compile(self, file, path):
+        '''
+        Compile the model file, that is located at path, with g++.
+        '''
+        with profiling.span('g++', 'subprocess'):
+            p = subprocess.Popen(COMPILE_ARGS + [path],
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+            (_, ret) = p.communicate()
+
+        if ret:
+            logger.error(ret)
+            raise ConsistencyError(file, 'Compile error.')
+
+    def check_diagnostics(self, tu):
+        '''
+        Validate the model using the diagnostics libclang emitted while
+        parsing it. As for the compilation with g++, warnings are
+        treated like errors.
+        '''
+        logger.info('Check diagnostics of model {}'.format(tu.spelling))
+        diags = [diag for diag in tu.diagnostics
+                 if diag.severity >= libclang.cindex().Diagnostic.Warning]
+
+        for diag in diags:
+            logger.error('{}:{}:{}: {}'.format(
+                diag.location.file, diag.location.line,
+                diag.location.column, diag.spelling))
+
+        if diags:
+            raise ConsistencyError(tu.spelling, 'Compile error.')
+
+    def parse_model(self, tu):
+        '''
+        Parse the file and search for all necessary information.
+        Only cursors located in the file itself are visited, the
+        contents of included headers are skipped. The tree is traversed
+        iteratively. For a file with a single instruction, the traversal
+        stops as soon as everything was found.
+        '''
+        mainfile = tu.spelling
+        # read the source once, definitions and values are sliced from it
+        source = self._source
+        if source is None:
+            with open(mainfile, 'r') as fh:
+                source = fh.read()
+
+        # values of the variables opc, funct3, funct7 and cycles
+        variables = {}
+        # information about each function in order of appearance
+        functions = []
+
+        stack = [(child, None) for child in tu.cursor.get_children()
+                 if libclang.in_main_file(child)]
+        stack.reverse()
+
+        while stack:
+            if (functions and not self.annotated(functions[0]) and
+                    'dfn' in functions[0] and
+                    set(ENCODING) <= set(variables)):
+                break
+            node, function = stack.pop()
+            children = self.visit(node, function, source,
+                                  variables, functions)
+            children.reverse()
+            stack.extend(children)
+
+        if functions and self.annotated(functions[0]):
+            instructions = [function for function in functions
+                            if self.annotated(function)]
+        else:
+            # the first function is the instruction
+            instructions = functions[:1] or [{}]
+
+        self._entries = []
+        for function in instructions:
+            entry = dict(variables)
+            entry.update(function)
+            entry.update(entry.pop('encoding', {}))
+            self._entries.append(entry)
+
+    def visit(self, node, function, source, variables, functions):
+        '''
+        Process a single cursor. Found information is added to variables
+        or to the entry of the enclosing function in functions.
+        Returns the children of the cursor, that have to be visited,
+        together with their enclosing function.
+        '''
+        CursorKind = libclang.cindex().CursorKind
+
+        if node.kind == CursorKind.FUNCTION_DECL:
+            # a later definition of a previously declared function
+            # extends the information of the declaration
+            for function in functions:
+                if function['name'] == node.spelling:
+                    break
+            else:
+                function = {'name': node.spelling,
+                            # save rettype for consistency check
+                            'rettype': node.result_type.spelling}
+                functions.append(function)
+                logger.info("Function name: {}".format(node.spelling))
+
+            children = list(node.get_children())
+            for child in children:
+                if child.kind == CursorKind.ANNOTATE_ATTR:
+                    encoding = self.extract_annotation(child)
+                    if encoding is not None:
+                        function.setdefault('encoding', {}).update(encoding)
+
+            # in a file without annotations, only the first function
+            # is of interest
+            if (function is not functions[0] and
+                    not self.annotated(functions[0])):
+                return []
+            return [(child, function) for child in children]
+
+        if function is not None:
+            # information about a function
+            if node.kind == CursorKind.COMPOUND_STMT:
+                function['dfn'] = self.extract_definition(node, source)
+                cycles, depth = Estimator(source).estimate(node)
+                function['estimated_cycles'] = cycles
+                function['critical_path'] = depth
+            elif node.kind == CursorKind.PARM_DECL:
+                function.update(self.extract_parameter(node))
+            return []
+
+        if node.kind == CursorKind.VAR_DECL:
+            # process all variable declarations
+            if node.spelling in ENCODING:
+                logger.debug('Model {}:'.format(node.spelling))
+                variables[node.spelling] = self.extract_value(node, source)
+            return []
+
+        # e.g. namespaces or linkage specifications
+        return [(child, None) for child in node.get_children()]
+
+    def annotated(self, function):
+        '''
+        Whether a function is annotated as instruction.
+        '''
+        return 'encoding' in function
+
+    def extract_annotation(self, node):
+        '''
+        Extract the encoding of an instruction annotation.
+        Returns None for other annotations.
+        '''
+        match = ANNOTATION.match(node.spelling)
+        if not match:
+            return None
+
+        encoding = {}
+        for field in match.group(1).split(','):
+            if not field.strip():
+                continue
+            name, _, value = field.partition('=')
+            name = name.strip()
+            if name not in ENCODING or not value.strip():
+                raise ConsistencyError(
+                    node.spelling, 'Invalid instruction annotation.')
+            try:
+                encoding[name] = int(value.strip(), 0)
+            except ValueError:
+                raise ConsistencyError(
+                    node.spelling, 'Invalid instruction annotation.')
+
+        logger.debug('Annotation: {}'.format(encoding))
+        return encoding
+
+    def extract_definition(self, node, source):
+        '''
+        Extract a function definition.
+        '''
+        dfn = source[node.extent.start.offset: node.extent.end.offset]
+
+        logger.info("Definintion in {} @ line {}".format(
+            node.location.file.name, node.location.line))
+        logger.debug('Definition:\n%s' % dfn)
+        return dfn
+
+    def extract_parameter(self, node):
+        '''
+        Extract the information given by a function parameter.
+        '''
+        info = {}
+        # check if Rd and Rs1 exists
+        if node.spelling.startswith('Rd'):
+            info['check_rd'] = True
+        if node.spelling.startswith('Rs1'):
+            info['check_rs1'] = True
+
+        # determine, if function is R-Type or I-Type
+        if node.spelling.startswith('Rs2'):
+            logger.debug('Model is of format R-Type')
+            info['form'] = 'R'
+            info['check_op2'] = True
+        if node.spelling.startswith('imm'):
+            logger.debug('Model is of format I-Type')
+            info['form'] = 'I'
+            info['check_op2'] = True
+        return info
+
+    def extract_value(self, node, source):
+        '''
+        Extract a variable value.
+        '''
+        match = VALUE.search(
+            source[node.extent.start.offset: node.extent.end.offset])
+        if match:
+            logger.debug('Value: %s' % match.group(1))
+            return int(match.group(1), 0)
+
+    def models(self, timing='declared'):
+        '''
+        Return a Model for each instruction of the file.
+        '''
+        return [Model(entry=entry, timing=timing) for entry in self._entries]
+
+    @property
+    def entries(self):
+        return self._entries
+
 
 class Model:
     '''
     C++ Reference of the custom instruction.
     '''
 
-    def __init__(self, impl=None, read=False, write=False):
+    # attributes, that hold the information extracted from a model
+    _state = ('_cycles', '_dfn', '_form', '_funct3', '_funct7', '_name',
+              '_opc', '_check_rd', '_check_rs1', '_check_op2', '_rettype',
+              '_estimated_cycles', '_critical_path')
+
+    def __init__(self, impl=None, read=False, write=False, cache=None,
+                 strict=False, pch=None, fast=False, entry=None,
+                 timing='declared'):
         '''
         Init method, that takes the location of
         the implementation as an argument.
+        The file is parsed by ModelFile, see there for the remaining
+        arguments. If the file defines more than one instruction, only
+        the first one is used, ModelFile.models returns all of them.
+        Alternatively, the information can be given as entry, a
+        dictionary as returned by to_dict.
+        The timing selects, whether the declared or the estimated cycle
+        count is returned by cycles.
         '''
 
-        if impl is None:
+        if timing not in TIMINGS:
+            raise ValueError(timing, 'Invalid timing.')
+        self._timing = timing
+
+        if impl is None and entry is None:
             # we generate a model for read and write
             self._cycles = 1
             self._form = 'R'
@@ -57,16 +486,24 @@ class Model:
             self._check_rs1 = True     # check if rs1 is defined
             self._check_op2 = True
             self._rettype = 'void'
+            # a single custom register access
+            self._estimated_cycles = 1
+            self._critical_path = 1
+            # accessed custom registers, the register is given by Rs2
+            self._reads = ()
+            self._writes = ()
 
             if read is True:
                 self._funct7 = 0x7e
                 self._name = 'read_custreg'
+                self._reads = (effects.DYNAMIC,)
                 self._dfn = '''{
     Rd = xc->readMiscReg(Rs2);
 }'''
             elif write is True:
                 self._funct7 = 0x7f
                 self._name = 'write_custreg'
+                self._writes = (effects.DYNAMIC,)
                 self._dfn = '''{
     xc->setMiscReg(Rs2, Rs1);
 }'''
@@ -77,14 +514,6 @@ class Model:
             self.check_consistency()
 
         else:
-            logger.info("Using libclang at %s" %
-                        clang.cindex.Config.library_file)
-
-            self.compile_model(impl)
-
-            index = clang.cindex.Index.create()
-            tu = index.parse(impl, ['-x', 'c++', '-c', '-std=c++11'])
-
             # information to retrieve form model
             self._cycles = 1            # cycle count for the instruction
             self._dfn = ''              # definition
@@ -98,108 +527,31 @@ class Model:
             self._check_rs1 = False     # check if rs1 is defined
             self._check_op2 = False
             self._rettype = ''
-
-            logger.info("Parsing model @ %s" % impl)
-
-            self.parse_model(tu.cursor)
+            # latency estimation, not available with the fast front-end
+            self._estimated_cycles = None
+            self._critical_path = None
+
+            if entry is None:
+                entry = ModelFile(impl, cache, strict, pch, fast).entries[0]
+            self.from_dict(entry)
+            # custom registers accessed by the definition
+            self._reads, self._writes = effects.custom_registers(self._dfn)
             self.check_consistency()
 
-    def compile_model(self, file):
-        logger.info('Compile model {}'.format(file))
-        p = subprocess.Popen([r'g++',
-                              '-fsyntax-only',
-                              '-Wall',
-                              '-std=c++11',
-                              '-c',
-                              file],
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-        (_, ret) = p.communicate()
-
-        if ret:
-            logger.error(ret)
-            raise ConsistencyError(file, 'Compile error.')
-
-    def parse_model(self, node):
+    def to_dict(self):
         '''
-        Parse the model and search for all necessary information.
+        Return the extracted information as a dictionary.
         '''
-        for child in node.get_children():
-            self.parse_model(child)
+        return dict((attr[1:], getattr(self, attr)) for attr in self._state)
 
-        # only set name if it's unset
-        # due to parsing of included header the function definition occures
-        # twice
-        if node.kind == clang.cindex.CursorKind.FUNCTION_DECL \
-                and self._name == '':
-            # save name
-            self._name = node.spelling
-            # save rettype for consistency check
-            self._rettype = list(node.get_tokens())[0].spelling
-            logger.info("Function name: {}".format(self._name))
-
-        if node.kind == clang.cindex.CursorKind.COMPOUND_STMT:
-            self.extract_definition(node)
-
-        if node.kind == clang.cindex.CursorKind.VAR_DECL:
-            # process all variable declarations
-            # opcode
-            if node.spelling == 'opc':
-                logger.debug('Model opcode:')
-                self._opc = self.extract_value(node)
-            # funct3 bitfield
-            if node.spelling == 'funct3':
-                logger.debug('Model funct3:')
-                self._funct3 = self.extract_value(node)
-            # funct7 bitfield, only for R-Type
-            if node.spelling == 'funct7':
-                logger.debug('Model funct7:')
-                self._funct7 = self.extract_value(node)
-            # cycle count
-            if node.spelling == 'cycles':
-                logger.debug('Model cycles:')
-                self._cycles = self.extract_value(node)
-
-        if node.kind == clang.cindex.CursorKind.PARM_DECL:
-            # process all parameter declarations
-            # check if Rd and Rs1 exists
-            if node.spelling.startswith('Rd'):
-                self._check_rd = True
-            if node.spelling.startswith('Rs1'):
-                self._check_rs1 = True
-
-            # determine, if function is R-Type or I-Type
-            if node.spelling.startswith('Rs2'):
-                logger.debug('Model is of format R-Type')
-                self._form = 'R'
-                self._check_op2 = True
-            if node.spelling.startswith('imm'):
-                logger.debug('Model is of format I-Type')
-                self._form = 'I'
-                self._check_op2 = True
-
-    def extract_definition(self, node):
+    def from_dict(self, entry):
         '''
-        Extract a function definition.
-        '''
-        filename = node.location.file.name
-        with open(filename, 'r') as fh:
-            contents = fh.read()
-
-        self._dfn = contents[node.extent.start.offset: node.extent.end.offset]
-
-        logger.info("Definintion in {} @ line {}".format(
-            filename, node.location.line))
-        logger.debug('Definition:\n%s' % self._dfn)
-
-    def extract_value(self, node):
-        '''
-        Extract a variable value.
+        Set the extracted information from a dictionary,
+        as returned by to_dict. Missing entries are left untouched.
         '''
-        for entry in list(node.get_tokens()):
-            if entry.spelling[0].isdigit():
-                logger.debug('Value: %s' % entry.spelling)
-                return int(entry.spelling, 0)
+        for attr in self._state:
+            if attr[1:] in entry:
+                setattr(self, attr, entry[attr[1:]])
 
     def check_consistency(self):
         '''
@@ -250,14 +602,28 @@ class Model:
 
         logger.info('Model meets requirements')
 
+    @property
+    def critical_path(self):
+        return self._critical_path
+
     @property
     def cycles(self):
+        if self._timing == 'estimated' and self._estimated_cycles is not None:
+            return self._estimated_cycles
+        return self._cycles
+
+    @property
+    def declared_cycles(self):
         return self._cycles
 
     @property
     def definition(self):
         return self._dfn
 
+    @property
+    def estimated_cycles(self):
+        return self._estimated_cycles
+
     @property
     def form(self):
         return self._form
@@ -277,3 +643,19 @@ class Model:
     @property
     def opc(self):
         return self._opc
+
+    @property
+    def pure(self):
+        '''
+        Whether the instruction accesses no custom register,
+        its result only depends on its operands.
+        '''
+        return not self._reads and not self._writes
+
+    @property
+    def reads(self):
+        return self._reads
+
+    @property
+    def writes(self):
+        return self._writes
@@ -0,0 +1,152 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import logging
+import threading
+import time
+
+from .exceptions import StageError
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    '''
+    A stage of the orchestrator and the timing of its last run.
+    '''
+
+    def __init__(self, name, function):
+        self._name = name
+        self._function = function
+        self._start = None
+        self._end = None
+        self._error = None
+
+    def run(self):
+        self._start = time.time()
+        try:
+            self._function()
+        except Exception as e:
+            logger.error('Stage {} failed: {}'.format(self._name, e))
+            self._error = e
+        finally:
+            self._end = time.time()
+
+    @property
+    def duration(self):
+        return self._end - self._start
+
+    @property
+    def end(self):
+        return self._end
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def start(self):
+        return self._start
+
+
+class Orchestrator:
+    '''
+    Runs independent stages concurrently, one thread per stage.
+
+    All stages run to their end, even if one of them fails. The errors
+    are collected and raised together as StageError. The stages have to
+    be independent of each other, except for shared objects, that are
+    safe to be used by more than one thread.
+    '''
+
+    def __init__(self):
+        self._stages = []
+        self._start = None
+        self._end = None
+
+    def add(self, name, function):
+        '''
+        Add a stage, function is called without arguments.
+        '''
+        self._stages.append(Stage(name, function))
+
+    def run(self):
+        '''
+        Run all stages and wait for them.
+        '''
+        self._start = time.time()
+        if len(self._stages) == 1:
+            self._stages[0].run()
+        else:
+            threads = [threading.Thread(target=stage.run, name=stage.name)
+                       for stage in self._stages]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self._end = time.time()
+        logger.info('Stages done\n{}'.format(self.timeline()))
+
+        errors = [(stage.name, stage.error) for stage in self._stages
+                  if stage.error is not None]
+        if errors:
+            raise StageError(errors)
+
+    def timeline(self):
+        '''
+        Return a table of the stages with their start and end relative
+        to the start of the run.
+        '''
+        fmt = '{:<20} {:>9} {:>9} {:>9} {:>7}'
+        lines = [fmt.format('stage', 'start ms', 'end ms', 'wall ms',
+                            'status')]
+        for stage in self._stages:
+            if stage.start is None:
+                lines.append(fmt.format(stage.name, '-', '-', '-', 'pending'))
+                continue
+            lines.append(fmt.format(
+                stage.name,
+                '{:.1f}'.format((stage.start - self._start) * 1000),
+                '{:.1f}'.format((stage.end - self._start) * 1000),
+                '{:.1f}'.format(stage.duration * 1000),
+                'failed' if stage.error is not None else 'ok'))
+        if self._end is not None:
+            total = (self._end - self._start) * 1000
+            serial = sum(stage.duration for stage in self._stages
+                         if stage.start is not None) * 1000
+            lines.append('total {:.1f} ms, sum of stages {:.1f} ms'.format(
+                total, serial))
+        return '\n'.join(lines)
+
+    @property
+    def stages(self):
+        return self._stages
@@ -27,43 +27,187 @@
 # Authors: Robert Scheffel
 
 import logging
+import multiprocessing
 import os
 
 from stat import *
 
-from compiler import Compiler
-from extensions import Extensions
-from gem5 import Gem5
-from model import Model
-from registers import Registers
+from . import profiling
+from .cache import ModelCache
+from .cache import includes
+from .compiler import Compiler
+from .depgraph import ARTIFACTS
+from .depgraph import DependencyGraph
+from .exceptions import ParseError
+from .export import MANIFEST_BIN
+from .export import MANIFEST_JSON
+from .export import dumps
+from .export import manifest
+from .export import pack
+from .extensions import Extensions
+from .gem5 import Gem5
+from .lockfile import LOCKFILE
+from .lockfile import EncodingLock
+from .locking import locked
+from .model import Model
+from .model import ModelFile
+from .orchestrator import Orchestrator
+from .pch import PrecompiledHeader
+from .registers import Registers
+from .store import ArtifactStore
+from .store import generator
+from .writer import FileWriter
 
 logger = logging.getLogger(__name__)
 
 
+def discover(top):
+    '''
+    Search top for model definitions and register files.
+    The files are returned in a deterministic order.
+    '''
+    models = []
+    regfiles = []
+
+    logger.info('Search for models in {}'.format(top))
+    content = sorted(os.listdir(top))
+    logger.debug('Directory content: {}'.format(content))
+    for file in content:
+        pathname = os.path.join(top, file)
+        mode = os.stat(pathname)[ST_MODE]
+
+        if S_ISDIR(mode):
+            # directory
+            submodels, subregfiles = discover(pathname)
+            models.extend(submodels)
+            regfiles.extend(subregfiles)
+        elif S_ISREG(mode):
+            # file
+            if pathname.endswith('.cc'):
+                logger.info(
+                    'Model definition in file {}'.format(pathname))
+                models.append(pathname)
+            # registers
+            if pathname.endswith('registers.hh'):
+                regfiles.append(pathname)
+        else:
+            # unknown file type
+            logger.info('Unknown file type, skip')
+
+    return models, regfiles
+
+
+def _parse_model(args):
+    '''
+    Parse a single model file in a worker process.
+    Errors are returned instead of raised, to collect them in the parent.
+    '''
+    pathname, options, timing = args
+    profiler = profiling.profiler()
+    mark = profiler.mark() if profiler is not None else 0
+    try:
+        result = ModelFile(pathname, **options).models(timing), None
+    except Exception as e:
+        result = None, e
+    # spans recorded in the worker are merged by the parent
+    spans = profiler.collect(mark) if profiler is not None else []
+    return result + (spans,)
+
+
 class Parser:
     '''
     This class stepwise calls all the functions necessary to parse modules
     and retrieve the information necessary to extend gnu binutils and gem5.
+
+    Parsers of several configurations can share the cache and the parsed
+    models, by passing a ModelCache as cache and the same dictionary as
+    parsed. The build state is kept in buildpath.
+    Generated artifacts are kept in an ArtifactStore, so they are put
+    back in place instead of being generated again, when switching back
+    to models, that were built before.
+    Jobs, that run at the same time, lock the toolchain, the build
+    directory and the model directory, while they generate files into
+    them. Without timeout, a job waits until it gets the lock.
     '''
 
-    def __init__(self, tcpath, modelpath):
-        self._compiler = Compiler(None, None, tcpath)
-        self._gem5 = Gem5([], None)
+    def __init__(self, tcpath, modelpath, cache=True, jobs=1, strict=False,
+                 pch=True, fast=False, timing='declared', force=False,
+                 plan=False, buildpath=None, parsed=None, store=True,
+                 timeout=None):
+        self._buildpath = buildpath
+        if buildpath is None:
+            self._buildpath = os.path.join(
+                os.path.dirname(os.path.realpath(__file__)), '../../build')
+        # artifacts are only generated, if their inputs changed
+        self._deps = DependencyGraph(
+            os.path.join(self._buildpath, 'deps.json'))
+        self._force = force
+        # generated files are only written, if their content changes,
+        # in plan mode they are not written at all
+        self._writer = FileWriter(
+            os.path.join(self._buildpath, 'outputs.json'), plan, defer=True)
+        # input files of the generated artifacts
+        self._modelfiles = []
+        self._regfiles = []
+        self._cache = None
+        if isinstance(cache, ModelCache):
+            self._cache = cache
+        elif cache:
+            # in plan mode, nothing is written into the build directory
+            self._cache = ModelCache(os.path.join(self._buildpath, 'cache'),
+                                     readonly=plan)
+        if timing == 'estimated' and fast:
+            # the fast front-end does not estimate the latency
+            logger.info('Estimated timing, fast front-end disabled')
+            fast = False
+        # options every model is created with
+        self._options = {'cache': self._cache, 'strict': strict,
+                         'fast': fast}
+        self._timing = timing
+        self._pch = pch
+        self._store = None
+        if isinstance(store, ArtifactStore):
+            self._store = store
+        elif store:
+            self._store = ArtifactStore()
+        # digest of the generators, computed once
+        self._generator = None
+        # files put in place from the store
+        self._activated = []
+        # seconds to wait for the lock of a shared directory
+        self._timeout = timeout
+        self._compiler = Compiler(None, None, tcpath, self._writer)
+        self._gem5 = Gem5([], None, self._writer, self._buildpath)
         self._exts = None
+        self._jobs = jobs
         self._models = []
+        # models of the files parsed by this process, together with the
+        # modification times of the files, to parse them only once
+        self._parsed = parsed if parsed is not None else {}
         self._regs = Registers()
         self._modelpath = modelpath
         self._tcpath = tcpath
 
+    @profiling.profiled('restore')
     def restore(self):
         '''
         Restore the toolchain to its defaults.
         '''
 
         logger.info('Remove custom instructions from GNU binutils files')
-        self._compiler.restore()
-        self._gem5.restore()
+        decoder = os.path.dirname(self._gem5.isa_decoder)
+        with self.locked(self._tcpath, self._buildpath,
+                         decoder if os.path.isdir(decoder) else None):
+            self._compiler.restore()
+            # the toolchain is restored, even if gem5 can not be
+            try:
+                self._gem5.restore()
+            finally:
+                if not self._writer.plan:
+                    self._writer.flush()
+                    self._deps.invalidate()
 
+    @profiling.profiled('parse models')
     def parse_models(self):
         '''
         Parse the c++ reference implementation
@@ -72,66 +216,402 @@ class Parser:
 
         logger.info('Determine if modelpath is a folder or a single file')
         if os.path.isdir(self._modelpath):
-            # restore the toolchain to its defaults
-            self.restore()
             logger.info('Traverse over directory')
             self.treewalk(self._modelpath)
         else:
             logger.info('Single file, start parsing')
-            model = Model(self._modelpath)
-            self._models.append(model)
+            self._models.extend(self.parse_files([self._modelpath]))
+            self._modelfiles = includes(self._modelpath)
 
         # add model for read function
         self._models.append(Model(read=True))
         # add model for write function
         self._models.append(Model(write=True))
 
-        self._exts = Extensions(self._models)
-        self._compiler = Compiler(self._exts, self._regs, self._tcpath)
-        self._gem5 = Gem5(self._exts, self._regs)
+        # the instructions keep the order of previous runs, jobs, that
+        # build the same models, update the lock one after the other
+        with self.locked(os.path.dirname(self.lockfile())):
+            lock = EncodingLock(self.lockfile())
+            with profiling.span('extensions'):
+                self._exts = Extensions(self._models, lock)
+            self._writer.write(lock.path, lock.dump())
+            if not self._writer.plan:
+                self._writer.flush()
+        self._compiler = Compiler(self._exts, self._regs, self._tcpath,
+                                  self._writer)
+        self._gem5 = Gem5(self._exts, self._regs, self._writer,
+                          self._buildpath)
+
+        # artifacts of other generators are outdated
+        if self._generator is None:
+            self._generator = generator()
+        self._deps.update(self._exts.models, self._regs.regmap,
+                          self._modelfiles, self._regfiles, self._generator)
+
+        self.export()
+
+    def export(self):
+        '''
+        Write the manifest of the extensions into the build directory,
+        as JSON and in its binary form, see export.py.
+        '''
+        content = manifest(self._exts, self._regs)
+        with self.locked(self._buildpath):
+            self._writer.write(
+                os.path.join(self._buildpath, MANIFEST_JSON), dumps(content))
+            self._writer.write(
+                os.path.join(self._buildpath, MANIFEST_BIN), pack(content))
+            if not self._writer.plan:
+                self._writer.flush()
+
+    def lockfile(self):
+        '''
+        Path of the encoding lock. It is kept next to the models, so it
+        survives restoring and can be versioned with them.
+        '''
+        if os.path.isdir(self._modelpath):
+            return os.path.join(self._modelpath, LOCKFILE)
+        return os.path.splitext(self._modelpath)[0] + '.' + LOCKFILE
+
+    def reset(self):
+        '''
+        Forget the parsed models and registers, to parse them again,
+        e.g. after the models were edited. Model files, that did not
+        change since, are not parsed again.
+        '''
+        self._models = []
+        self._regs = Registers()
+        self._exts = None
+        self._modelfiles = []
+        self._regfiles = []
+        self._activated = []
+        # other processes may have generated files in the meantime
+        self._deps = DependencyGraph(self._deps.path)
+        self._writer = FileWriter(self._writer.manifest, self._writer.plan,
+                                  defer=True)
+        self._compiler = Compiler(None, None, self._tcpath, self._writer)
+        self._gem5 = Gem5([], None, self._writer, self._buildpath)
 
     def treewalk(self, top):
-        logger.info('Search for models in {}'.format(top))
-        logger.debug('Directory content: {}'.format(os.listdir(top)))
-        for file in os.listdir(top):
-            pathname = os.path.join(top, file)
-            mode = os.stat(pathname)[ST_MODE]
-
-            if S_ISDIR(mode):
-                # directory
-                self.treewalk(pathname)
-            elif S_ISREG(mode):
-                # file
-                if pathname.endswith('.cc'):
-                    logger.info(
-                        'Model definition in file {}'.format(pathname))
-                    model = Model(pathname)
-
-                    self._models.append(model)
-                # registers
-                if pathname.endswith('registers.hh'):
-                    logger.info('Custom registers in file {}'.format(pathname))
-                    self._regs.parse_file(pathname)
+        '''
+        Parse all models and custom registers found in top.
+        '''
+        models, regfiles = self.discover(top)
+
+        # forget models of removed files, the parsed models may be
+        # shared with parsers of other model paths
+        prefix = os.path.join(top, '')
+        for pathname in set(self._parsed) - set(models):
+            if pathname.startswith(prefix):
+                del self._parsed[pathname]
+
+        # models and their local includes, e.g. registers.hh
+        self._modelfiles = sorted(set(
+            file for model in models for file in includes(model)))
+        self._regfiles = [os.path.abspath(file) for file in regfiles]
+
+        for regfile in regfiles:
+            logger.info('Custom registers in file {}'.format(regfile))
+            self._regs.parse_file(regfile)
+
+        if self._pch and models:
+            # headers, that are shared by all models
+            pch = PrecompiledHeader(os.path.join(self._buildpath, 'pch'),
+                                    ['<cstdint>'] + regfiles,
+                                    readonly=self._writer.plan)
+            # with the fast front-end, it is only built once a model
+            # falls back to libclang
+            if self._options['fast'] or pch.build():
+                self._options['pch'] = pch
+
+        self._models.extend(self.parse_files(models))
+
+    def discover(self, top):
+        '''
+        Search top for model definitions and register files.
+        '''
+        return discover(top)
+
+    def parse_files(self, pathnames):
+        '''
+        Parse the given model files. A file may define more than one
+        model. With more than one job, the files are parsed by a pool of
+        processes. All errors are collected and raised together as
+        ParseError.
+        Files, that this parser already parsed and that did not change
+        since, are not parsed again.
+        '''
+        stamps = dict((pathname, self.stamp(pathname))
+                      for pathname in pathnames)
+        pending = [pathname for pathname in pathnames
+                   if self._parsed.get(pathname, (None,))[0] !=
+                   stamps[pathname]]
+
+        if self._jobs <= 1 or len(pending) <= 1:
+            errors = []
+            for pathname in pending:
+                try:
+                    modelfile = ModelFile(pathname, **self._options)
+                    self._parsed[pathname] = (stamps[pathname],
+                                              modelfile.models(self._timing))
+                except Exception as e:
+                    logger.error('{}: {}'.format(pathname, e))
+                    errors.append((pathname, e))
+            if errors:
+                raise ParseError(errors)
+        else:
+            self.parse_pool(pending, stamps)
+
+        return [model for pathname in pathnames
+                for model in self._parsed[pathname][1]]
+
+    def parse_pool(self, pathnames, stamps):
+        '''
+        Parse the given model files using a pool of processes.
+        '''
+        logger.info('Parse {} models using {} jobs'.format(
+            len(pathnames), self._jobs))
+        pool = multiprocessing.Pool(min(self._jobs, len(pathnames)))
+        try:
+            # map keeps the order of the files
+            results = pool.map(_parse_model,
+                               [(pathname, self._options, self._timing)
+                                for pathname in pathnames])
+        finally:
+            pool.close()
+            pool.join()
+
+        errors = []
+        for pathname, (models, error, spans) in zip(pathnames, results):
+            if profiling.profiler() is not None:
+                profiling.profiler().merge(spans)
+            if error is not None:
+                logger.error('{}: {}'.format(pathname, error))
+                errors.append((pathname, error))
             else:
-                # unknown file type
-                logger.info('Unknown file type, skip')
+                self._parsed[pathname] = (stamps[pathname], models)
+        if errors:
+            raise ParseError(errors)
+
+    def stamp(self, pathname):
+        '''
+        Modification time and size of a model file and its includes.
+        '''
+        stamp = []
+        for file in includes(pathname):
+            st = os.stat(file)
+            stamp.append((file, st.st_mtime, st.st_size))
+        return tuple(stamp)
+
+    def report_timing(self):
+        '''
+        Return a table of the declared and the estimated cycle count
+        of all models.
+        '''
+        lines = ['{:<24} {:>8} {:>9} {:>13}'.format(
+            'instruction', 'declared', 'estimated', 'critical path')]
+        for model in self._models:
+            lines.append('{:<24} {:>8} {:>9} {:>13}'.format(
+                model.name, model.declared_cycles,
+                '-' if model.estimated_cycles is None
+                else model.estimated_cycles,
+                '-' if model.critical_path is None
+                else model.critical_path))
+        return '\n'.join(lines)
+
+    def outputs(self, artifact):
+        '''
+        Return the files an artifact is generated into. Without
+        toolchain, the artifacts of the compiler have none.
+        '''
+        if artifact in ('opcodes', 'intrinsics') and (
+                self._compiler.stdlibs is None):
+            return []
+        if artifact == 'opcodes':
+            # the backups of the originals are generated with the files,
+            # the toolchain is restored from them
+            return [self._compiler.opch, self._compiler.opch + '_old',
+                    self._compiler.opch_cust, self._compiler.opcc,
+                    self._compiler.opcc + '_old']
+        if artifact == 'intrinsics':
+            return [os.path.join(self._compiler.stdlibs, 'riscvintr.h')]
+        if artifact == 'decoder':
+            return [os.path.join(self._buildpath, 'isa/custom.isa'),
+                    os.path.join(self._buildpath, 'isa/main.isa'),
+                    os.path.join(self._buildpath, 'generated')]
+        if artifact == 'regsintr':
+            return [os.path.join(self._buildpath, 'generated/regsintr.hh')]
+        if artifact == 'timings':
+            return [os.path.join(self._buildpath,
+                                 'python/minor_custom_timings.py')]
+        raise ValueError(artifact, 'Unknown artifact.')
 
+    def files(self, artifact):
+        '''
+        Return the files an artifact was generated into. Directories are
+        expanded, without the outputs of other artifacts.
+        '''
+        others = set(os.path.abspath(file)
+                     for other in ARTIFACTS if other != artifact
+                     for file in self.outputs(other))
+        files = []
+        for output in self.outputs(artifact):
+            if not os.path.isdir(output):
+                files.append(os.path.abspath(output))
+                continue
+            for dirpath, _, names in os.walk(output):
+                files.extend(os.path.abspath(os.path.join(dirpath, name))
+                             for name in names)
+        return sorted(file for file in files
+                      if file not in others and os.path.exists(file))
+
+    def storekey(self, artifact):
+        '''
+        Key of an artifact in the store. Besides the information the
+        artifact is generated from, it covers its outputs and the
+        generators.
+        '''
+        if self._generator is None:
+            self._generator = generator()
+        return self._store.key(artifact, self._deps.digest(artifact),
+                               [os.path.abspath(file)
+                                for file in self.outputs(artifact)],
+                               self._generator)
+
+    def activate(self, artifact):
+        '''
+        Put the files of an artifact in place from the store, if it was
+        generated for the same information before. Returns whether it
+        was.
+        '''
+        if self._store is None or self._writer.plan or self._force:
+            return False
+        # binutils is built by make, which only compares modification
+        # times, gem5 is built by SCons, which compares contents
+        touch = artifact in ('opcodes', 'intrinsics')
+        files = self._store.activate(self.storekey(artifact), touch)
+        if files is None:
+            return False
+        logger.info('Activated {} from the store'.format(artifact))
+        self._activated.extend(('activate', file) for file in files)
+        self._deps.commit(artifact, self.outputs(artifact))
+        return True
+
+    def outdated(self, artifact):
+        '''
+        Whether an artifact has to be generated.
+        '''
+        return self._force or self._deps.outdated(artifact,
+                                                  self.outputs(artifact))
+
+    def generated(self, artifact):
+        '''
+        Write the files of a generated artifact and record it in the
+        dependency graph.
+        '''
+        if self._writer.plan:
+            return
+        self._writer.flush()
+        self._deps.commit(artifact, self.outputs(artifact))
+        if self._store is not None:
+            try:
+                self._store.put(self.storekey(artifact),
+                                self.files(artifact))
+            except (IOError, OSError) as e:
+                # the artifact is generated again next time
+                logger.warning('{} could not be stored: {}'.format(
+                    artifact, e))
+
+    def changes(self):
+        '''
+        Return the changes of generated files as (action, path) tuples.
+        In plan mode, those are the changes, that would be done.
+        '''
+        if not self._writer.plan:
+            return self._writer.applied + self._activated
+
+        changes = self._writer.changes()
+        isafile = os.path.abspath(
+            os.path.join(self._buildpath, 'isa/custom.isa'))
+        if any(path == isafile for _, path in changes):
+            # the isa parser is not run in plan mode
+            changes.append(('update', os.path.abspath(
+                os.path.join(self._buildpath, 'generated'))))
+        return changes
+
+    def locked(self, *paths):
+        '''
+        Hold the locks of the given shared directories. In plan mode,
+        nothing is written, so nothing is locked.
+        '''
+        if self._writer.plan:
+            return locked([])
+        return locked(paths, self._timeout)
+
+    @profiling.profiled('extend compiler')
     def extend_compiler(self):
         '''
-        Extend the riscv compiler.
+        Extend the riscv compiler. Only outdated files are generated,
+        the toolchain is restored for those before. Files, that were
+        generated for the same models before, are activated from the
+        store instead. The toolchain is locked meanwhile.
         '''
-        self._compiler.extend_compiler()
+        # other jobs may patch the same toolchain
+        with self.locked(self._tcpath):
+            if self.outdated('opcodes') and not self.activate('opcodes'):
+                self._compiler.restore_header()
+                self._compiler.restore_source()
+                self._compiler.extend_header()
+                self._compiler.extend_source()
+                self.generated('opcodes')
+            if self.outdated('intrinsics') and not self.activate('intrinsics'):
+                self._compiler.remove_stdlib()
+                self._compiler.extend_stdlibs()
+                self.generated('intrinsics')
 
+    @profiling.profiled('extend gem5')
     def extend_gem5(self):
         '''
-        Extend the gem5 simulator.
+        Extend the gem5 simulator. Only outdated files are generated,
+        or activated from the store. The build directory is locked
+        meanwhile.
         '''
-        self._gem5.extend_gem5()
+        # other jobs may generate into the same build directory
+        with self.locked(self._buildpath):
+            if self.outdated('decoder') and not self.activate('decoder'):
+                self._gem5.gen_decoder()
+                self._gem5.gen_cxx_files()
+                self.generated('decoder')
+            if self.outdated('regsintr') and not self.activate('regsintr'):
+                self._gem5.create_regsintr()
+                self.generated('regsintr')
+            if self.outdated('timings') and not self.activate('timings'):
+                self._gem5.create_FU_timings()
+                self.generated('timings')
+
+    def extend(self, compiler=True, gem5=True):
+        '''
+        Extend the riscv compiler and gem5 concurrently. Both only share
+        the parsed extensions and registers. Returns the orchestrator,
+        that ran them, for its timeline. Raises StageError, if a stage
+        failed.
+        '''
+        orchestrator = Orchestrator()
+        if compiler:
+            orchestrator.add('extend compiler', self.extend_compiler)
+        if gem5:
+            orchestrator.add('extend gem5', self.extend_gem5)
+        orchestrator.run()
+        return orchestrator
 
     @property
     def args(self):
         return self._args
 
+    @property
+    def cache(self):
+        return self._cache
+
     @property
     def compiler(self):
         return self._compiler
@@ -140,6 +620,10 @@ class Parser:
     def decoder(self):
         return self._gem5
 
+    @property
+    def deps(self):
+        return self._deps
+
     @property
     def extensions(self):
         return self._exts
@@ -148,6 +632,14 @@ class Parser:
     def models(self):
         return self._models
 
+    @property
+    def parsed(self):
+        return self._parsed
+
     @property
     def regs(self):
         return self._regs
+
+    @property
+    def writer(self):
+        return self._writer
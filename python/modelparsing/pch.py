@@ -0,0 +1,176 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from . import libclang
+from . import profiling
+from .cache import includes
+from .locking import FileLock
+
+logger = logging.getLogger(__name__)
+
+# flags used to build the precompiled header, they have to match the
+# flags models are parsed with
+PCH_ARGS = ['-x', 'c++-header', '-std=c++11', '-Wall']
+
+
+class PrecompiledHeader:
+    '''
+    Precompiled header for the includes, that all models share.
+    It is built once and reused, until one of the headers changes.
+    '''
+
+    def __init__(self, pchdir, headers, readonly=False):
+        '''
+        Headers are either system headers like '<cstdint>' or paths
+        to local headers. If readonly is set, e.g. in plan mode, an up
+        to date precompiled header is used, but none is built.
+        '''
+        self._readonly = readonly
+        self._pchdir = os.path.abspath(pchdir)
+        self._headers = [h if h.startswith('<') else os.path.abspath(h)
+                         for h in headers]
+        self._umbrella = os.path.join(self._pchdir, 'models.hh')
+        self._pch = self._umbrella + '.pch'
+        self._stamp = self._pch + '.stamp'
+        # result of build, it is only done once per process
+        self._ok = None
+
+    def umbrella(self):
+        '''
+        Content of the header, that includes all shared headers.
+        '''
+        return ''.join('#include {}\n'.format(
+            h if h.startswith('<') else '"{}"'.format(h))
+            for h in self._headers)
+
+    def digest(self):
+        '''
+        Digest over everything the precompiled header depends on.
+        libclang refuses a PCH, if the size or modification time of an
+        included file changed, so those are part of the digest as well.
+        '''
+        sha = hashlib.sha1()
+        sha.update(libclang.library().encode('utf-8'))
+        sha.update(b'\0' + ' '.join(PCH_ARGS).encode('utf-8'))
+        sha.update(b'\0' + self.umbrella().encode('utf-8'))
+        for header in self._headers:
+            if header.startswith('<'):
+                continue
+            for inc in includes(header):
+                st = os.stat(inc)
+                with open(inc, 'rb') as fh:
+                    sha.update('\0{}:{}:{}\0'.format(
+                        inc, st.st_size, st.st_mtime).encode('utf-8') +
+                        fh.read())
+        return sha.hexdigest()
+
+    def build(self):
+        '''
+        Build the precompiled header, if there is no up to date one.
+        Returns False, if it could not be built.
+        '''
+        if self._ok is None and self._readonly:
+            self._ok = self.current(self.digest())
+        if self._ok is None:
+            with profiling.span('precompiled header', 'parse'):
+                # jobs and workers, that share the build directory,
+                # build it one after the other
+                with FileLock(self._pchdir):
+                    self._ok = self._build()
+        return self._ok
+
+    def current(self, digest):
+        '''
+        Whether the precompiled header was built for digest.
+        '''
+        if not os.path.exists(self._pch) or not os.path.exists(self._stamp):
+            return False
+        with open(self._stamp, 'r') as fh:
+            return fh.read() == digest
+
+    def _build(self):
+        digest = self.digest()
+        if self.current(digest):
+            logger.info('Precompiled header is up to date')
+            return True
+
+        logger.info('Build precompiled header {}'.format(self._pch))
+        self.write(self._umbrella, self.umbrella())
+
+        cindex = libclang.cindex()
+        index = cindex.Index.create()
+        tu = index.parse(self._umbrella, PCH_ARGS)
+
+        errors = [diag for diag in tu.diagnostics
+                  if diag.severity >= cindex.Diagnostic.Error]
+        if errors:
+            for diag in errors:
+                logger.warning(diag.spelling)
+            logger.warning('Precompiled header could not be built')
+            return False
+
+        # models parsed in parallel might build the header at the same
+        # time, so files are replaced atomically
+        fd, tmp = tempfile.mkstemp(dir=self._pchdir)
+        os.close(fd)
+        try:
+            tu.save(tmp)
+        except cindex.TranslationUnitSaveError as e:
+            logger.warning(
+                'Precompiled header could not be saved: {}'.format(e))
+            os.remove(tmp)
+            return False
+        os.rename(tmp, self._pch)
+
+        self.write(self._stamp, digest)
+        return True
+
+    def write(self, file, content):
+        # replace a file atomically
+        fd, tmp = tempfile.mkstemp(dir=self._pchdir)
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(content)
+        os.rename(tmp, file)
+
+    @property
+    def args(self):
+        # arguments, that make libclang use the precompiled header
+        return ['-include-pch', self._pch]
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def path(self):
+        return self._pch
@@ -0,0 +1,254 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import contextlib
+import cProfile
+import functools
+import json
+import logging
+import os
+import re
+import resource
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# the active profiler, spans are only recorded while one is enabled
+_profiler = None
+
+
+class Profiler:
+    '''
+    Records timed spans of the modelparser pipeline.
+
+    For every span, the wall time, the CPU time, the CPU time of waited
+    for subprocesses and the peak RSS of the process are recorded. The
+    spans can be written as Chrome trace, which is understood by
+    chrome://tracing and Perfetto, or summarized as table.
+    If a cProfile directory is given, every outermost span of category
+    stage of a thread is profiled with cProfile additionally. Python 3.12
+    and later only run one cProfile at a time, there a stage, that starts
+    while another thread is profiled, is not.
+    Spans may be recorded by several threads. The CPU times are those of
+    the process, for spans of threads, that run in parallel, they include
+    the CPU time of the other threads.
+    '''
+
+    def __init__(self, cprofile=None):
+        self._cprofile = cprofile
+        # the profiled stage of each thread
+        self._local = threading.local()
+        self._spans = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, category='stage', **args):
+        profile = None
+        if self._cprofile is not None and category == 'stage' and \
+                getattr(self._local, 'active', None) is None:
+            profile = cProfile.Profile()
+
+        start = time.time()
+        times = os.times()
+        if profile is not None:
+            try:
+                profile.enable()
+                self._local.active = name
+            except ValueError as e:
+                # another thread is profiled
+                logger.info('{} is not profiled: {}'.format(name, e))
+                profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.dump(profile, name)
+                self._local.active = None
+            end = time.time()
+            now = os.times()
+            self.record({
+                'name': name,
+                'cat': category,
+                'pid': os.getpid(),
+                'tid': threading.current_thread().ident,
+                'start': start,
+                'wall': end - start,
+                'cpu': (now[0] + now[1]) - (times[0] + times[1]),
+                'subprocess': (now[2] + now[3]) - (times[2] + times[3]),
+                # kilobytes on Linux
+                'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                'args': args,
+            })
+
+    def record(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def dump(self, profile, name):
+        '''
+        Write the cProfile statistics of a stage.
+        '''
+        if not os.path.exists(self._cprofile):
+            os.makedirs(self._cprofile)
+        path = os.path.join(self._cprofile,
+                            re.sub(r'\W+', '_', name) + '.prof')
+        profile.dump_stats(path)
+        logger.info('cProfile of {} written to {}'.format(name, path))
+
+    def mark(self):
+        '''
+        Return a mark, to collect the spans recorded after it.
+        '''
+        with self._lock:
+            return len(self._spans)
+
+    def collect(self, mark=0):
+        with self._lock:
+            return self._spans[mark:]
+
+    def merge(self, spans):
+        '''
+        Add spans recorded by another process.
+        '''
+        with self._lock:
+            self._spans.extend(spans)
+
+    def trace(self):
+        '''
+        Return the spans in the Chrome trace event format.
+        '''
+        events = []
+        for span in sorted(self.spans, key=lambda span: span['start']):
+            args = dict(span['args'])
+            args.update({'cpu_ms': round(span['cpu'] * 1000, 3),
+                         'subprocess_ms': round(span['subprocess'] * 1000, 3),
+                         'peak_rss_kb': span['rss']})
+            events.append({
+                'name': span['name'],
+                'cat': span['cat'],
+                'ph': 'X',
+                'ts': int(span['start'] * 1e6),
+                'dur': int(span['wall'] * 1e6),
+                'pid': span['pid'],
+                'tid': span['tid'],
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        dirname = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(path, 'w') as fh:
+            json.dump(self.trace(), fh)
+        logger.info('Trace written to {}'.format(path))
+
+    def summary(self):
+        '''
+        Return a table of the spans, aggregated by category and name.
+        '''
+        rows = {}
+        for span in self.spans:
+            key = (span['cat'], span['name'])
+            row = rows.setdefault(key, [0, 0.0, 0.0, 0.0, 0])
+            row[0] += 1
+            row[1] += span['wall']
+            row[2] += span['cpu']
+            row[3] += span['subprocess']
+            row[4] = max(row[4], span['rss'])
+
+        fmt = '{:<10} {:<28} {:>5} {:>10} {:>10} {:>10} {:>10}'
+        lines = [fmt.format('category', 'span', 'count', 'wall ms',
+                            'cpu ms', 'subproc ms', 'rss kB')]
+        for (category, name), row in sorted(rows.items(),
+                                            key=lambda item: -item[1][1]):
+            lines.append(fmt.format(
+                category, name[:28], row[0], '{:.1f}'.format(row[1] * 1000),
+                '{:.1f}'.format(row[2] * 1000),
+                '{:.1f}'.format(row[3] * 1000), row[4]))
+        return '\n'.join(lines)
+
+    @property
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+
+def enable(cprofile=None):
+    '''
+    Start recording spans. Returns the profiler.
+    '''
+    global _profiler
+    _profiler = Profiler(cprofile)
+    return _profiler
+
+
+def disable():
+    '''
+    Stop recording spans. Returns the profiler, that was active.
+    '''
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def profiler():
+    '''
+    Return the active profiler or None.
+    '''
+    return _profiler
+
+
+@contextlib.contextmanager
+def span(name, category='stage', **args):
+    '''
+    Time the enclosed block, if profiling is enabled.
+
+        with profiling.span('isa_parser', 'subprocess'):
+            ...
+    '''
+    if _profiler is None:
+        yield
+    else:
+        with _profiler.span(name, category, **args):
+            yield
+
+
+def profiled(name, category='stage'):
+    '''
+    Decorator, that records a span for every call of a function.
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
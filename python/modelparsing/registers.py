@@ -51,7 +51,13 @@ class Registers:
         logger.info("Parsing register file @ %s" % file)
 
         with open(file, 'r') as fh:
-            content = fh.readlines()
+            self.parse(fh.read())
+
+    def parse(self, content):
+        '''
+        Search the content of a register file for the defined registers.
+        '''
+        content = content.splitlines()
 
         regs = []
         prog = re.compile(r"^[#]define\s([\w_-]+)\s+(0x[0-9a-fA-F]{3})$")
@@ -0,0 +1,239 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# bump, whenever the layout of the store changes
+STORE_VERSION = 1
+
+# ioctl, that clones a file on file systems with reflinks (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def storedir():
+    '''
+    Default location of the store. It is kept outside of the build
+    directory, so it survives restoring.
+    '''
+    cachehome = os.environ.get('XDG_CACHE_HOME',
+                               os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cachehome, 'riscv-custom-extension', 'store')
+
+
+def filedigest(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def generator():
+    '''
+    Digest of the modelparsing sources and templates, files generated by
+    another version of the generators are not activated.
+    '''
+    sha = hashlib.sha1()
+    top = os.path.dirname(os.path.realpath(__file__))
+    files = [file for file in os.listdir(top) if file.endswith('.py')]
+    files.extend(os.path.join('templates', file)
+                 for file in os.listdir(os.path.join(top, 'templates'))
+                 if file.endswith('.mako'))
+    for file in sorted(files):
+        with open(os.path.join(top, file), 'rb') as fh:
+            sha.update(file.encode('utf-8') + b'\0' + fh.read() + b'\0')
+    return sha.hexdigest()
+
+
+def clone(src, dst):
+    '''
+    Make dst a copy of src, that shares its data: a hardlink if
+    possible, a reflink across file systems, that support them, and a
+    plain copy otherwise. dst must not exist.
+    '''
+    try:
+        os.link(src, dst)
+        return 'link'
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+    try:
+        with open(src, 'rb') as fsrc:
+            with open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return 'reflink'
+    except (IOError, OSError):
+        pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+class ArtifactStore:
+    '''
+    Content addressed store of generated files.
+
+    The files of an artifact are stored under a key, that the caller
+    derives from the information they were generated from. Activating
+    a key puts the stored files back in place, with the modification
+    times they had, when they were stored. So switching between sets of
+    models does not generate the files again and build tools, that
+    compare modification times or contents, do not rebuild.
+
+    The content of a file is stored once in objects/, as hardlink of the
+    generated file if possible. The generated files are only ever
+    replaced, never written in place, so the stored content does not
+    change. Nevertheless, the content is verified before it is
+    activated.
+    '''
+
+    def __init__(self, path=None):
+        self._path = os.path.abspath(path if path is not None
+                                     else storedir())
+
+    def objectpath(self, sha):
+        return os.path.join(self._path, 'objects', sha[:2], sha[2:])
+
+    def entrypath(self, key):
+        return os.path.join(self._path, 'entries', key + '.json')
+
+    def key(self, *parts):
+        '''
+        Compute a key of the given parts, e.g. the name and digest of an
+        artifact and its output paths.
+        '''
+        sha = hashlib.sha1()
+        sha.update(json.dumps([STORE_VERSION] + list(parts),
+                              sort_keys=True).encode('utf-8'))
+        return sha.hexdigest()
+
+    def makedirs(self, dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError as e:
+            # created concurrently
+            if e.errno != errno.EEXIST:
+                raise
+
+    def put(self, key, files):
+        '''
+        Store the given files under key.
+        '''
+        entry = {'version': STORE_VERSION, 'files': {}}
+        for path in sorted(files):
+            path = os.path.abspath(path)
+            st = os.stat(path)
+            sha = filedigest(path)
+            obj = self.objectpath(sha)
+            if not os.path.exists(obj):
+                self.makedirs(os.path.dirname(obj))
+                tmp = tempfile.mktemp(dir=os.path.dirname(obj))
+                clone(path, tmp)
+                os.rename(tmp, obj)
+            entry['files'][path] = {'sha1': sha,
+                                    'mtime': st.st_mtime,
+                                    'mode': st.st_mode & 0o7777}
+
+        self.makedirs(os.path.dirname(self.entrypath(key)))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.entrypath(key)))
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(entry, fh, indent=1, sort_keys=True)
+        os.rename(tmp, self.entrypath(key))
+        logger.debug('Stored {} files as {}'.format(len(files), key))
+
+    def entry(self, key):
+        '''
+        Return the stored files of key as dictionary of path and sha1,
+        modification time and mode, None if key is not stored.
+        '''
+        try:
+            with open(self.entrypath(key), 'r') as fh:
+                entry = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('version') != STORE_VERSION:
+            return None
+        return entry['files']
+
+    def activate(self, key, touch=False):
+        '''
+        Put the files stored under key in place. Each file is replaced
+        atomically. If touch is set, the files get the current time as
+        modification time instead of the stored one. Files, that already
+        have the stored content, are not touched. Returns the paths of
+        the files put in place, None if key is not stored or the stored
+        content does not match.
+        '''
+        files = self.entry(key)
+        if files is None:
+            return None
+        for path, info in files.items():
+            obj = self.objectpath(info['sha1'])
+            if (not os.path.exists(obj) or
+                    filedigest(obj) != info['sha1']):
+                logger.warning(
+                    'Stored content of {} is missing or corrupted'.format(
+                        path))
+                return None
+
+        activated = []
+        for path, info in sorted(files.items()):
+            if os.path.exists(path) and filedigest(path) == info['sha1']:
+                continue
+            obj = self.objectpath(info['sha1'])
+            dirname = os.path.dirname(path)
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+            tmp = tempfile.mktemp(dir=dirname)
+            clone(obj, tmp)
+            os.rename(tmp, path)
+            if os.stat(path).st_mode & 0o7777 != info['mode']:
+                os.chmod(path, info['mode'])
+            if touch:
+                os.utime(path, None)
+            else:
+                os.utime(path, (info['mtime'], info['mtime']))
+            activated.append(path)
+        logger.debug('Activated {} files of {}'.format(len(activated), key))
+        return activated
+
+    def contains(self, key):
+        return os.path.exists(self.entrypath(key))
+
+    @property
+    def path(self):
+        return self._path
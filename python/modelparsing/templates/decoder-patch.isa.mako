@@ -0,0 +1,54 @@
+<%
+dfn = {}
+for model in models:
+    if model.opc in dfn:
+        dfn[model.opc].append(model)
+    else:
+        dfn[model.opc] = [model]
+for opc, mdls in sorted(dfn.items()):
+    funct3 = {}
+    for mdl in mdls:
+        if mdl.form == 'I':
+            funct3[mdl.funct3] = mdl
+        else:
+            if mdl.funct3 in funct3:
+                funct3[mdl.funct3].append(mdl)
+            else:
+                funct3[mdl.funct3] = [mdl]
+    dfn[opc] = funct3
+
+def effects(mdl):
+    # document the custom registers accessed by an instruction
+    if not mdl.reads and not mdl.writes:
+        return ''
+    accesses = []
+    if mdl.reads:
+        accesses.append('reads ' + ', '.join(mdl.reads))
+    if mdl.writes:
+        accesses.append('writes ' + ', '.join(mdl.writes))
+    return '// {}: {}\n'.format(mdl.name, '; '.join(accesses))
+
+def flags(mdl):
+    # writing a custom register must not happen speculatively and
+    # later instructions have to see the new value
+    if mdl.writes:
+        return ', IsSerializeAfter, IsNonSpeculative'
+    return ''
+%>\
+% for opc,funct3_dict in sorted(dfn.items()):
+${hex(opc)}: decode FUNCT3 {
+% for funct3, val in sorted(funct3_dict.items()):
+% if type(val) != list:
+${effects(val)}\
+${hex(funct3)}: I32Op::${val.name}({${val.definition}}, uint32_t, IntCustOp${flags(val)});
+% else:
+${hex(funct3)}: decode FUNCT7 {
+% for mdl in val:
+${effects(mdl)}\
+${hex(mdl.funct7)}: R32Op::${mdl.name}({${mdl.definition}}, IntCustOp${flags(mdl)});
+% endfor
+}
+% endif
+% endfor
+}
+% endfor
\ No newline at end of file
@@ -0,0 +1,22 @@
+<%
+%>\
+# === AUTO GENERATED FILE ===
+
+from m5.objects import *
+% for inst in insts:
+
+
+class MinorFUTiming${inst.name.title()}(MinorFUTiming):
+    description = 'Custom${inst.name.title()}'
+    match = ${hex(inst.matchvalue)}
+    mask = ${hex(inst.maskvalue)}
+    srcRegsRelativeLats = [2]
+    extraCommitLat = ${inst.cycles - 1}
+% endfor
+
+
+custom_timings = [
+% for inst in insts:
+    MinorFUTiming${inst.name.title()}(),
+% endfor
+]
@@ -0,0 +1,17 @@
+<%
+%>\
+// === AUTO GENERATED FILE ===
+
+#include <stdint.h>
+
+% for reg, addr in sorted(regmap.items()):
+#define ${reg} ${hex(addr)}
+% endfor
+
+#define READ_CUSTOM_REG(reg) \
+({uint32_t val; \
+val = xc->readMiscReg(reg); \
+val;})
+
+#define WRITE_CUSTOM_REG(reg, val) \
+(xc->setMiscReg(reg,val))
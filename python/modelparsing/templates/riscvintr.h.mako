@@ -0,0 +1,56 @@
+<%
+%>\
+// === AUTO GENERATED FILE ===
+
+#ifndef __RISCVINTR_H__
+#define __RISCVINTR_H__
+
+#include <stdint.h>
+
+% for reg, addr in sorted(regmap.items()):
+#define ${reg} ${hex(addr)}
+% endfor
+
+uint32_t READ_CUSTOM_REG(uint32_t reg)
+{
+    // uint32_t *val;
+    // val = (uint32_t *)reg;
+    // return *val;
+    uint32_t val;
+    __asm__ __volatile__(
+        "read_custreg %0, zero, %1"
+        : "=r" (val)
+        : "r" (reg)
+    );
+    return val;
+}
+
+void WRITE_CUSTOM_REG(uint32_t reg, uint32_t val)
+{
+    // uint32_t *addr = (uint32_t *)reg;
+    // *addr = val;
+    __asm__ __volatile__(
+        "write_custreg zero, %1, %0"
+        :
+        : "r" (reg), "r" (val)
+    );
+}
+
+// access methods for custom instructions
+% for inst in insts:
+% if inst.form == 'R':
+% if not inst.name in ('read_custreg', 'write_custreg'):
+
+void ${inst.name.upper()}(uint32_t* rd, uint32_t rs1, uint32_t rs2)
+{
+    __asm__ __volatile__(
+        "${inst.name} %0, %1, %2"
+        : "=r" (*rd)
+        : "r" (rs1), "r" (rs2)
+    );
+}
+% endif
+% endif
+% endfor
+
+#endif // __RISCVINTR_H__
@@ -0,0 +1,103 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import hashlib
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# the templates of the generated files
+TEMPLATES = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                         'templates')
+
+_lookup = None
+_lock = threading.Lock()
+
+
+def digest(templates=TEMPLATES):
+    '''
+    Digest of the location and the contents of the templates.
+    '''
+    sha = hashlib.sha1(os.path.abspath(templates).encode('utf-8'))
+    for name in sorted(os.listdir(templates)):
+        if name.endswith('.mako'):
+            with open(os.path.join(templates, name), 'rb') as fh:
+                sha.update(b'\0' + name.encode('utf-8') + b'\0' + fh.read())
+    return sha.hexdigest()
+
+
+def moduledir(templates=TEMPLATES):
+    '''
+    Directory of the compiled templates. It is kept outside of the build
+    directory, so it survives restoring. Mako only compares the
+    modification times of a template and its module, so the directory
+    is keyed by the digest of the templates. Checkouts and versions of
+    the templates do not share compiled modules.
+    '''
+    cachehome = os.environ.get('XDG_CACHE_HOME',
+                               os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cachehome, 'riscv-custom-extension',
+                        'mako-py{}'.format(sys.version_info[0]),
+                        digest(templates))
+
+
+def lookup():
+    '''
+    Return the lookup of the templates, shared by all generators of the
+    process. Mako is imported on first use only, builds without changes
+    do not render anything.
+    '''
+    global _lookup
+
+    with _lock:
+        if _lookup is None:
+            from mako.lookup import TemplateLookup
+            modules = moduledir()
+            try:
+                if not os.path.isdir(modules):
+                    os.makedirs(modules)
+            except OSError:
+                # created concurrently or not writable
+                if not os.path.isdir(modules):
+                    logger.info('Compiled templates are not cached')
+                    modules = None
+            _lookup = TemplateLookup(directories=[TEMPLATES],
+                                     module_directory=modules)
+        return _lookup
+
+
+def template(name):
+    '''
+    Return the template of the given file in templates/. A template is
+    compiled on first use, the compiled module is kept on disk for later
+    runs and in memory for the process.
+    '''
+    return lookup().get_template(name)
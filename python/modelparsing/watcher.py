@@ -0,0 +1,255 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# files, that models are built from
+SUFFIXES = ('.cc', '.hh', '.h')
+
+# inotify events, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# wd, mask, cookie, len
+EVENT = struct.Struct('iIII')
+
+
+def _inotify():
+    '''
+    Return the libc, if it provides inotify, else None.
+    '''
+    if not sys.platform.startswith('linux'):
+        return None
+    name = ctypes.util.find_library('c')
+    if name is None:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [
+        ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class Watcher:
+    '''
+    Watches the model path for changed models and headers.
+
+    On Linux inotify is used, elsewhere (or if inotify is not available)
+    the files are polled. Bursts of changes, e.g. an editor writing a
+    backup and the file itself, are reported together, once no further
+    change happened for the debounce time.
+    '''
+
+    def __init__(self, top, debounce=0.1, interval=0.5, poll=False):
+        self._top = os.path.abspath(top)
+        # a single model file is watched through its directory
+        self._root = self._top if os.path.isdir(self._top) \
+            else os.path.dirname(self._top)
+        self._debounce = debounce
+        self._interval = interval
+        self._fd = None
+        self._watches = {}
+        self._snapshot = {}
+
+        libc = None if poll else _inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._libc = libc
+                self._fd = fd
+                self.add_tree(self._root)
+            else:
+                logger.info('inotify not available: {}'.format(
+                    os.strerror(ctypes.get_errno())))
+        if self._fd is None:
+            self._snapshot = self.scan()
+        logger.info('Watch {} using {}'.format(self._root, self.backend))
+
+    def relevant(self, path):
+        if not path.endswith(SUFFIXES):
+            return False
+        return self._top == self._root or path == self._top or \
+            not path.endswith('.cc')
+
+    def add_tree(self, top):
+        '''
+        Watch top and all of its subdirectories.
+        '''
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames.sort()
+            if not isinstance(dirpath, bytes):
+                dirpath = dirpath.encode(sys.getfilesystemencoding())
+            wd = self._libc.inotify_add_watch(self._fd, dirpath, MASK)
+            if wd < 0:
+                logger.warning('Cannot watch {}: {}'.format(
+                    dirpath, os.strerror(ctypes.get_errno())))
+                continue
+            self._watches[wd] = dirpath if isinstance(dirpath, str) \
+                else dirpath.decode(sys.getfilesystemencoding())
+
+    def scan(self):
+        '''
+        Return the modification time and size of all relevant files.
+        '''
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self._root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if not self.relevant(path):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime, st.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        '''
+        Return the files, that changed within timeout seconds.
+        '''
+        if self._fd is None:
+            end = time.time() + (timeout or 0)
+            while True:
+                snapshot = self.scan()
+                changed = set(path for path in
+                              set(snapshot) | set(self._snapshot)
+                              if snapshot.get(path) !=
+                              self._snapshot.get(path))
+                self._snapshot = snapshot
+                remaining = end - time.time()
+                if changed or timeout is not None and remaining <= 0:
+                    return changed
+                interval = self._interval if timeout is None \
+                    else min(self._interval, remaining)
+                time.sleep(interval)
+
+        try:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                return set()
+            raise
+        if not ready:
+            return set()
+        return self.read()
+
+    def read(self):
+        '''
+        Read the pending inotify events. Returns the changed files.
+        '''
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost, treat every file as changed
+                    changed.update(self.scan())
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                dirpath = self._watches.get(wd)
+                if dirpath is None or not name:
+                    continue
+                if not isinstance(name, str):
+                    name = name.decode(sys.getfilesystemencoding())
+                path = os.path.join(dirpath, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # watch new directories and report their content
+                        self.add_tree(path)
+                        for dirpath, _, filenames in os.walk(path):
+                            changed.update(
+                                os.path.join(dirpath, filename)
+                                for filename in filenames)
+                elif self.relevant(path):
+                    changed.add(path)
+        return set(path for path in changed if self.relevant(path))
+
+    def wait(self, timeout=None):
+        '''
+        Block until files changed and return them sorted. Changes are
+        collected, until none happened for the debounce time. Returns an
+        empty list, if nothing changed within timeout seconds.
+        '''
+        changed = self.poll(timeout)
+        if not changed:
+            return []
+        while True:
+            more = self.poll(self._debounce)
+            if not more:
+                break
+            changed |= more
+        return sorted(changed)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def backend(self):
+        return 'poll' if self._fd is None else 'inotify'
@@ -0,0 +1,270 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+
+def synchronized(method):
+    '''
+    Decorator, that serializes the calls of a method on the same object,
+    which needs a _lock.
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def encode(content):
+    '''
+    The content of a file as bytes, text is utf-8 encoded.
+    '''
+    if isinstance(content, bytes):
+        return content
+    return content.encode('utf-8')
+
+
+def digest(content):
+    return hashlib.sha1(encode(content)).hexdigest()
+
+
+def stamp(file):
+    '''
+    Size and modification time of a file, None if it does not exist.
+    '''
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime]
+
+
+class FileWriter:
+    '''
+    Writes generated files, only if their content changes.
+
+    Files are replaced atomically. The content hashes of written files
+    are recorded in a manifest, to compare them without reading them
+    again.
+    If defer is set, writes and removals are collected and reads see the
+    collected state. flush applies the remaining differences to the file
+    system, so a file that is restored and generated again with the same
+    content is not touched.
+    In plan mode, nothing is flushed, changes returns what would be done.
+    A writer may be shared by threads. Every thread stages its own
+    changes, flush only applies those of the calling thread and of
+    threads, that finished, so a thread never writes the half finished
+    files of another one.
+    '''
+
+    def __init__(self, manifest=None, plan=False, defer=False):
+        self._manifest = manifest
+        self._plan = plan
+        self._defer = defer
+        # pending content by path, None for removed files
+        self._overlay = {}
+        # thread, that staged the pending content, by path
+        self._threads = {}
+        # content hash and stamp of written files by path
+        self._hashes = {}
+        # changes applied by flush
+        self._applied = []
+        self._lock = threading.RLock()
+
+        if manifest is not None:
+            try:
+                with open(manifest, 'r') as fh:
+                    self._hashes = json.load(fh)
+            except (IOError, OSError, ValueError):
+                pass
+
+    def exists(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._overlay:
+                return self._overlay[path] is not None
+        return os.path.exists(path)
+
+    def read(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._overlay:
+                if self._overlay[path] is None:
+                    raise IOError('No such file: {}'.format(path))
+                return self._overlay[path]
+        with open(path, 'r') as fh:
+            return fh.read()
+
+    @synchronized
+    def write(self, path, content):
+        self.stage(os.path.abspath(path), content)
+        if not self._defer:
+            self.flush()
+
+    @synchronized
+    def remove(self, path):
+        '''
+        Remove a file, missing files are ignored.
+        '''
+        self.stage(os.path.abspath(path), None)
+        if not self._defer:
+            self.flush()
+
+    def stage(self, path, content):
+        '''
+        Stage the content of a file for the calling thread, the caller
+        holds the lock.
+        '''
+        self._overlay[path] = content
+        self._threads[path] = threading.current_thread()
+
+    def unchanged(self, path, content):
+        '''
+        Whether the file at path already has the given content.
+        '''
+        recorded = self._hashes.get(path)
+        if recorded is not None and recorded['stamp'] == stamp(path):
+            return recorded['sha1'] == digest(content)
+        try:
+            with open(path, 'rb') as fh:
+                return fh.read() == encode(content)
+        except (IOError, OSError):
+            return False
+
+    @synchronized
+    def changes(self, paths=None):
+        '''
+        Return the pending changes as sorted (action, path) tuples,
+        action is one of create, update and remove. If paths is given,
+        only the changes of those are returned.
+        '''
+        changes = []
+        for path, content in sorted(self._overlay.items()):
+            if paths is not None and path not in paths:
+                continue
+            if content is None:
+                if os.path.exists(path):
+                    changes.append(('remove', path))
+            elif not os.path.exists(path):
+                changes.append(('create', path))
+            elif not self.unchanged(path, content):
+                changes.append(('update', path))
+        return changes
+
+    @synchronized
+    def flush(self):
+        '''
+        Apply the changes, that the calling thread or finished threads
+        staged. Returns the applied changes. In plan mode, the changes
+        are kept pending.
+        '''
+        if self._plan:
+            return []
+
+        current = threading.current_thread()
+        staged = set(path for path, thread in self._threads.items()
+                     if thread is current or not thread.is_alive())
+        with profiling.span('write files', 'io'):
+            changes = self.changes(staged)
+            for action, path in changes:
+                logger.info('{} {}'.format(action.title(), path))
+                if action == 'remove':
+                    os.remove(path)
+                    self._hashes.pop(path, None)
+                else:
+                    self.replace(path, self._overlay[path])
+
+        # files, that are unchanged, are recorded as well
+        for path in staged:
+            content = self._overlay.pop(path)
+            del self._threads[path]
+            if content is not None:
+                self._hashes[path] = {'sha1': digest(content),
+                                      'stamp': stamp(path)}
+
+        self._applied.extend(changes)
+        self.save()
+        return changes
+
+    def replace(self, path, content):
+        '''
+        Atomically replace a file, keeping its permissions.
+        '''
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        fd, tmp = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(encode(content))
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        else:
+            os.chmod(tmp, 0o644)
+        os.rename(tmp, path)
+
+    @synchronized
+    def save(self):
+        '''
+        Write the manifest.
+        '''
+        if self._manifest is None:
+            return
+
+        dirname = os.path.dirname(self._manifest)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        fd, tmp = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(self._hashes, fh, indent=1, sort_keys=True)
+        os.rename(tmp, self._manifest)
+
+    @property
+    def applied(self):
+        return self._applied
+
+    @property
+    def manifest(self):
+        return self._manifest
+
+    @property
+    def plan(self):
+        return self._plan
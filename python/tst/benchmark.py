@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import argparse
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.append('..')
+from modelparsing import libclang
+from modelparsing.api import render
+from modelparsing.model import Model
+from modelparsing.model import ModelFile
+from modelparsing.model import PARSE_ARGS
+from modelparsing.parser import Parser
+sys.path.remove('..')
+
+# models that are shipped with the repository
+extensions = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), '../../extensions')
+
+
+def models(paths):
+    '''
+    Collect the model files to benchmark.
+    '''
+    if not paths:
+        paths = [extensions]
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in sorted(os.walk(path)):
+                files.extend(os.path.join(root, name)
+                             for name in sorted(names) if name.endswith('.cc'))
+        else:
+            files.append(path)
+    return files
+
+
+def report(name, times, count):
+    best = min(times)
+    print('{:<24} {:>10.3f} ms/model'.format(name, best / count * 1e3))
+
+
+def full_traversal(node):
+    '''
+    Visit every cursor of the translation unit recursively and tokenize
+    all declarations, like the parser did before.
+    '''
+    for child in node.get_children():
+        full_traversal(child)
+    if node.kind == libclang.cindex().CursorKind.VAR_DECL:
+        list(node.get_tokens())
+    if node.kind == libclang.cindex().CursorKind.COMPOUND_STMT:
+        with open(node.location.file.name, 'r') as fh:
+            fh.read()
+
+
+def traversal(args):
+    '''
+    Compare the traversal of the whole translation unit with the
+    traversal of the model file, that ModelFile does.
+    '''
+    files = models(args.models)
+    index = libclang.cindex().Index.create()
+    tus = [index.parse(f, PARSE_ARGS) for f in files]
+    modelfile = ModelFile(files[0], fast=True)
+
+    def walk_full():
+        for tu in tus:
+            full_traversal(tu.cursor)
+
+    def walk_main():
+        for tu in tus:
+            modelfile.parse_model(tu)
+
+    report('full traversal',
+           timeit.repeat(walk_full, number=1, repeat=args.repeat), len(tus))
+    report('main file traversal',
+           timeit.repeat(walk_main, number=1, repeat=args.repeat), len(tus))
+
+
+def frontend(args):
+    '''
+    Compare parsing models with libclang and with the fast front-end.
+    '''
+    files = models(args.models)
+
+    def parse(fast):
+        def run():
+            for f in files:
+                Model(f, fast=fast)
+        return run
+
+    report('libclang front-end',
+           timeit.repeat(parse(False), number=1, repeat=args.repeat),
+           len(files))
+    report('fast front-end',
+           timeit.repeat(parse(True), number=1, repeat=args.repeat),
+           len(files))
+
+
+def pipeline(args):
+    '''
+    Time parse_models and the code generation of a model path, without
+    cache, precompiled header and store. Run it with each interpreter,
+    to compare them.
+    '''
+    modelpath = args.modelpath or extensions
+    buildpath = tempfile.mkdtemp()
+
+    def run():
+        parser = Parser(None, modelpath, cache=False, pch=False,
+                        fast=args.fast, plan=True, buildpath=buildpath,
+                        store=False)
+        parser.parse_models()
+        render(parser.extensions, parser.regs)
+        return parser
+
+    try:
+        # warm up, parse-opcodes is only run once per process
+        count = len(run().models) - 2
+        print('{} {}'.format(platform.python_implementation(),
+                             platform.python_version()))
+        report('parse_models + codegen',
+               timeit.repeat(run, number=1, repeat=args.repeat), count)
+    finally:
+        shutil.rmtree(buildpath)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='benchmark',
+        description='Benchmarks for the model parser.')
+    parser.add_argument('-r',
+                        '--repeat',
+                        type=int,
+                        default=5,
+                        help='Number of repetitions, the best one is taken.')
+    subparsers = parser.add_subparsers()
+
+    sub = subparsers.add_parser('traversal', help=traversal.__doc__)
+    sub.add_argument('models', nargs='*',
+                     help='Model files or folders, ' +
+                     'defaults to the shipped extensions.')
+    sub.set_defaults(func=traversal)
+
+    sub = subparsers.add_parser('frontend', help=frontend.__doc__)
+    sub.add_argument('models', nargs='*',
+                     help='Model files or folders, ' +
+                     'defaults to the shipped extensions.')
+    sub.set_defaults(func=frontend)
+
+    sub = subparsers.add_parser('pipeline', help=pipeline.__doc__)
+    sub.add_argument('modelpath', nargs='?',
+                     help='Model file or folder, ' +
+                     'defaults to the shipped extensions.')
+    sub.add_argument('--fast', action='store_true',
+                     help='Use the fast front-end.')
+    sub.set_defaults(func=pipeline)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
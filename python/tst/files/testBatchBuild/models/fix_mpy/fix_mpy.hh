@@ -0,0 +1,57 @@
+/*
+ * Copyright (c) 2018 TU Dresden
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * Authors: Robert Scheffel
+ */
+
+/*
+ * The allowed types are derived from the
+ * base instruction formats, which are descriped
+ * in 2.2 Base Instruction Formats of
+ * The RISC-V Instruction Set Manual
+ * Volume I: User-Level ISA
+ * Document Version 2.2
+ *
+ * The following function types are legit:
+ *
+ * R-Type  [Register - Register]
+ * void fname(uint Rd, uint Rs1, uint Rs2)
+ *
+ * I-Type  [Register - Immediate]
+ * void fname(uint Rd, uint Rs1, uint imm)
+ *
+ * S-Type [Store]
+ * void fname(uint Rs1, uint Rs2, uint imm)
+ *
+ * U-Type [Upper Immediate]
+ * void fname(uint Rd, uint imm)
+ *  
+ */
+
+#include <cstdint>
+
+void fix_mpy(uint32_t Rd, uint32_t Rs1, uint32_t Rs2);
@@ -0,0 +1 @@
+#include <cstdint>
@@ -0,0 +1,2 @@
+#include <cstdint>
+#include "/root/package/python/tst/files/testBatchBuild/models/registers.hh"
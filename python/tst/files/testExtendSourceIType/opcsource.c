@@ -0,0 +1,6 @@
+{
+{ test },
+
+/* Terminate the list.  */
+{0, 0, 0, 0, 0, 0, 0}
+};
\ No newline at end of file
@@ -0,0 +1,14 @@
+#include <cstdint>
+
+uint8_t opc    = 10;  // opc, 5 bits
+uint8_t funct3 = 7;  // funct3, 3 bits
+
+void nocycles(
+		uint32_t Rd_uw,
+        uint32_t Rs1_uw,
+        uint32_t imm
+)
+{
+    // function definition
+}
+
@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python
 
 # Copyright (c) 2018 TU Dresden
 # All rights reserved.
@@ -28,13 +28,31 @@
 #
 # Authors: Robert Scheffel
 
+from testcases import api_ut
+from testcases import batch_ut
+from testcases import cache_ut
 from testcases import compiler_ut
+from testcases import daemon_ut
+from testcases import depgraph_ut
+from testcases import export_ut
 from testcases import gem5_ut
 from testcases import extensions_ut
+from testcases import frontend_ut
 from testcases import instruction_ut
+from testcases import latency_ut
+from testcases import libclang_ut
+from testcases import lockfile_ut
+from testcases import locking_ut
 from testcases import model_ut
+from testcases import orchestrator_ut
 from testcases import parser_ut
+from testcases import pch_ut
+from testcases import profiling_ut
 from testcases import registers_ut
+from testcases import store_ut
+from testcases import templating_ut
+from testcases import watcher_ut
+from testcases import writer_ut
 
 import unittest
 
@@ -42,20 +60,56 @@ import unittest
 if __name__ == '__main__':
     # load test cases
     suiteList = []
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        api_ut.TestApi))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        batch_ut.TestBatch))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        cache_ut.TestCache))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         compiler_ut.TestCompiler))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        daemon_ut.TestDaemon))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        depgraph_ut.TestDependencyGraph))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        export_ut.TestExport))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         gem5_ut.TestGem5))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         extensions_ut.TestExtensions))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        frontend_ut.TestFrontend))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         instruction_ut.TestInstruction))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        latency_ut.TestLatency))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        libclang_ut.TestLibclang))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        lockfile_ut.TestEncodingLock))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        locking_ut.TestLocking))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         model_ut.TestModel))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        orchestrator_ut.TestOrchestrator))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         parser_ut.TestParser))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        pch_ut.TestPrecompiledHeader))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        profiling_ut.TestProfiling))
     suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
         registers_ut.TestRegisters))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        store_ut.TestStore))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        templating_ut.TestTemplating))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        watcher_ut.TestWatcher))
+    suiteList.append(unittest.TestLoader().loadTestsFromTestCase(
+        writer_ut.TestFileWriter))
 
     # join them and run
     suite = unittest.TestSuite(suiteList)
@@ -0,0 +1,222 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append('..')
+from modelparsing import api
+from modelparsing.exceptions import ConsistencyError
+from tst import folderpath
+sys.path.remove('..')
+
+MODEL = '''
+#include <cstdint>
+#include "../registers.hh"
+
+uint8_t cycles = 2;
+uint8_t opc    = 0x02;
+uint8_t funct3 = 0x00;
+uint8_t funct7 = 0x00;
+
+void mac(uint32_t Rd, uint32_t Rs1, uint32_t Rs2)
+{
+    uint32_t acc = READ_CUSTOM_REG(c0);
+    acc = acc + Rs1 * Rs2;
+    WRITE_CUSTOM_REG(c0, acc);
+    Rd = acc;
+    (void) Rd;
+}
+'''
+
+REGISTERS = '''
+#include <cstdint>
+
+#define c0 0x800
+
+uint32_t READ_CUSTOM_REG(uint32_t reg);
+void WRITE_CUSTOM_REG(uint32_t reg, uint32_t val);
+'''
+
+
+class TestApi(unittest.TestCase):
+    '''
+    Tests for building extensions in memory.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestApi, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testParseSource(self):
+        models = api.parse(MODEL, 'mac/mac.cc',
+                           headers={'registers.hh': REGISTERS})
+        self.assertEqual(len(models), 1)
+        model = models[0]
+        self.assertEqual(model.name, 'mac')
+        self.assertEqual((model.opc, model.funct3, model.funct7),
+                         (0x02, 0x00, 0x00))
+        self.assertEqual(model.cycles, 2)
+        self.assertEqual((model.reads, model.writes), (('c0',), ('c0',)))
+        self.assertIsNotNone(model.estimated_cycles)
+
+    def testParseSourceFast(self):
+        models = api.parse(MODEL, 'mac/mac.cc',
+                           headers={'registers.hh': REGISTERS}, fast=True)
+        self.assertEqual([model.name for model in models], ['mac'])
+
+        # without the header, the registers are unknown to both front-ends
+        with self.assertRaises(ConsistencyError):
+            api.parse(MODEL, 'mac/mac.cc', fast=True)
+
+    def testParseSourceStrict(self):
+        models = api.parse(MODEL, 'mac/mac.cc',
+                           headers={'registers.hh': REGISTERS}, strict=True)
+        self.assertEqual([model.name for model in models], ['mac'])
+
+        # g++ sees the in-memory headers only
+        with self.assertRaises(ConsistencyError):
+            api.parse(MODEL, 'mac/mac.cc', strict=True)
+
+    def testMissingHeader(self):
+        with self.assertRaises(ConsistencyError):
+            api.parse(MODEL, 'mac/mac.cc')
+
+    def testSpec(self):
+        model = api.spec('add3', 'R', 0x0a, 0x1, 1, 'Rd = Rs1 + Rs2 + 3;',
+                         funct7=0x2)
+        self.assertEqual(model.name, 'add3')
+        self.assertEqual(model.form, 'R')
+        self.assertEqual(model.definition, '{\n    Rd = Rs1 + Rs2 + 3;\n}')
+        self.assertTrue(model.pure)
+
+        # the encoding is checked like the one of a model file
+        with self.assertRaises(ValueError):
+            api.spec('add3', 'R', 0x0a, 0x8, 1, 'Rd = Rs1;')
+
+    def testBuildModels(self):
+        build = api.build(
+            [MODEL, {'name': 'addi3', 'form': 'I', 'opc': 0x0a,
+                     'funct3': 0x1, 'cycles': 1,
+                     'definition': '{ Rd = Rs1 + imm + 3; }'}],
+            registers=REGISTERS)
+
+        self.assertEqual([model.name for model in build.models],
+                         ['mac', 'addi3', 'read_custreg', 'write_custreg'])
+        self.assertIn('MATCH_MAC', build.custom_header)
+        self.assertEqual(len(build.opcode_entries), 4)
+        self.assertIn('void MAC(', build.intrinsics)
+        self.assertIn('#define c0 0x800', build.regsintr)
+        self.assertIn('R32Op::mac', build.decoder)
+        self.assertIn('MinorFUTimingAddi3', build.timings)
+        self.assertEqual(sorted(build.files()),
+                         ['custom.isa', 'minor_custom_timings.py',
+                          'regsintr.hh', 'riscv-custom-opc.h',
+                          'riscvintr.h'])
+
+    def testInstallTwice(self):
+        top = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, top)
+        tc = os.path.join(top, 'toolchain')
+        inst = os.path.join(top, 'inst/riscv')
+        opch = os.path.join(tc,
+                            'riscv-binutils-gdb/include/opcode/riscv-opc.h')
+        opcc = os.path.join(tc, 'riscv-binutils-gdb/opcodes/riscv-opc.c')
+        os.makedirs(os.path.dirname(opch))
+        os.makedirs(os.path.dirname(opcc))
+        os.makedirs(os.path.join(
+            inst, 'lib/gcc/riscv32-unknown-elf/7.2.0/include'))
+        with open(os.path.join(tc, 'Makefile'), 'w') as fh:
+            fh.write('INSTALL_DIR := {}\n'.format(inst))
+        with open(opch, 'w') as fh:
+            fh.write('#ifndef RISCV_ENCODING_H\n')
+        with open(opcc, 'w') as fh:
+            fh.write('{\n/* Terminate the list.  */\n{0, 0, 0}\n};')
+        buildpath = os.path.join(top, 'build')
+
+        add3 = api.build([{'name': 'add3', 'form': 'R', 'opc': 0x0a,
+                           'funct3': 0x1, 'funct7': 0x2, 'cycles': 1,
+                           'definition': 'Rd = Rs1 + Rs2 + 3;'}])
+        sub3 = api.build([{'name': 'sub3', 'form': 'R', 'opc': 0x0a,
+                           'funct3': 0x2, 'funct7': 0x2, 'cycles': 1,
+                           'definition': 'Rd = Rs1 - Rs2 - 3;'}])
+        add3.install(tc, buildpath=buildpath)
+        sub3.install(tc, buildpath=buildpath)
+
+        # the instructions of the first install are removed
+        with open(opcc, 'r') as fh:
+            source = fh.read()
+        self.assertIn('"sub3"', source)
+        self.assertNotIn('"add3"', source)
+        with open(opch, 'r') as fh:
+            self.assertEqual(fh.read().count('riscv-custom-opc.h'), 1)
+        with open(opch + '_old', 'r') as fh:
+            self.assertEqual(fh.read(), '#ifndef RISCV_ENCODING_H\n')
@@ -0,0 +1,194 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import multiprocessing
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.batch import Batch
+from modelparsing.batch import configurations
+from tst import folderpath
+sys.path.remove('..')
+
+EXTENSIONS = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                          '../../../extensions')
+
+
+class TestBatch(unittest.TestCase):
+    '''
+    Tests for building several configurations in one process.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestBatch, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        # the encoding locks are written next to the models
+        self.models = os.path.join(self.folderpath, 'models')
+        if not os.path.isdir(self.models):
+            shutil.copytree(EXTENSIONS, self.models)
+        self.output = os.path.join(self.folderpath, 'output')
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testBatchConfigurations(self):
+        configs = configurations(['a/models', 'b/models/', 'c/mac.cc'])
+        self.assertEqual([config.name for config in configs],
+                         ['models', 'models-2', 'mac'])
+        self.assertEqual([config.modelpath for config in configs],
+                         ['a/models', 'b/models/', 'c/mac.cc'])
+
+    def testBatchConfigFile(self):
+        sections = os.path.join(self.folderpath, 'sets.ini')
+        with open(sections, 'w') as fh:
+            fh.write('[DEFAULT]\nTOOLCHAIN = ~/riscv-gnu-toolchain\n' +
+                     '[all]\nMODELPATH = models\n' +
+                     '[mac]\nMODELPATH = models/mac\n')
+        default = os.path.join(self.folderpath, 'config.ini')
+        with open(default, 'w') as fh:
+            fh.write('[DEFAULT]\nMODELPATH = {}\n'.format(self.models))
+
+        configs = configurations([sections, default])
+        self.assertEqual([config.name for config in configs],
+                         ['all', 'mac', 'config'])
+        self.assertEqual([os.path.realpath(config.modelpath)
+                          for config in configs],
+                         [os.path.realpath(self.models),
+                          os.path.realpath(os.path.join(self.models, 'mac')),
+                          os.path.realpath(self.models)])
+
+        with self.assertRaises(ValueError):
+            configurations([os.path.join(self.folderpath, 'missing.ini')])
+
+    def testBatchFailure(self):
+        configs = configurations([os.path.join(self.models, 'missing.cc')])
+        results = Batch(configs, self.output).run()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['name'], 'missing')
+        self.assertIsNotNone(results[0]['error'])
+
+    def testBatchBuild(self):
+        configs = configurations([self.models,
+                                  os.path.join(self.models, 'mac')])
+        batch = Batch(configs, self.output)
+        results = batch.run()
+
+        self.assertEqual([result['error'] for result in results],
+                         [None, None])
+        self.assertEqual([result['models'] for result in results], [3, 1])
+        for config in configs:
+            for name in ['custom.isa', 'minor_custom_timings.py',
+                         'regsintr.hh', 'riscv-custom-opc.h',
+                         'riscvintr.h']:
+                self.assertTrue(os.path.isfile(
+                    os.path.join(self.output, config.name, name)))
+
+        # the models of the second configuration were parsed by the first
+        mac = os.path.join(self.models, 'mac', 'mac.cc')
+        self.assertIn(mac, batch.parsed)
+        self.assertEqual(len(batch.parsed), 3)
+        self.assertTrue(any(os.path.join(self.output, 'mac') in path
+                            for _, path in results[1]['changes']))
+
+        # unchanged files are not written again
+        results = Batch(configs, self.output).run()
+        self.assertEqual([len(result['changes']) for result in results],
+                         [0, 0])
+
+    def testBatchPlan(self):
+        configs = configurations([os.path.join(self.models, 'mac')])
+        results = Batch(configs, self.output, plan=True).run()
+
+        self.assertEqual(results[0]['error'], None)
+        self.assertTrue(any(os.path.join(self.output, 'mac') in path
+                            for _, path in results[0]['changes']))
+        # neither the cache nor the precompiled header are written
+        self.assertFalse(os.path.exists(self.output))
+
+    @unittest.skipIf(not hasattr(multiprocessing, 'get_start_method'),
+                     'start methods need Python 3.4')
+    def testBatchSpawn(self):
+        # the workers do not depend on state inherited by fork
+        method = multiprocessing.get_start_method(allow_none=True)
+        multiprocessing.set_start_method('spawn', force=True)
+        self.addCleanup(multiprocessing.set_start_method, method,
+                        force=True)
+        # spawned workers import the modelparsing package again
+        sys.path.append('..')
+        self.addCleanup(sys.path.remove, '..')
+
+        configs = configurations([self.models,
+                                  os.path.join(self.models, 'mac'),
+                                  os.path.join(self.models, 'binom')])
+        results = Batch(configs, self.output).run(processes=2)
+        self.assertEqual([result['error'] for result in results],
+                         [None, None, None])
+        self.assertEqual([result['models'] for result in results],
+                         [3, 1, 1])
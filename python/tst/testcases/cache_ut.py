@@ -0,0 +1,150 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.cache import ModelCache
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestCache(unittest.TestCase):
+    '''
+    Tests for the on-disk model cache.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestCache, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.cache = ModelCache(os.path.join(self.folderpath, 'cache'))
+
+        # model, that includes a header, which includes a second one
+        self.model = os.path.join(self.folderpath, 'model.cc')
+        self.header = os.path.join(self.folderpath, 'model.hh')
+        self.regs = os.path.join(self.folderpath, 'registers.hh')
+        with open(self.model, 'w') as fh:
+            fh.write('#include <cstdint>\n' +
+                     '#include "model.hh"\n' +
+                     'uint8_t opc = 0x02;\n')
+        with open(self.header, 'w') as fh:
+            fh.write('#include "registers.hh"\n')
+        with open(self.regs, 'w') as fh:
+            fh.write('#define c0 0x800\n')
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testIncludes(self):
+        includes = self.cache.includes(self.model)
+
+        self.assertEqual(includes, [os.path.abspath(self.model),
+                                    os.path.abspath(self.header),
+                                    os.path.abspath(self.regs)])
+
+    def testKeyStable(self):
+        self.assertEqual(self.cache.key(self.model, 'a'),
+                         self.cache.key(self.model, 'a'))
+
+    def testKeySalt(self):
+        self.assertNotEqual(self.cache.key(self.model, 'a'),
+                            self.cache.key(self.model, 'b'))
+
+    def testKeyTransitiveInclude(self):
+        key = self.cache.key(self.model)
+
+        with open(self.regs, 'a') as fh:
+            fh.write('#define c1 0xcc0\n')
+
+        self.assertNotEqual(key, self.cache.key(self.model))
+
+    def testLoadMissing(self):
+        self.assertIsNone(self.cache.load(self.cache.key(self.model)))
+
+    def testStoreLoad(self):
+        key = self.cache.key(self.model)
+        entry = {'name': 'model', 'opc': 0x02}
+
+        self.cache.store(key, entry)
+
+        self.assertEqual(self.cache.load(key), entry)
+        self.assertEqual(os.listdir(self.cache.cachedir), [key + '.pickle'])
+
+    def testStoreReadonly(self):
+        key = self.cache.key(self.model)
+        self.cache.store(key, {'name': 'model'})
+
+        # a readonly cache loads entries, but stores none
+        readonly = ModelCache(self.cache.cachedir, readonly=True)
+        self.assertEqual(readonly.load(key), {'name': 'model'})
+        other = readonly.key(self.model, 'salt')
+        readonly.store(other, {'name': 'other'})
+        self.assertIsNone(readonly.load(other))
+        self.assertEqual(os.listdir(self.cache.cachedir), [key + '.pickle'])
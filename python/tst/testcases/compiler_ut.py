@@ -179,9 +179,13 @@ class TestCompiler(unittest.TestCase):
     def tearDown(self):
         # remove generated file
         if hasattr(self, '_outcome'):  # Python 3.4+
-            # these 2 methods have no side effects
-            result = self.defaultTestResult()
-            self._feedErrorsToResult(result, self._outcome.errors)
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
         else:
             # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
             result = getattr(self, '_outcomeForDoCleanups',
@@ -0,0 +1,178 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import collections
+import os
+import shutil
+import sys
+import threading
+import unittest
+
+sys.path.append('..')
+from modelparsing.daemon import Client
+from modelparsing.daemon import Daemon
+from modelparsing.daemon import socketpath
+from modelparsing.exceptions import DaemonError
+from tst import folderpath
+sys.path.remove('..')
+
+
+class Parser:
+    '''
+    Stands in for a parser, that parsed the given number of models.
+    '''
+
+    def __init__(self, models):
+        self.parsed = {'model.cc': (None, [None] * models)}
+
+
+class TestDaemon(unittest.TestCase):
+    '''
+    Tests for the modelparser daemon.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestDaemon, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.socket = os.path.join(self.folderpath, 'daemon.sock')
+        self.daemon = Daemon(self.socket, max_parsers=2, max_models=10)
+        self.daemon.start()
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.client = Client(self.socket, timeout=5)
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join(5)
+
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testStatus(self):
+        status = self.client.status()
+        self.assertTrue(status['ok'])
+        self.assertEqual(status['pid'], os.getpid())
+        self.assertEqual(status['parsers'], 0)
+        self.assertEqual(status['builds'], 0)
+        self.assertIsNone(status['mean_build_ms'])
+        self.assertTrue(self.client.available())
+
+    def testNoDaemon(self):
+        client = Client(os.path.join(self.folderpath, 'none.sock'))
+        self.assertIsNone(client.status())
+        self.assertFalse(client.available())
+
+    def testAlreadyRunning(self):
+        with self.assertRaises(DaemonError):
+            Daemon(self.socket).start()
+
+    def testStop(self):
+        self.assertTrue(self.client.stop()['ok'])
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket))
+        self.assertIsNone(self.client.status())
+
+    def testErrors(self):
+        with self.assertRaises(DaemonError):
+            self.client.request({'command': 'unknown'})
+        with self.assertRaises(DaemonError):
+            self.client.build('tc', 'models', unknown=True)
+        # the toolchain does not exist
+        with self.assertRaises(DaemonError):
+            self.client.build(os.path.join(self.folderpath, 'tc'),
+                              self.folderpath)
+        # only failed builds count
+        self.assertEqual(self.client.status()['failures'], 2)
+
+    def testEviction(self):
+        parsers = collections.OrderedDict()
+        for name, models in (('a', 2), ('b', 2), ('c', 2)):
+            parsers[name] = Parser(models)
+        self.daemon._parsers = parsers
+        # at most 2 parsers, the least recently used goes
+        self.daemon.evict()
+        self.assertEqual(list(self.daemon._parsers), ['b', 'c'])
+
+        # at most 10 models, the most recent parser is always kept
+        self.daemon._parsers['d'] = Parser(20)
+        self.daemon.evict()
+        self.assertEqual(list(self.daemon._parsers), ['d'])
+        self.assertEqual(self.client.status()['evictions'], 3)
+
+    def testSocketPath(self):
+        rundir = os.environ.get('XDG_RUNTIME_DIR')
+        if rundir is None:
+            self.addCleanup(os.environ.pop, 'XDG_RUNTIME_DIR', None)
+        else:
+            self.addCleanup(os.environ.__setitem__, 'XDG_RUNTIME_DIR', rundir)
+        os.environ['XDG_RUNTIME_DIR'] = self.folderpath
+
+        # the socket is kept outside of the build directory
+        path = socketpath()
+        self.assertTrue(path.startswith(self.folderpath))
+        self.assertEqual(path, socketpath())
+        self.assertEqual(Client().path, path)
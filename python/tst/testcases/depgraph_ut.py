@@ -0,0 +1,171 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.depgraph import ARTIFACTS
+from modelparsing.depgraph import DependencyGraph
+from modelparsing.model import Model
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestDependencyGraph(unittest.TestCase):
+    '''
+    Tests for the dependency graph of the generated artifacts.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestDependencyGraph, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.path = os.path.join(self.folderpath, 'deps.json')
+        self.output = os.path.join(self.folderpath, 'output')
+        with open(self.output, 'w') as fh:
+            fh.write('generated')
+        self.entry = {'name': 'mac', 'form': 'R', 'opc': 0x02,
+                      'funct3': 0x0, 'funct7': 0x0, 'cycles': 2,
+                      'dfn': '{\n    Rd = Rs1 * Rs2;\n}',
+                      'check_rd': True, 'check_rs1': True,
+                      'check_op2': True, 'rettype': 'void'}
+        self.regmap = {'c0': 0x800}
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def generate(self, **changes):
+        '''
+        Run the graph for the entry with the given changes, return the
+        outdated artifacts and mark them as generated.
+        '''
+        entry = dict(self.entry)
+        entry.update(changes)
+        regmap = entry.pop('regmap', self.regmap)
+        generator = entry.pop('generator', None)
+
+        deps = DependencyGraph(self.path)
+        deps.update([Model(entry=entry)], regmap, generator=generator)
+        outdated = [artifact for artifact in sorted(ARTIFACTS)
+                    if deps.outdated(artifact, [self.output])]
+        for artifact in outdated:
+            deps.commit(artifact, [self.output])
+        return outdated
+
+    def testFirstRun(self):
+        self.assertEqual(self.generate(), sorted(ARTIFACTS))
+        # the graph is persisted
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(self.generate(), [])
+
+    def testDefinitionChanged(self):
+        # a new definition body only touches the gem5 decoder
+        self.generate()
+        self.assertEqual(
+            self.generate(dfn='{\n    Rd = Rs1 + Rs2;\n}'), ['decoder'])
+
+    def testEncodingChanged(self):
+        self.generate()
+        self.assertEqual(self.generate(funct7=0x1),
+                         ['decoder', 'intrinsics', 'opcodes', 'timings'])
+
+    def testRegistersChanged(self):
+        self.generate()
+        self.assertEqual(self.generate(regmap={'c0': 0x800, 'c1': 0x801}),
+                         ['intrinsics', 'regsintr'])
+
+    def testTimingChanged(self):
+        self.generate()
+        self.assertEqual(self.generate(cycles=4), ['timings'])
+
+    def testGeneratorChanged(self):
+        # e.g. a template was edited
+        self.generate(generator='a')
+        self.assertEqual(self.generate(generator='a'), [])
+        self.assertEqual(self.generate(generator='b'), sorted(ARTIFACTS))
+
+    def testMissingOutput(self):
+        self.generate()
+        os.remove(self.output)
+        self.assertEqual(self.generate(), sorted(ARTIFACTS))
+
+    def testChangedOutput(self):
+        self.generate()
+        # another job generated into the same output
+        with open(self.output, 'w') as fh:
+            fh.write('generated by another job')
+        os.utime(self.output, (1000000000, 1000000000))
+        self.assertEqual(self.generate(), sorted(ARTIFACTS))
+        self.assertEqual(self.generate(), [])
+
+    def testInvalidate(self):
+        self.generate()
+        DependencyGraph(self.path).invalidate()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(self.generate(), sorted(ARTIFACTS))
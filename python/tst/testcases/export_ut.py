@@ -0,0 +1,183 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing import export
+from modelparsing.instruction import Instruction
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestExport(unittest.TestCase):
+    '''
+    Tests for the manifest of the extensions.
+    '''
+
+    class Model:
+        def __init__(self, name, form, funct3, reads=(), writes=(),
+                     estimated=None):
+            self.name = name
+            self.form = form
+            self.opc = 0x02
+            self.funct3 = funct3
+            self.funct7 = 0x00 if form == 'R' else 0xff
+            self.cycles = self.declared_cycles = 2
+            self.estimated_cycles = self.critical_path = estimated
+            self.reads = reads
+            self.writes = writes
+            self.definition = '{\n    Rd = Rs1 * Rs2;\n}'
+
+    class Extensions:
+        def __init__(self, models):
+            self.models = models
+            self.instructions = []
+            for model in models:
+                name = model.name.upper()
+                self.instructions.append(Instruction(
+                    model.cycles, model.form,
+                    '#define MASK_{} 0xfe00707f'.format(name),
+                    '#define MATCH_{} 0x{:x}'.format(
+                        name, 0x0b | model.funct3 << 12),
+                    model.name))
+
+    class Registers:
+        regmap = {'c0': 0x800, 'c1': 0x801}
+
+    def __init__(self, *args, **kwargs):
+        super(TestExport, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.exts = self.Extensions([
+            self.Model('mac', 'R', 0x0, reads=('c0',), writes=('c0',),
+                       estimated=3),
+            self.Model('addi3', 'I', 0x1),
+            self.Model('read_custreg', 'R', 0x7, reads=('*',))])
+        self.manifest = export.manifest(self.exts, self.Registers())
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testExportManifest(self):
+        self.assertEqual(self.manifest['version'], export.MANIFEST_VERSION)
+        self.assertEqual(self.manifest['registers'],
+                         {'c0': 0x800, 'c1': 0x801})
+        mac = self.manifest['instructions'][0]
+        self.assertEqual(mac['name'], 'mac')
+        self.assertEqual(mac['operands'], 'd,s,t')
+        self.assertEqual((mac['mask'], mac['match']), (0xfe00707f, 0x0b))
+        self.assertEqual((mac['maskname'], mac['matchname']),
+                         ('MASK_MAC', 'MATCH_MAC'))
+        self.assertEqual((mac['reads'], mac['writes']), (['c0'], ['c0']))
+        self.assertEqual(mac['estimated_cycles'], 3)
+        addi3 = self.manifest['instructions'][1]
+        self.assertEqual((addi3['form'], addi3['operands']), ('I', 'd,s,j'))
+        self.assertIsNone(addi3['critical_path'])
+
+    def testBinary(self):
+        data = export.pack(self.manifest)
+        self.assertTrue(data.startswith(export.MAGIC))
+        # the binary form is the same manifest as the JSON one
+        self.assertEqual(export.unpack(data),
+                         json.loads(export.dumps(self.manifest)))
+        # more compact than the JSON
+        self.assertLess(len(data), len(export.dumps(self.manifest)))
+
+        with self.assertRaises(ValueError):
+            export.unpack(b'XXXX' + data[4:])
+
+    def testBinaryRegisters(self):
+        # register addresses are not limited to 16 bits
+        self.manifest['registers'] = {'q0': 0x7000000, 'c0': 0x800}
+        self.assertEqual(export.unpack(export.pack(self.manifest)),
+                         json.loads(export.dumps(self.manifest)))
+
+    def testLoad(self):
+        jsonfile = os.path.join(self.folderpath, export.MANIFEST_JSON)
+        binfile = os.path.join(self.folderpath, export.MANIFEST_BIN)
+        with open(jsonfile, 'w') as fh:
+            fh.write(export.dumps(self.manifest))
+        with open(binfile, 'wb') as fh:
+            fh.write(export.pack(self.manifest))
+        self.assertEqual(export.load(jsonfile), export.load(binfile))
+
+    def testStandalone(self):
+        # consumers load the manifest without clang and mako
+        top = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                           '../..')
+        script = ('import sys\n' +
+                  'from modelparsing import export\n' +
+                  'print(sorted(m for m in ("clang", "clang.cindex", ' +
+                  '"mako") if m in sys.modules))\n')
+        out = subprocess.check_output([sys.executable, '-c', script],
+                                      cwd=top)
+        self.assertEqual(out.strip(), b'[]')
@@ -84,30 +84,30 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 1)
+        self.assertEqual(len(ext.models), 1)
 
         insts = ext.instructions
 
-        self.assertEquals(len(insts), 1)
-
-        self.assertEquals(insts[0].form, 'I')
-        self.assertEquals(insts[0].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[0].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[0].maskvalue, 0x707f)
-        self.assertEquals(insts[0].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[0].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[0].matchvalue, 0xb)
-        self.assertEquals(insts[0].name, 'itype')
-        self.assertEquals(insts[0].operands, 'd,s,j')
-        self.assertEquals(insts[-1].form, 'I')
-        self.assertEquals(insts[-1].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[-1].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[-1].maskvalue, 0x707f)
-        self.assertEquals(insts[-1].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[-1].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[-1].matchvalue, 0xb)
-        self.assertEquals(insts[-1].name, 'itype')
-        self.assertEquals(insts[-1].operands, 'd,s,j')
+        self.assertEqual(len(insts), 1)
+
+        self.assertEqual(insts[0].form, 'I')
+        self.assertEqual(insts[0].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[0].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[0].maskvalue, 0x707f)
+        self.assertEqual(insts[0].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[0].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[0].matchvalue, 0xb)
+        self.assertEqual(insts[0].name, 'itype')
+        self.assertEqual(insts[0].operands, 'd,s,j')
+        self.assertEqual(insts[-1].form, 'I')
+        self.assertEqual(insts[-1].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[-1].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[-1].maskvalue, 0x707f)
+        self.assertEqual(insts[-1].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[-1].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[-1].matchvalue, 0xb)
+        self.assertEqual(insts[-1].name, 'itype')
+        self.assertEqual(insts[-1].operands, 'd,s,j')
 
     def testExtensionsInstructionsRType(self):
         name = 'rtype'
@@ -117,30 +117,30 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 1)
+        self.assertEqual(len(ext.models), 1)
 
         insts = ext.instructions
 
-        self.assertEquals(len(insts), 1)
-
-        self.assertEquals(insts[0].form, 'R')
-        self.assertEquals(insts[0].mask, '#define MASK_RTYPE  0xfe00707f\n')
-        self.assertEquals(insts[0].maskname, 'MASK_RTYPE')
-        self.assertEquals(insts[0].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[0].match, '#define MATCH_RTYPE 0x400000b\n')
-        self.assertEquals(insts[0].matchname, 'MATCH_RTYPE')
-        self.assertEquals(insts[0].matchvalue, 0x400000b)
-        self.assertEquals(insts[0].name, 'rtype')
-        self.assertEquals(insts[0].operands, 'd,s,t')
-        self.assertEquals(insts[-1].form, 'R')
-        self.assertEquals(insts[-1].mask, '#define MASK_RTYPE  0xfe00707f\n')
-        self.assertEquals(insts[-1].maskname, 'MASK_RTYPE')
-        self.assertEquals(insts[-1].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[-1].match, '#define MATCH_RTYPE 0x400000b\n')
-        self.assertEquals(insts[-1].matchname, 'MATCH_RTYPE')
-        self.assertEquals(insts[-1].matchvalue, 0x400000b)
-        self.assertEquals(insts[-1].name, 'rtype')
-        self.assertEquals(insts[-1].operands, 'd,s,t')
+        self.assertEqual(len(insts), 1)
+
+        self.assertEqual(insts[0].form, 'R')
+        self.assertEqual(insts[0].mask, '#define MASK_RTYPE  0xfe00707f\n')
+        self.assertEqual(insts[0].maskname, 'MASK_RTYPE')
+        self.assertEqual(insts[0].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[0].match, '#define MATCH_RTYPE 0x400000b\n')
+        self.assertEqual(insts[0].matchname, 'MATCH_RTYPE')
+        self.assertEqual(insts[0].matchvalue, 0x400000b)
+        self.assertEqual(insts[0].name, 'rtype')
+        self.assertEqual(insts[0].operands, 'd,s,t')
+        self.assertEqual(insts[-1].form, 'R')
+        self.assertEqual(insts[-1].mask, '#define MASK_RTYPE  0xfe00707f\n')
+        self.assertEqual(insts[-1].maskname, 'MASK_RTYPE')
+        self.assertEqual(insts[-1].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[-1].match, '#define MATCH_RTYPE 0x400000b\n')
+        self.assertEqual(insts[-1].matchname, 'MATCH_RTYPE')
+        self.assertEqual(insts[-1].matchvalue, 0x400000b)
+        self.assertEqual(insts[-1].name, 'rtype')
+        self.assertEqual(insts[-1].operands, 'd,s,t')
 
     def testExtensionsInstructionsMultipleITypes(self):
         name = 'itype'
@@ -152,48 +152,48 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 2)
+        self.assertEqual(len(ext.models), 2)
 
         insts = ext.instructions
 
-        self.assertEquals(len(insts), 2)
-
-        self.assertEquals(insts[0].form, 'I')
-        self.assertEquals(insts[0].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[0].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[0].maskvalue, 0x707f)
-        self.assertEquals(insts[0].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[0].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[0].matchvalue, 0xb)
-        self.assertEquals(insts[0].name, 'itype')
-        self.assertEquals(insts[0].operands, 'd,s,j')
-        self.assertEquals(insts[-2].form, 'I')
-        self.assertEquals(insts[-2].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[-2].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[-2].maskvalue, 0x707f)
-        self.assertEquals(insts[-2].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[-2].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[-2].matchvalue, 0xb)
-        self.assertEquals(insts[-2].name, 'itype')
-        self.assertEquals(insts[-2].operands, 'd,s,j')
-        self.assertEquals(insts[1].form, 'I')
-        self.assertEquals(insts[1].mask, '#define MASK_ITYPE0  0x707f\n')
-        self.assertEquals(insts[1].maskname, 'MASK_ITYPE0')
-        self.assertEquals(insts[1].maskvalue, 0x707f)
-        self.assertEquals(insts[1].match, '#define MATCH_ITYPE0 0x100b\n')
-        self.assertEquals(insts[1].matchname, 'MATCH_ITYPE0')
-        self.assertEquals(insts[1].matchvalue, 0x100b)
-        self.assertEquals(insts[1].name, 'itype0')
-        self.assertEquals(insts[1].operands, 'd,s,j')
-        self.assertEquals(insts[-1].form, 'I')
-        self.assertEquals(insts[-1].mask, '#define MASK_ITYPE0  0x707f\n')
-        self.assertEquals(insts[-1].maskname, 'MASK_ITYPE0')
-        self.assertEquals(insts[-1].maskvalue, 0x707f)
-        self.assertEquals(insts[-1].match, '#define MATCH_ITYPE0 0x100b\n')
-        self.assertEquals(insts[-1].matchname, 'MATCH_ITYPE0')
-        self.assertEquals(insts[-1].matchvalue, 0x100b)
-        self.assertEquals(insts[-1].name, 'itype0')
-        self.assertEquals(insts[-1].operands, 'd,s,j')
+        self.assertEqual(len(insts), 2)
+
+        self.assertEqual(insts[0].form, 'I')
+        self.assertEqual(insts[0].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[0].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[0].maskvalue, 0x707f)
+        self.assertEqual(insts[0].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[0].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[0].matchvalue, 0xb)
+        self.assertEqual(insts[0].name, 'itype')
+        self.assertEqual(insts[0].operands, 'd,s,j')
+        self.assertEqual(insts[-2].form, 'I')
+        self.assertEqual(insts[-2].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[-2].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[-2].maskvalue, 0x707f)
+        self.assertEqual(insts[-2].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[-2].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[-2].matchvalue, 0xb)
+        self.assertEqual(insts[-2].name, 'itype')
+        self.assertEqual(insts[-2].operands, 'd,s,j')
+        self.assertEqual(insts[1].form, 'I')
+        self.assertEqual(insts[1].mask, '#define MASK_ITYPE0  0x707f\n')
+        self.assertEqual(insts[1].maskname, 'MASK_ITYPE0')
+        self.assertEqual(insts[1].maskvalue, 0x707f)
+        self.assertEqual(insts[1].match, '#define MATCH_ITYPE0 0x100b\n')
+        self.assertEqual(insts[1].matchname, 'MATCH_ITYPE0')
+        self.assertEqual(insts[1].matchvalue, 0x100b)
+        self.assertEqual(insts[1].name, 'itype0')
+        self.assertEqual(insts[1].operands, 'd,s,j')
+        self.assertEqual(insts[-1].form, 'I')
+        self.assertEqual(insts[-1].mask, '#define MASK_ITYPE0  0x707f\n')
+        self.assertEqual(insts[-1].maskname, 'MASK_ITYPE0')
+        self.assertEqual(insts[-1].maskvalue, 0x707f)
+        self.assertEqual(insts[-1].match, '#define MATCH_ITYPE0 0x100b\n')
+        self.assertEqual(insts[-1].matchname, 'MATCH_ITYPE0')
+        self.assertEqual(insts[-1].matchvalue, 0x100b)
+        self.assertEqual(insts[-1].name, 'itype0')
+        self.assertEqual(insts[-1].operands, 'd,s,j')
 
     def testExtensionsInstructionsMultipleRTypes(self):
         models = []
@@ -226,66 +226,66 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 3)
+        self.assertEqual(len(ext.models), 3)
 
         insts = ext.instructions
 
-        self.assertEquals(len(insts), 3)
-
-        self.assertEquals(insts[0].form, 'R')
-        self.assertEquals(insts[0].mask, '#define MASK_RTYPE0  0xfe00707f\n')
-        self.assertEquals(insts[0].maskname, 'MASK_RTYPE0')
-        self.assertEquals(insts[0].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[0].match, '#define MATCH_RTYPE0 0xb\n')
-        self.assertEquals(insts[0].matchname, 'MATCH_RTYPE0')
-        self.assertEquals(insts[0].matchvalue, 0xb)
-        self.assertEquals(insts[0].name, 'rtype0')
-        self.assertEquals(insts[0].operands, 'd,s,t')
-        self.assertEquals(insts[-3].form, 'R')
-        self.assertEquals(insts[-3].mask, '#define MASK_RTYPE0  0xfe00707f\n')
-        self.assertEquals(insts[-3].maskname, 'MASK_RTYPE0')
-        self.assertEquals(insts[-3].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[-3].match, '#define MATCH_RTYPE0 0xb\n')
-        self.assertEquals(insts[-3].matchname, 'MATCH_RTYPE0')
-        self.assertEquals(insts[-3].matchvalue, 0xb)
-        self.assertEquals(insts[-3].name, 'rtype0')
-        self.assertEquals(insts[-3].operands, 'd,s,t')
-        self.assertEquals(insts[1].form, 'R')
-        self.assertEquals(insts[1].mask, '#define MASK_RTYPE1  0xfe00707f\n')
-        self.assertEquals(insts[1].maskname, 'MASK_RTYPE1')
-        self.assertEquals(insts[1].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[1].match, '#define MATCH_RTYPE1 0x200000b\n')
-        self.assertEquals(insts[1].matchname, 'MATCH_RTYPE1')
-        self.assertEquals(insts[1].matchvalue, 0x200000b)
-        self.assertEquals(insts[1].name, 'rtype1')
-        self.assertEquals(insts[1].operands, 'd,s,t')
-        self.assertEquals(insts[-2].form, 'R')
-        self.assertEquals(insts[-2].mask, '#define MASK_RTYPE1  0xfe00707f\n')
-        self.assertEquals(insts[-2].maskname, 'MASK_RTYPE1')
-        self.assertEquals(insts[-2].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[-2].match, '#define MATCH_RTYPE1 0x200000b\n')
-        self.assertEquals(insts[-2].matchname, 'MATCH_RTYPE1')
-        self.assertEquals(insts[-2].matchvalue, 0x200000b)
-        self.assertEquals(insts[-2].name, 'rtype1')
-        self.assertEquals(insts[-2].operands, 'd,s,t')
-        self.assertEquals(insts[2].form, 'R')
-        self.assertEquals(insts[2].mask, '#define MASK_RTYPE2  0xfe00707f\n')
-        self.assertEquals(insts[2].maskname, 'MASK_RTYPE2')
-        self.assertEquals(insts[2].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[2].match, '#define MATCH_RTYPE2 0x100b\n')
-        self.assertEquals(insts[2].matchname, 'MATCH_RTYPE2')
-        self.assertEquals(insts[2].matchvalue, 0x100b)
-        self.assertEquals(insts[2].name, 'rtype2')
-        self.assertEquals(insts[2].operands, 'd,s,t')
-        self.assertEquals(insts[-1].form, 'R')
-        self.assertEquals(insts[-1].mask, '#define MASK_RTYPE2  0xfe00707f\n')
-        self.assertEquals(insts[-1].maskname, 'MASK_RTYPE2')
-        self.assertEquals(insts[-1].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[-1].match, '#define MATCH_RTYPE2 0x100b\n')
-        self.assertEquals(insts[-1].matchname, 'MATCH_RTYPE2')
-        self.assertEquals(insts[-1].matchvalue, 0x100b)
-        self.assertEquals(insts[-1].name, 'rtype2')
-        self.assertEquals(insts[-1].operands, 'd,s,t')
+        self.assertEqual(len(insts), 3)
+
+        self.assertEqual(insts[0].form, 'R')
+        self.assertEqual(insts[0].mask, '#define MASK_RTYPE0  0xfe00707f\n')
+        self.assertEqual(insts[0].maskname, 'MASK_RTYPE0')
+        self.assertEqual(insts[0].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[0].match, '#define MATCH_RTYPE0 0xb\n')
+        self.assertEqual(insts[0].matchname, 'MATCH_RTYPE0')
+        self.assertEqual(insts[0].matchvalue, 0xb)
+        self.assertEqual(insts[0].name, 'rtype0')
+        self.assertEqual(insts[0].operands, 'd,s,t')
+        self.assertEqual(insts[-3].form, 'R')
+        self.assertEqual(insts[-3].mask, '#define MASK_RTYPE0  0xfe00707f\n')
+        self.assertEqual(insts[-3].maskname, 'MASK_RTYPE0')
+        self.assertEqual(insts[-3].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[-3].match, '#define MATCH_RTYPE0 0xb\n')
+        self.assertEqual(insts[-3].matchname, 'MATCH_RTYPE0')
+        self.assertEqual(insts[-3].matchvalue, 0xb)
+        self.assertEqual(insts[-3].name, 'rtype0')
+        self.assertEqual(insts[-3].operands, 'd,s,t')
+        self.assertEqual(insts[1].form, 'R')
+        self.assertEqual(insts[1].mask, '#define MASK_RTYPE1  0xfe00707f\n')
+        self.assertEqual(insts[1].maskname, 'MASK_RTYPE1')
+        self.assertEqual(insts[1].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[1].match, '#define MATCH_RTYPE1 0x200000b\n')
+        self.assertEqual(insts[1].matchname, 'MATCH_RTYPE1')
+        self.assertEqual(insts[1].matchvalue, 0x200000b)
+        self.assertEqual(insts[1].name, 'rtype1')
+        self.assertEqual(insts[1].operands, 'd,s,t')
+        self.assertEqual(insts[-2].form, 'R')
+        self.assertEqual(insts[-2].mask, '#define MASK_RTYPE1  0xfe00707f\n')
+        self.assertEqual(insts[-2].maskname, 'MASK_RTYPE1')
+        self.assertEqual(insts[-2].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[-2].match, '#define MATCH_RTYPE1 0x200000b\n')
+        self.assertEqual(insts[-2].matchname, 'MATCH_RTYPE1')
+        self.assertEqual(insts[-2].matchvalue, 0x200000b)
+        self.assertEqual(insts[-2].name, 'rtype1')
+        self.assertEqual(insts[-2].operands, 'd,s,t')
+        self.assertEqual(insts[2].form, 'R')
+        self.assertEqual(insts[2].mask, '#define MASK_RTYPE2  0xfe00707f\n')
+        self.assertEqual(insts[2].maskname, 'MASK_RTYPE2')
+        self.assertEqual(insts[2].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[2].match, '#define MATCH_RTYPE2 0x100b\n')
+        self.assertEqual(insts[2].matchname, 'MATCH_RTYPE2')
+        self.assertEqual(insts[2].matchvalue, 0x100b)
+        self.assertEqual(insts[2].name, 'rtype2')
+        self.assertEqual(insts[2].operands, 'd,s,t')
+        self.assertEqual(insts[-1].form, 'R')
+        self.assertEqual(insts[-1].mask, '#define MASK_RTYPE2  0xfe00707f\n')
+        self.assertEqual(insts[-1].maskname, 'MASK_RTYPE2')
+        self.assertEqual(insts[-1].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[-1].match, '#define MATCH_RTYPE2 0x100b\n')
+        self.assertEqual(insts[-1].matchname, 'MATCH_RTYPE2')
+        self.assertEqual(insts[-1].matchvalue, 0x100b)
+        self.assertEqual(insts[-1].name, 'rtype2')
+        self.assertEqual(insts[-1].operands, 'd,s,t')
 
     def testExtensionsInstructionsMultipleIRTypes(self):
         name = 'itype'
@@ -303,48 +303,48 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 2)
+        self.assertEqual(len(ext.models), 2)
 
         insts = ext.instructions
 
-        self.assertEquals(len(insts), 2)
-
-        self.assertEquals(insts[0].form, 'I')
-        self.assertEquals(insts[0].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[0].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[0].maskvalue, 0x707f)
-        self.assertEquals(insts[0].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[0].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[0].matchvalue, 0xb)
-        self.assertEquals(insts[0].name, 'itype')
-        self.assertEquals(insts[0].operands, 'd,s,j')
-        self.assertEquals(insts[-2].form, 'I')
-        self.assertEquals(insts[-2].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[-2].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[-2].maskvalue, 0x707f)
-        self.assertEquals(insts[-2].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[-2].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[-2].matchvalue, 0xb)
-        self.assertEquals(insts[-2].name, 'itype')
-        self.assertEquals(insts[-2].operands, 'd,s,j')
-        self.assertEquals(insts[1].form, 'R')
-        self.assertEquals(insts[1].mask, '#define MASK_RTYPE  0xfe00707f\n')
-        self.assertEquals(insts[1].maskname, 'MASK_RTYPE')
-        self.assertEquals(insts[1].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[1].match, '#define MATCH_RTYPE 0x400100b\n')
-        self.assertEquals(insts[1].matchname, 'MATCH_RTYPE')
-        self.assertEquals(insts[1].matchvalue, 0x400100b)
-        self.assertEquals(insts[1].name, 'rtype')
-        self.assertEquals(insts[1].operands, 'd,s,t')
-        self.assertEquals(insts[-1].form, 'R')
-        self.assertEquals(insts[-1].mask, '#define MASK_RTYPE  0xfe00707f\n')
-        self.assertEquals(insts[-1].maskname, 'MASK_RTYPE')
-        self.assertEquals(insts[-1].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[-1].match, '#define MATCH_RTYPE 0x400100b\n')
-        self.assertEquals(insts[-1].matchname, 'MATCH_RTYPE')
-        self.assertEquals(insts[-1].matchvalue, 0x400100b)
-        self.assertEquals(insts[-1].name, 'rtype')
-        self.assertEquals(insts[-1].operands, 'd,s,t')
+        self.assertEqual(len(insts), 2)
+
+        self.assertEqual(insts[0].form, 'I')
+        self.assertEqual(insts[0].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[0].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[0].maskvalue, 0x707f)
+        self.assertEqual(insts[0].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[0].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[0].matchvalue, 0xb)
+        self.assertEqual(insts[0].name, 'itype')
+        self.assertEqual(insts[0].operands, 'd,s,j')
+        self.assertEqual(insts[-2].form, 'I')
+        self.assertEqual(insts[-2].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[-2].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[-2].maskvalue, 0x707f)
+        self.assertEqual(insts[-2].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[-2].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[-2].matchvalue, 0xb)
+        self.assertEqual(insts[-2].name, 'itype')
+        self.assertEqual(insts[-2].operands, 'd,s,j')
+        self.assertEqual(insts[1].form, 'R')
+        self.assertEqual(insts[1].mask, '#define MASK_RTYPE  0xfe00707f\n')
+        self.assertEqual(insts[1].maskname, 'MASK_RTYPE')
+        self.assertEqual(insts[1].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[1].match, '#define MATCH_RTYPE 0x400100b\n')
+        self.assertEqual(insts[1].matchname, 'MATCH_RTYPE')
+        self.assertEqual(insts[1].matchvalue, 0x400100b)
+        self.assertEqual(insts[1].name, 'rtype')
+        self.assertEqual(insts[1].operands, 'd,s,t')
+        self.assertEqual(insts[-1].form, 'R')
+        self.assertEqual(insts[-1].mask, '#define MASK_RTYPE  0xfe00707f\n')
+        self.assertEqual(insts[-1].maskname, 'MASK_RTYPE')
+        self.assertEqual(insts[-1].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[-1].match, '#define MATCH_RTYPE 0x400100b\n')
+        self.assertEqual(insts[-1].matchname, 'MATCH_RTYPE')
+        self.assertEqual(insts[-1].matchvalue, 0x400100b)
+        self.assertEqual(insts[-1].name, 'rtype')
+        self.assertEqual(insts[-1].operands, 'd,s,t')
 
     def testExtensionsInstructionsMultipleRITypes(self):
         name = 'rtype'
@@ -364,48 +364,48 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 2)
+        self.assertEqual(len(ext.models), 2)
 
         insts = ext.instructions
 
-        self.assertEquals(len(insts), 2)
-
-        self.assertEquals(insts[1].form, 'I')
-        self.assertEquals(insts[1].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[1].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[1].maskvalue, 0x707f)
-        self.assertEquals(insts[1].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[1].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[1].matchvalue, 0xb)
-        self.assertEquals(insts[1].name, 'itype')
-        self.assertEquals(insts[1].operands, 'd,s,j')
-        self.assertEquals(insts[-1].form, 'I')
-        self.assertEquals(insts[-1].mask, '#define MASK_ITYPE  0x707f\n')
-        self.assertEquals(insts[-1].maskname, 'MASK_ITYPE')
-        self.assertEquals(insts[-1].maskvalue, 0x707f)
-        self.assertEquals(insts[-1].match, '#define MATCH_ITYPE 0xb\n')
-        self.assertEquals(insts[-1].matchname, 'MATCH_ITYPE')
-        self.assertEquals(insts[-1].matchvalue, 0xb)
-        self.assertEquals(insts[-1].name, 'itype')
-        self.assertEquals(insts[-1].operands, 'd,s,j')
-        self.assertEquals(insts[0].form, 'R')
-        self.assertEquals(insts[0].mask, '#define MASK_RTYPE  0xfe00707f\n')
-        self.assertEquals(insts[0].maskname, 'MASK_RTYPE')
-        self.assertEquals(insts[0].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[0].match, '#define MATCH_RTYPE 0x400100b\n')
-        self.assertEquals(insts[0].matchname, 'MATCH_RTYPE')
-        self.assertEquals(insts[0].matchvalue, 0x400100b)
-        self.assertEquals(insts[0].name, 'rtype')
-        self.assertEquals(insts[0].operands, 'd,s,t')
-        self.assertEquals(insts[-2].form, 'R')
-        self.assertEquals(insts[-2].mask, '#define MASK_RTYPE  0xfe00707f\n')
-        self.assertEquals(insts[-2].maskname, 'MASK_RTYPE')
-        self.assertEquals(insts[-2].maskvalue, 0xfe00707f)
-        self.assertEquals(insts[-2].match, '#define MATCH_RTYPE 0x400100b\n')
-        self.assertEquals(insts[-2].matchname, 'MATCH_RTYPE')
-        self.assertEquals(insts[-2].matchvalue, 0x400100b)
-        self.assertEquals(insts[-2].name, 'rtype')
-        self.assertEquals(insts[-2].operands, 'd,s,t')
+        self.assertEqual(len(insts), 2)
+
+        self.assertEqual(insts[1].form, 'I')
+        self.assertEqual(insts[1].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[1].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[1].maskvalue, 0x707f)
+        self.assertEqual(insts[1].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[1].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[1].matchvalue, 0xb)
+        self.assertEqual(insts[1].name, 'itype')
+        self.assertEqual(insts[1].operands, 'd,s,j')
+        self.assertEqual(insts[-1].form, 'I')
+        self.assertEqual(insts[-1].mask, '#define MASK_ITYPE  0x707f\n')
+        self.assertEqual(insts[-1].maskname, 'MASK_ITYPE')
+        self.assertEqual(insts[-1].maskvalue, 0x707f)
+        self.assertEqual(insts[-1].match, '#define MATCH_ITYPE 0xb\n')
+        self.assertEqual(insts[-1].matchname, 'MATCH_ITYPE')
+        self.assertEqual(insts[-1].matchvalue, 0xb)
+        self.assertEqual(insts[-1].name, 'itype')
+        self.assertEqual(insts[-1].operands, 'd,s,j')
+        self.assertEqual(insts[0].form, 'R')
+        self.assertEqual(insts[0].mask, '#define MASK_RTYPE  0xfe00707f\n')
+        self.assertEqual(insts[0].maskname, 'MASK_RTYPE')
+        self.assertEqual(insts[0].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[0].match, '#define MATCH_RTYPE 0x400100b\n')
+        self.assertEqual(insts[0].matchname, 'MATCH_RTYPE')
+        self.assertEqual(insts[0].matchvalue, 0x400100b)
+        self.assertEqual(insts[0].name, 'rtype')
+        self.assertEqual(insts[0].operands, 'd,s,t')
+        self.assertEqual(insts[-2].form, 'R')
+        self.assertEqual(insts[-2].mask, '#define MASK_RTYPE  0xfe00707f\n')
+        self.assertEqual(insts[-2].maskname, 'MASK_RTYPE')
+        self.assertEqual(insts[-2].maskvalue, 0xfe00707f)
+        self.assertEqual(insts[-2].match, '#define MATCH_RTYPE 0x400100b\n')
+        self.assertEqual(insts[-2].matchname, 'MATCH_RTYPE')
+        self.assertEqual(insts[-2].matchvalue, 0x400100b)
+        self.assertEqual(insts[-2].name, 'rtype')
+        self.assertEqual(insts[-2].operands, 'd,s,t')
 
     def testExtensionsInstructionsOverlappingIIType(self):
         name = 'itype'
@@ -465,7 +465,7 @@ class TestExtensions(unittest.TestCase):
 
         ext = Extensions(models)
 
-        self.assertEquals(len(ext.models), 1)
+        self.assertEqual(len(ext.models), 1)
 
         header_expected = '''/* Automatically generated by parse-opcodes.  */
 #ifndef RISCV_CUSTOM_ENCODING_H
@@ -934,4 +934,4 @@ DECLARE_CUSTOM_CAUSE("store page fault", CAUSE_STORE_PAGE_FAULT)
 #endif
 '''
 
-        self.assertEquals(header_expected, ext.cust_header)
+        self.assertEqual(header_expected, ext.cust_header)
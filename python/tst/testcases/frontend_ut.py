@@ -0,0 +1,258 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import itertools
+import os
+import shutil
+import sys
+import unittest
+
+from scripts import model_gen
+from scripts.ccmodel import CCModel
+from mako.template import Template
+
+sys.path.append('..')
+from modelparsing.exceptions import ConsistencyError
+from modelparsing.exceptions import FrontendError
+from modelparsing.frontend import Frontend
+from modelparsing.model import Model
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestFrontend(unittest.TestCase):
+    '''
+    Tests for the pure Python front-end of the model dialect.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestFrontend, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testRType(self):
+        source = '''\
+#include <cstdint>
+#include "../registers.hh"
+
+uint8_t cycles = 2;     // cycle count
+uint8_t opc    = 0x02;  // opc, 5 bits
+uint8_t funct3 = 0x00;  /* funct3, 3 bits */
+uint8_t funct7 = 0x01;  // funct7, 7 bits
+
+void mac(
+    uint32_t Rd,
+    uint32_t Rs1,
+    uint32_t Rs2
+)
+{
+    uint32_t tmp = Rs1 * Rs2;
+    if (tmp) { Rd = tmp; }
+}
+'''
+        info = Frontend(source).parse()
+
+        self.assertEqual(info['name'], 'mac')
+        self.assertEqual(info['rettype'], 'void')
+        self.assertEqual(info['form'], 'R')
+        self.assertEqual(info['cycles'], 2)
+        self.assertEqual(info['opc'], 0x02)
+        self.assertEqual(info['funct3'], 0x00)
+        self.assertEqual(info['funct7'], 0x01)
+        self.assertTrue(info['check_rd'])
+        self.assertTrue(info['check_rs1'])
+        self.assertTrue(info['check_op2'])
+        self.assertEqual(info['dfn'], '''{
+    uint32_t tmp = Rs1 * Rs2;
+    if (tmp) { Rd = tmp; }
+}''')
+
+    def testPrototype(self):
+        # a prototype, followed by the definition
+        source = '''\
+void itype(uint32_t Rd, uint32_t Rs1, uint32_t imm);
+void itype(uint32_t Rd, uint32_t Rs1, uint32_t imm) {}
+'''
+        info = Frontend(source).parse()
+
+        self.assertEqual(info['name'], 'itype')
+        self.assertEqual(info['form'], 'I')
+        self.assertEqual(info['dfn'], '{}')
+
+    def testUnsupported(self):
+        sources = ['#define OPC 0x02\n',
+                   'uint8_t opc = OPC;\n',
+                   'uint8_t opc = -1;\n',
+                   'namespace a {}\n',
+                   'extern "C" void f(uint32_t Rd);\n',
+                   'void f(unknown_t Rd) {}\n',
+                   'void f(uint32_t Rd) { return; }\n',
+                   'void f(uint32_t Rd) {\n',
+                   'void f(uint32_t Rd) { /* unterminated }\n']
+
+        for source in sources:
+            with self.assertRaises(FrontendError):
+                Frontend(source).parse()
+
+    def testBody(self):
+        header = '''\
+#define c0 0x800
+uint32_t READ_CUSTOM_REG(uint32_t reg);
+void WRITE_CUSTOM_REG(uint32_t reg, uint32_t val);
+'''
+        source = '''\
+#include "registers.hh"
+
+uint8_t cycles = 1;
+
+void body(uint32_t Rd, uint32_t Rs1, uint32_t imm)
+{
+    %s
+}
+'''
+        valid = ['uint32_t tmp = Rs1 + imm;\n    Rd = tmp * tmp;',
+                 'Rd = (Rs1 << 2) >= imm ? -Rs1 : (uint32_t) ~imm;',
+                 'if (Rs1) Rd = 0x10u; else { int a = 1, b = a; Rd += b; }',
+                 'WRITE_CUSTOM_REG(c0, READ_CUSTOM_REG(c0) + Rs1);',
+                 '(void) Rs1;']
+        invalid = ['Rd = undefined_thing + ;',
+                   'Rd = undefined_thing;',
+                   'Rd = Rs1 +;',
+                   '1 = Rd;',
+                   'const uint32_t a = 1;\n    a = Rs1;',
+                   'uint32_t a;\n    uint32_t a;',
+                   'Rd = WRITE_CUSTOM_REG(c0, Rs1);',
+                   'Rd = READ_CUSTOM_REG(c0, Rs1);',
+                   'Rd = undefined_function(Rs1);',
+                   'Rd = Rs1[0];',
+                   'Rd = (void) Rs1;']
+
+        for body in valid:
+            info = Frontend(source % body, [header]).parse()
+            self.assertEqual(info['dfn'], '{\n    %s\n}' % body)
+        for body in invalid:
+            with self.assertRaises(FrontendError):
+                Frontend(source % body, [header]).parse()
+
+    def testInvalidBody(self):
+        # the fast front-end leaves an invalid body to libclang
+        filename = os.path.join(self.folderpath, 'invalid.cc')
+        with open(filename, 'w') as fh:
+            fh.write('''\
+#include <cstdint>
+
+uint8_t cycles = 1;
+uint8_t opc = 0x02;
+uint8_t funct3 = 0x00;
+
+void invalid(uint32_t Rd, uint32_t Rs1, uint32_t imm)
+{
+    Rd = undefined_thing + ;
+}
+''')
+        for fast in (False, True):
+            with self.assertRaises(ConsistencyError):
+                Model(filename, fast=fast)
+
+    def testDifferential(self):
+        # both front-ends have to agree on all generated models
+        faults = [[], ['nord'], ['nors1'], ['noop2'], ['nord', 'nors1'],
+                  ['nodef'], ['noclose'], ['return'], ['nonvoid', 'return'],
+                  ['nocycles'], ['wrongopc']]
+        forms = [('R', 0x02, 0x00, 0x01),
+                 ('I', 0x0a, 0x07, 0xff),
+                 ('R', 0x10, 0x00, 0x7f),
+                 ('I', 0x16, 0xaa, 0xff)]
+        inttypes = ['uint32_t', 'int32_t', 'uint64_t', 'int64_t']
+
+        modelgen = Template(filename=model_gen)
+
+        count = 0
+        for fault, form, inttype in itertools.product(faults, forms,
+                                                      inttypes):
+            count += 1
+            name = 'model{}'.format(count)
+            ftype, opc, funct3, funct7 = form
+            ccmodel = CCModel(name, ftype, inttype, opc, funct3, funct7,
+                              fault)
+            filename = os.path.join(self.folderpath, name + '.cc')
+            with open(filename, 'w') as fh:
+                fh.write(modelgen.render(model=ccmodel))
+
+            results = []
+            for fast in (False, True):
+                try:
+                    entry = Model(filename, fast=fast).to_dict()
+                    # only libclang estimates the latency
+                    del entry['estimated_cycles']
+                    del entry['critical_path']
+                    results.append(entry)
+                except (ConsistencyError, ValueError) as e:
+                    results.append(type(e))
+
+            self.assertEqual(results[0], results[1],
+                             '{} {}'.format(filename, fault))
@@ -27,8 +27,10 @@
 # Authors: Robert Scheffel
 
 import os
+import re
 import shutil
 import sys
+import tempfile
 import unittest
 
 sys.path.append('..')
@@ -43,13 +45,16 @@ class TestGem5(unittest.TestCase):
     '''
 
     class Model:
-        def __init__(self, name, form, opc, funct3, definition, funct7=0xff):
+        def __init__(self, name, form, opc, funct3, definition, funct7=0xff,
+                     reads=(), writes=()):
             self._name = name
             self._form = form
             self._opc = opc
             self._funct3 = funct3
             self._funct7 = funct7
             self._definition = definition
+            self._reads = reads
+            self._writes = writes
 
         @property
         def name(self):
@@ -75,6 +80,14 @@ class TestGem5(unittest.TestCase):
         def definition(self):
             return self._definition
 
+        @property
+        def reads(self):
+            return self._reads
+
+        @property
+        def writes(self):
+            return self._writes
+
     class Extensions:
         def __init__(self, models):
             self._models = models
@@ -83,6 +96,21 @@ class TestGem5(unittest.TestCase):
         def models(self):
             return self._models
 
+    class Gem5:
+        '''
+        Gem5, whose isa parser only copies the included decoder.
+        '''
+
+        def isa_parser(self, outdir, isamain):
+            with open(isamain, 'r') as fh:
+                includes = re.findall(r'##include "([^"]+)"', fh.read())
+            decoder = [path for path in includes
+                       if os.path.basename(path) == 'custom.isa']
+            with open(decoder[0], 'r') as fh:
+                content = fh.read()
+            with open(os.path.join(outdir, 'decoder.cc'), 'w') as fh:
+                fh.write(content)
+
     class Registers:
         def __init__(self, regmap):
             self._regmap = regmap
@@ -122,9 +150,13 @@ class TestGem5(unittest.TestCase):
     def tearDown(self):
         # remove generated file
         if hasattr(self, '_outcome'):  # Python 3.4+
-            # these 2 methods have no side effects
-            result = self.defaultTestResult()
-            self._feedErrorsToResult(result, self._outcome.errors)
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
         else:
             # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
             result = getattr(self, '_outcomeForDoCleanups',
@@ -152,6 +184,8 @@ class TestGem5(unittest.TestCase):
         decoder.gen_decoder()
 
         expect = '''\
+// === AUTO GENERATED FILE ===
+
 decode OPCODE default Unknown::unknown() {
 0x2: decode FUNCT3 {
 0x0: I32Op::itype({{
@@ -176,6 +210,8 @@ decode OPCODE default Unknown::unknown() {
         decoder.gen_decoder()
 
         expect = '''\
+// === AUTO GENERATED FILE ===
+
 decode OPCODE default Unknown::unknown() {
 0x2: decode FUNCT3 {
 0x0: decode FUNCT7 {
@@ -185,6 +221,38 @@ decode OPCODE default Unknown::unknown() {
 }
 }
 }
+'''
+        self.assertEqual(decoder.decoder, expect)
+
+    def testCustomRegisterDecoder(self):
+        # writers of custom registers are serialized, readers are not
+        exts = self.Extensions(
+            [self.Model('reader', 'I', 0x02, 0x0, self.definition,
+                        reads=('c0',)),
+             self.Model('mac', 'R', 0x02, 0x1, self.definition, 0x0,
+                        reads=('c0',), writes=('c0',))])
+
+        decoder = Gem5(exts, self.regs)
+        decoder._buildpath = self.folderpath
+        decoder.gen_decoder()
+
+        expect = '''\
+// === AUTO GENERATED FILE ===
+
+decode OPCODE default Unknown::unknown() {
+0x2: decode FUNCT3 {
+// reader: reads c0
+0x0: I32Op::reader({{
+    test;
+}}, uint32_t, IntCustOp);
+0x1: decode FUNCT7 {
+// mac: reads c0; writes c0
+0x0: R32Op::mac({{
+    test;
+}}, IntCustOp, IsSerializeAfter, IsNonSpeculative);
+}
+}
+}
 '''
         self.assertEqual(decoder.decoder, expect)
 
@@ -209,6 +277,8 @@ decode OPCODE default Unknown::unknown() {
         decoder.gen_decoder()
 
         expect = '''\
+// === AUTO GENERATED FILE ===
+
 decode OPCODE default Unknown::unknown() {
 0x2: decode FUNCT3 {
 0x0: I32Op::itype0({{
@@ -239,3 +309,29 @@ decode OPCODE default Unknown::unknown() {
 }
 '''
         self.assertEqual(decoder.decoder, expect)
+
+    def testBuildpathDecoder(self):
+        # jobs, that generate into different build directories, get the
+        # decoder of their own custom.isa
+        class Decoder(self.Gem5, Gem5):
+            pass
+
+        decoders = []
+        for name in ['first', 'second']:
+            buildpath = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, buildpath)
+            exts = self.Extensions(
+                [self.Model(name, self.form, self.opc, self.funct3,
+                            self.definition)])
+            decoder = Decoder(exts, self.regs, buildpath=buildpath)
+            decoder.gen_decoder()
+            decoder.gen_cxx_files()
+            decoders.append((buildpath, decoder.decoder))
+
+        for buildpath, content in decoders:
+            with open(os.path.join(buildpath, 'isa/main.isa'), 'r') as fh:
+                self.assertIn('##include "{}"'.format(
+                    os.path.join(buildpath, 'isa/custom.isa')), fh.read())
+            with open(os.path.join(buildpath, 'generated/decoder.cc'),
+                      'r') as fh:
+                self.assertEqual(fh.read(), content)
@@ -0,0 +1,174 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.model import Model
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestLatency(unittest.TestCase):
+    '''
+    Tests for the latency estimation of models.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestLatency, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def genModel(self, body, cycles=1):
+        '''
+        Create an R-Type model with the given definition body.
+        '''
+        filename = os.path.join(self.folderpath, 'latency.cc')
+        header = os.path.join(self.folderpath, 'registers.hh')
+        with open(header, 'w') as fh:
+            fh.write('#include <cstdint>\n' +
+                     'uint32_t READ_CUSTOM_REG(uint32_t reg);\n' +
+                     'void WRITE_CUSTOM_REG(uint32_t reg, uint32_t val);\n')
+        with open(filename, 'w') as fh:
+            fh.write('#include "registers.hh"\n\n' +
+                     'uint8_t cycles = {};\n'.format(cycles) +
+                     'uint8_t opc = 0x02;\n' +
+                     'uint8_t funct3 = 0x0;\n' +
+                     'uint8_t funct7 = 0x0;\n\n' +
+                     'void latency(uint32_t Rd, uint32_t Rs1, ' +
+                     'uint32_t Rs2)\n' +
+                     '{\n' + body + '\n}\n')
+        return filename
+
+    def testIndependentOperations(self):
+        # independent operations do not add up
+        model = Model(self.genModel('    uint32_t a = Rs1 + Rs2;\n' +
+                                    '    uint32_t b = Rs1 * Rs2;\n' +
+                                    '    Rd = a;\n' +
+                                    '    (void) b;\n'))
+
+        self.assertEqual(model.estimated_cycles, 3)
+        self.assertEqual(model.critical_path, 1)
+
+    def testDependentOperations(self):
+        # (Rs1 * Rs2) >> 15 and the division by it are dependent
+        model = Model(self.genModel(
+            '    uint32_t a = (Rs1 * Rs2) >> 15;\n' +
+            '    Rd = Rs1 / a;\n'))
+
+        self.assertEqual(model.estimated_cycles, 3 + 1 + 20)
+        self.assertEqual(model.critical_path, 3)
+
+    def testCompoundAssignment(self):
+        model = Model(self.genModel('    Rd = Rs1;\n' +
+                                    '    Rd *= Rs2;\n' +
+                                    '    Rd += Rs2;\n'))
+
+        self.assertEqual(model.estimated_cycles, 4)
+        self.assertEqual(model.critical_path, 2)
+
+    def testBranches(self):
+        # the longer branch counts, its result is selected by the condition
+        model = Model(self.genModel('    if (Rs1 > Rs2)\n' +
+                                    '        Rd = Rs1 % Rs2;\n' +
+                                    '    else\n' +
+                                    '        Rd = Rs1 - Rs2;\n'))
+
+        self.assertEqual(model.estimated_cycles, 21)
+        self.assertEqual(model.critical_path, 2)
+
+    def testCustomRegister(self):
+        # the read depends on the preceding write of the same register
+        model = Model(self.genModel(
+            '    WRITE_CUSTOM_REG(0x800, Rs1 * Rs2);\n' +
+            '    Rd = READ_CUSTOM_REG(0x800) + READ_CUSTOM_REG(0x801);\n'))
+
+        self.assertEqual(model.estimated_cycles, 3 + 1 + 1 + 1)
+        self.assertEqual(model.critical_path, 4)
+
+    def testTiming(self):
+        filename = self.genModel('    Rd = Rs1 * Rs2;\n', cycles=7)
+
+        declared = Model(filename)
+        estimated = Model(filename, timing='estimated')
+
+        self.assertEqual(declared.cycles, 7)
+        self.assertEqual(estimated.cycles, 3)
+        self.assertEqual(estimated.declared_cycles, 7)
+        with self.assertRaises(ValueError):
+            Model(filename, timing='guessed')
+
+    def testFastFrontend(self):
+        # the fast front-end does not estimate, the declared value is used
+        model = Model(self.genModel('    Rd = Rs1 * Rs2;\n', cycles=7),
+                      fast=True, timing='estimated')
+
+        self.assertIsNone(model.estimated_cycles)
+        self.assertEqual(model.cycles, 7)
@@ -0,0 +1,191 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append('..')
+from modelparsing import libclang
+from modelparsing.exceptions import LibraryError
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestLibclang(unittest.TestCase):
+    '''
+    Tests for the discovery of libclang.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestLibclang, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        # forget about previous lookups
+        self.library = libclang._library
+        self.env = os.environ.pop(libclang.ENV_LIBRARY, None)
+        libclang._library = None
+
+        # the cache and library directories are created by the tests
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.cache = os.path.join(self.tempdir, 'cache', 'libclang')
+        self.lib = os.path.join(self.folderpath, 'libclang.so')
+        with open(self.lib, 'w') as fh:
+            fh.write('')
+
+    def tearDown(self):
+        libclang._library = self.library
+        os.environ.pop(libclang.ENV_LIBRARY, None)
+        if self.env is not None:
+            os.environ[libclang.ENV_LIBRARY] = self.env
+
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testEnvironment(self):
+        os.environ[libclang.ENV_LIBRARY] = self.lib
+
+        self.assertEqual(libclang.library(self.cache), self.lib)
+        # the override is not cached
+        self.assertFalse(os.path.exists(self.cache))
+
+    def testEnvironmentMissing(self):
+        os.environ[libclang.ENV_LIBRARY] = self.lib + '.missing'
+
+        with self.assertRaises(LibraryError):
+            libclang.library(self.cache)
+
+    def testCacheFile(self):
+        os.makedirs(os.path.dirname(self.cache))
+        with open(self.cache, 'w') as fh:
+            fh.write(self.lib + '\n')
+
+        self.assertEqual(libclang.library(self.cache), self.lib)
+
+    def testSearchCached(self):
+        # a stale cache entry triggers a new search
+        os.makedirs(os.path.dirname(self.cache))
+        with open(self.cache, 'w') as fh:
+            fh.write(self.lib + '.missing')
+
+        path = libclang.search()
+        if path is None:
+            with self.assertRaises(LibraryError):
+                libclang.library(self.cache)
+        else:
+            self.assertEqual(libclang.library(self.cache), path)
+            with open(self.cache, 'r') as fh:
+                self.assertEqual(fh.read(), path)
+
+    def testSearchExcluded(self):
+        # libclang-cpp matches the names, but is a different library
+        libdir = os.path.join(self.tempdir, 'lib')
+        os.makedirs(libdir)
+        with open(os.path.join(libdir, 'libclang-cpp.so.14'), 'w') as fh:
+            fh.write('')
+        self.assertIsNone(libclang.find(libdir))
+
+        # neither is a file, that cannot be loaded
+        with open(os.path.join(libdir, 'libclang-14.so.1'), 'w') as fh:
+            fh.write('')
+        self.assertIsNone(libclang.find(libdir))
+
+        if self.env is not None:
+            lib = os.path.join(libdir, 'libclang.so.1')
+            os.symlink(self.env, lib)
+            self.assertEqual(libclang.find(libdir), lib)
+
+    def testCacheExcluded(self):
+        os.makedirs(os.path.dirname(self.cache))
+        cpp = os.path.join(self.folderpath, 'libclang-cpp.so.14')
+        with open(cpp, 'w') as fh:
+            fh.write('')
+        with open(self.cache, 'w') as fh:
+            fh.write(cpp)
+
+        path = libclang.search()
+        if path is None:
+            with self.assertRaises(LibraryError):
+                libclang.library(self.cache)
+        else:
+            self.assertEqual(libclang.library(self.cache), path)
+
+    def testLazyImport(self):
+        # importing the parser does not load the bindings
+        p = subprocess.Popen(
+            [sys.executable, '-c',
+             'import sys; import modelparsing.parser; ' +
+             'sys.stdout.write(str("clang.cindex" in sys.modules))'],
+            cwd=os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                             '../..'),
+            stdout=subprocess.PIPE,
+            universal_newlines=True)
+        (out, _) = p.communicate()
+
+        self.assertEqual(out, 'False')
@@ -0,0 +1,173 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import json
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.instruction import Instruction
+from modelparsing.lockfile import LOCK_VERSION
+from modelparsing.lockfile import EncodingLock
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestEncodingLock(unittest.TestCase):
+    '''
+    Tests for the lockfile of the instruction encodings.
+    '''
+
+    class Model:
+        def __init__(self, name, funct3, cycles=1):
+            self.name = name
+            self.form = 'R'
+            self.opc = 0x02
+            self.funct3 = funct3
+            self.funct7 = 0x00
+            self.cycles = cycles
+
+    def __init__(self, *args, **kwargs):
+        super(TestEncodingLock, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.path = os.path.join(self.folderpath, 'encodings.lock')
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def instructions(self, models):
+        '''
+        Instructions, as riscv-opcodes would generate them.
+        '''
+        insts = []
+        for model in models:
+            match = (model.funct3 << 12) | (model.opc << 2) | 3
+            insts.append(Instruction(
+                model.cycles, model.form,
+                '#define MASK_{} 0xfe00707f\n'.format(model.name.upper()),
+                '#define MATCH_{} {}\n'.format(model.name.upper(),
+                                               hex(match)),
+                model.name))
+        return insts
+
+    def lock(self, models):
+        '''
+        Lock the models like a run of the parser and save the lockfile.
+        '''
+        lock = EncodingLock(self.path)
+        models = lock.order(models)
+        changes = lock.update(models, self.instructions(models))
+        with open(self.path, 'w') as fh:
+            fh.write(lock.dump())
+        return [model.name for model in models], changes
+
+    def testNewLock(self):
+        order, changes = self.lock([self.Model('b', 1), self.Model('a', 0)])
+        # without lockfile, the given order is kept
+        self.assertEqual(order, ['b', 'a'])
+        self.assertEqual(changes, (['b', 'a'], [], []))
+
+        lock = EncodingLock(self.path)
+        self.assertEqual(lock.entry('a'), {
+            'name': 'a', 'form': 'R', 'opc': 0x02, 'funct3': 0,
+            'funct7': 0, 'cycles': 1, 'mask': '0xfe00707f', 'match': '0xb'})
+
+    def testStableOrder(self):
+        self.lock([self.Model('b', 1), self.Model('c', 2)])
+        with open(self.path, 'r') as fh:
+            content = fh.read()
+
+        # the same models in another order
+        order, changes = self.lock([self.Model('c', 2), self.Model('b', 1)])
+        self.assertEqual(order, ['b', 'c'])
+        self.assertEqual(changes, ([], [], []))
+        with open(self.path, 'r') as fh:
+            self.assertEqual(fh.read(), content)
+
+    def testAddRemoveChange(self):
+        self.lock([self.Model('b', 1), self.Model('c', 2), self.Model('d', 3)])
+
+        # a is new, c is removed and the cycle count of d changed
+        order, changes = self.lock([self.Model('a', 0), self.Model('b', 1),
+                                    self.Model('d', 3, cycles=4)])
+        self.assertEqual(order, ['b', 'd', 'a'])
+        self.assertEqual(changes, (['a'], ['d'], ['c']))
+        self.assertEqual(EncodingLock(self.path).entry('d')['cycles'], 4)
+
+    def testOtherVersion(self):
+        with open(self.path, 'w') as fh:
+            json.dump({'version': LOCK_VERSION + 1,
+                       'instructions': [{'name': 'b'}]}, fh)
+        self.assertEqual(EncodingLock(self.path).entries, [])
+
+    def testCorruptLock(self):
+        with open(self.path, 'w') as fh:
+            fh.write('{')
+        order, _ = self.lock([self.Model('b', 1), self.Model('a', 0)])
+        self.assertEqual(order, ['b', 'a'])
@@ -0,0 +1,133 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import multiprocessing
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.exceptions import LockError
+from modelparsing.locking import FileLock
+from modelparsing.locking import locked
+from tst import folderpath
+sys.path.remove('..')
+
+
+def hold(path, ready, done):
+    # hold the lock in another process, until done is set
+    with FileLock(path):
+        ready.set()
+        done.wait(10)
+
+
+class TestLocking(unittest.TestCase):
+    '''
+    Tests for the locks of shared directories.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestLocking, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.shared = os.path.join(self.folderpath, 'toolchain')
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testLockOtherJob(self):
+        ready = multiprocessing.Event()
+        done = multiprocessing.Event()
+        job = multiprocessing.Process(target=hold,
+                                      args=(self.shared, ready, done))
+        job.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            with self.assertRaises(LockError):
+                FileLock(self.shared, timeout=0.2).acquire()
+        finally:
+            done.set()
+            job.join()
+
+        # released, once the other job finished
+        lock = FileLock(self.shared, timeout=1)
+        with lock:
+            self.assertTrue(lock.locked)
+        self.assertFalse(lock.locked)
+        # no lock file is left behind
+        self.assertEqual(os.listdir(self.shared), [])
+
+    def testLocked(self):
+        build = os.path.join(self.folderpath, 'build')
+        with locked([build, None, self.shared, build]) as locks:
+            self.assertEqual([lock.path for lock in locks],
+                             sorted([os.path.abspath(build),
+                                     os.path.abspath(self.shared)]))
+            self.assertTrue(all(lock.locked for lock in locks))
+            with self.assertRaises(LockError):
+                FileLock(build, timeout=0).acquire()
+        self.assertFalse(any(lock.locked for lock in locks))
@@ -36,7 +36,9 @@ from scripts.ccmodel import CCModel
 from mako.template import Template
 
 sys.path.append('..')
+from modelparsing.cache import ModelCache
 from modelparsing.exceptions import ConsistencyError
+from modelparsing.model import ModelFile
 from modelparsing.parser import Model
 from tst import folderpath
 sys.path.remove('..')
@@ -75,9 +77,13 @@ class TestModel(unittest.TestCase):
     def tearDown(self):
         # remove generated file
         if hasattr(self, '_outcome'):  # Python 3.4+
-            # these 2 methods have no side effects
-            result = self.defaultTestResult()
-            self._feedErrorsToResult(result, self._outcome.errors)
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
         else:
             # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
             result = getattr(self, '_outcomeForDoCleanups',
@@ -112,6 +118,25 @@ class TestModel(unittest.TestCase):
         with open(filename, 'w') as fh:
             fh.write(modelgen.render(model=self.ccmodel))
 
+    def genFamily(self, filename, annotation='opc=0x0a, funct3=0x2'):
+        '''
+        Create a cc file with two annotated instructions.
+        '''
+        with open(filename, 'w') as fh:
+            fh.write('#include <cstdint>\n\n' +
+                     'uint8_t opc = 0x02;\n' +
+                     'uint8_t funct7 = 0x01;\n' +
+                     'uint8_t cycles = 4;\n\n' +
+                     '__attribute__((annotate("instruction: funct3=0x1")))\n' +
+                     'void fadd(uint32_t &Rd, uint32_t Rs1, uint32_t Rs2)\n' +
+                     '{\n    Rd = Rs1 + Rs2;\n}\n\n' +
+                     'uint32_t helper(uint32_t x)\n' +
+                     '{\n    return x << 1;\n}\n\n' +
+                     '__attribute__((annotate("instruction: {}")))\n'.format(
+                         annotation) +
+                     'void fdbl(uint32_t &Rd, uint32_t Rs1, uint32_t imm)\n' +
+                     '{\n    Rd = helper(Rs1) + imm;\n}\n')
+
     def testRTypeModel(self):
         # map rtype.cc -- should be correct
         name = 'rtype'
@@ -343,3 +368,181 @@ class TestModel(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             Model(filename)
+
+    def testCachedModel(self):
+        name = 'cached'
+        filename = self.folderpath + name + '.cc'
+        cache = ModelCache(self.folderpath + 'cache')
+
+        self.genModel(name, filename)
+
+        # parse model, afterwards it's taken from the cache
+        model = Model(filename, cache=cache)
+        self.assertEqual(len(os.listdir(cache.cachedir)), 1)
+        cached = Model(filename, cache=cache)
+
+        self.assertEqual(cached.to_dict(), model.to_dict())
+        self.assertEqual(cached.name, self.ccmodel.name)
+        self.assertEqual(cached.definition,
+                         '{\n    // function definition\n}')
+
+    def testCachedInconsistentModel(self):
+        name = 'cachednord'
+        filename = self.folderpath + name + '.cc'
+        cache = ModelCache(self.folderpath + 'cache')
+
+        self.genModel(name, filename, faults=['nord'])
+
+        # consistency is checked for cached models as well
+        with self.assertRaises(ConsistencyError):
+            Model(filename, cache=cache)
+        self.assertEqual(len(os.listdir(cache.cachedir)), 1)
+        with self.assertRaises(ConsistencyError):
+            Model(filename, cache=cache)
+
+    def testHeaderIgnored(self):
+        # declarations in included headers must not be picked up
+        name = 'mainfile'
+        filename = self.folderpath + name + '.cc'
+        header = self.folderpath + name + '.hh'
+
+        self.genModel(name, filename)
+
+        with open(header, 'w') as fh:
+            fh.write('#include <cstdint>\n' +
+                     'uint8_t funct7 = 0x11;\n' +
+                     'void other(uint32_t Rd, uint32_t Rs1, uint32_t Rs2);\n')
+        with open(filename, 'r') as fh:
+            content = fh.read()
+        with open(filename, 'w') as fh:
+            fh.write(content.replace('#include <cstdint>',
+                                     '#include "{}.hh"'.format(name)))
+
+        model = Model(filename)
+
+        self.assertEqual(model.name, self.ccmodel.name)
+        self.assertEqual(model.form, self.ccmodel.ftype)
+        self.assertEqual(model.opc, self.ccmodel.opc)
+        # funct7 is only defined in the header
+        self.assertEqual(model.funct7, 0xff)
+
+    def testStrictModel(self):
+        # validate the model with g++
+        name = 'strict'
+        filename = self.folderpath + name + '.cc'
+
+        self.genModel(name, filename)
+
+        model = Model(filename, strict=True)
+
+        self.assertEqual(model.form, self.ccmodel.ftype)
+        self.assertEqual(model.name, self.ccmodel.name)
+        self.assertEqual(model.opc, self.ccmodel.opc)
+
+    def testWarningModel(self):
+        # warnings reported by libclang are treated as errors
+        name = 'warning'
+        filename = self.folderpath + name + '.cc'
+
+        self.genModel(name, filename)
+
+        with open(filename, 'r') as fh:
+            content = fh.read()
+        with open(filename, 'w') as fh:
+            fh.write(content.replace('// function definition',
+                                     'uint32_t unused;'))
+
+        with self.assertRaises(ConsistencyError):
+            Model(filename)
+        with self.assertRaises(ConsistencyError):
+            Model(filename, strict=True)
+
+    def testModelFamily(self):
+        # every annotated function of the file is an instruction
+        filename = self.folderpath + 'family.cc'
+
+        self.genFamily(filename)
+
+        models = ModelFile(filename).models()
+
+        self.assertEqual([model.name for model in models], ['fadd', 'fdbl'])
+        self.assertEqual(models[0].form, 'R')
+        self.assertEqual(models[0].opc, 0x02)
+        self.assertEqual(models[0].funct3, 0x1)
+        self.assertEqual(models[0].funct7, 0x01)
+        self.assertEqual(models[0].definition, '{\n    Rd = Rs1 + Rs2;\n}')
+        self.assertEqual(models[1].form, 'I')
+        self.assertEqual(models[1].opc, 0x0a)
+        self.assertEqual(models[1].funct3, 0x2)
+        # values missing in the annotation are taken from the file
+        self.assertEqual(models[1].cycles, 4)
+
+        # Model uses the first instruction
+        self.assertEqual(Model(filename).to_dict(), models[0].to_dict())
+
+    def testCachedModelFamily(self):
+        filename = self.folderpath + 'family.cc'
+        cache = ModelCache(self.folderpath + 'cache')
+
+        self.genFamily(filename)
+
+        models = ModelFile(filename, cache=cache).models()
+        self.assertEqual(len(os.listdir(cache.cachedir)), 1)
+        cached = ModelFile(filename, cache=cache).models()
+
+        self.assertEqual([model.to_dict() for model in cached],
+                         [model.to_dict() for model in models])
+
+    def testInvalidAnnotation(self):
+        filename = self.folderpath + 'family.cc'
+
+        self.genFamily(filename, annotation='opcode=0x0a')
+
+        with self.assertRaises(ConsistencyError):
+            ModelFile(filename)
+
+    def testCustomRegisters(self):
+        # record the custom registers accessed by a model
+        filename = self.folderpath + 'mac.cc'
+        header = self.folderpath + 'registers.hh'
+
+        with open(header, 'w') as fh:
+            fh.write('#include <cstdint>\n' +
+                     '#define c0 0x800\n' +
+                     '#define c1 0x801\n' +
+                     'uint32_t READ_CUSTOM_REG(uint32_t reg);\n' +
+                     'void WRITE_CUSTOM_REG(uint32_t reg, uint32_t val);\n')
+        with open(filename, 'w') as fh:
+            fh.write('#include "registers.hh"\n' +
+                     'uint8_t opc = 0x02;\n' +
+                     'uint8_t funct3 = 0x0;\n' +
+                     'uint8_t funct7 = 0x0;\n' +
+                     'void mac(uint32_t Rd, uint32_t Rs1, uint32_t Rs2)\n' +
+                     '{\n' +
+                     '    uint32_t var = READ_CUSTOM_REG(c0) + Rs1 * Rs2;\n' +
+                     '    WRITE_CUSTOM_REG(c1, var);\n' +
+                     '    WRITE_CUSTOM_REG(Rs2, var);\n' +
+                     '    Rd = var;\n' +
+                     '}\n')
+
+        model = Model(filename)
+
+        self.assertFalse(model.pure)
+        self.assertEqual(model.reads, ('c0',))
+        # the register given by Rs2 is only known at run time
+        self.assertEqual(model.writes, ('*', 'c1'))
+
+    def testPureModel(self):
+        name = 'pure'
+        filename = self.folderpath + name + '.cc'
+
+        self.genModel(name, filename)
+
+        model = Model(filename)
+
+        self.assertTrue(model.pure)
+        self.assertEqual(model.reads, ())
+        self.assertEqual(model.writes, ())
+        # reading and writing custom registers
+        self.assertEqual(Model(read=True).reads, ('*',))
+        self.assertEqual(Model(write=True).writes, ('*',))
@@ -0,0 +1,167 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append('..')
+from modelparsing.exceptions import StageError
+from modelparsing.orchestrator import Orchestrator
+from modelparsing.writer import FileWriter
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestOrchestrator(unittest.TestCase):
+    '''
+    Tests for running stages concurrently.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestOrchestrator, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.orchestrator = Orchestrator()
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testConcurrent(self):
+        barrier = threading.Event()
+        done = []
+
+        def first():
+            # only returns, if the second stage runs at the same time
+            self.assertTrue(barrier.wait(5))
+            done.append('first')
+
+        def second():
+            barrier.set()
+            done.append('second')
+
+        self.orchestrator.add('first', first)
+        self.orchestrator.add('second', second)
+        self.orchestrator.run()
+        self.assertEqual(sorted(done), ['first', 'second'])
+
+    def testCriticalPath(self):
+        for name in ('compiler', 'gem5'):
+            self.orchestrator.add(name, lambda: time.sleep(0.2))
+        start = time.time()
+        self.orchestrator.run()
+        # the slowest stage, not the sum of the stages
+        self.assertLess(time.time() - start, 0.35)
+
+    def testStageErrors(self):
+        done = []
+
+        def fail(message):
+            raise ValueError(message)
+
+        self.orchestrator.add('compiler', lambda: fail('compiler failed'))
+        self.orchestrator.add('gem5', lambda: done.append('gem5'))
+        self.orchestrator.add('timings', lambda: fail('timings failed'))
+        with self.assertRaises(StageError) as cm:
+            self.orchestrator.run()
+
+        # every stage ran, the errors are collected
+        self.assertEqual(done, ['gem5'])
+        self.assertEqual([stage for stage, _ in cm.exception.errors],
+                         ['compiler', 'timings'])
+        self.assertIn('compiler failed', str(cm.exception))
+
+    def testTimeline(self):
+        self.orchestrator.add('compiler', lambda: None)
+        self.orchestrator.add('gem5', lambda: None)
+        self.assertIn('pending', self.orchestrator.timeline())
+        self.orchestrator.run()
+
+        lines = self.orchestrator.timeline().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1].split()[0], 'compiler')
+        self.assertEqual(lines[2].split()[-1], 'ok')
+        self.assertTrue(lines[3].startswith('total'))
+
+    def testSharedWriter(self):
+        writer = FileWriter(os.path.join(self.folderpath, 'outputs.json'),
+                            defer=True)
+
+        def generate(name):
+            for i in range(50):
+                writer.write(os.path.join(self.folderpath, name, str(i)),
+                             name)
+                if i % 10 == 0:
+                    writer.flush()
+
+        for name in ('compiler', 'gem5'):
+            self.orchestrator.add(name, lambda name=name: generate(name))
+        self.orchestrator.run()
+        writer.flush()
+        self.assertEqual(len(writer.applied), 100)
@@ -37,6 +37,7 @@ from mako.template import Template
 
 sys.path.append('..')
 from modelparsing.exceptions import ConsistencyError
+from modelparsing.exceptions import ParseError
 from modelparsing.parser import Parser
 from tst import folderpath
 sys.path.remove('..')
@@ -110,9 +111,13 @@ class TestParser(unittest.TestCase):
     def tearDown(self):
         # remove generated file
         if hasattr(self, '_outcome'):  # Python 3.4+
-            # these 2 methods have no side effects
-            result = self.defaultTestResult()
-            self._feedErrorsToResult(result, self._outcome.errors)
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
         else:
             # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
             result = getattr(self, '_outcomeForDoCleanups',
@@ -146,3 +151,23 @@ class TestParser(unittest.TestCase):
 
         with open(filename, 'w') as fh:
             fh.write(modelgen.render(model=self.ccmodel))
+
+    def testParseFilesSerial(self):
+        parser = Parser(None, self.folderpath, cache=False, pch=False,
+                        store=False,
+                        buildpath=os.path.join(self.folderpath, 'build'))
+        # both models lack their opcode
+        pathnames = []
+        for name in ('first', 'second'):
+            pathname = os.path.join(self.folderpath, name + '.cc')
+            with open(pathname, 'w') as fh:
+                fh.write('#include <cstdint>\n\n'
+                         'void {}(uint32_t Rd) {{ Rd = 0; }}\n'.format(name))
+            pathnames.append(pathname)
+
+        # with a single job, all errors are collected, too
+        with self.assertRaises(ParseError) as cm:
+            parser.parse_files(pathnames)
+        self.assertEqual([f for f, _ in cm.exception.errors], pathnames)
+        for _, error in cm.exception.errors:
+            self.assertIsInstance(error, ConsistencyError)
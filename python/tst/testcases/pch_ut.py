@@ -0,0 +1,153 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import time
+import unittest
+
+from scripts import model_gen
+from scripts.ccmodel import CCModel
+from mako.template import Template
+
+sys.path.append('..')
+from modelparsing.model import Model
+from modelparsing.pch import PrecompiledHeader
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestPrecompiledHeader(unittest.TestCase):
+    '''
+    Tests for the precompiled header of shared model includes.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestPrecompiledHeader, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.regs = os.path.join(self.folderpath, 'registers.hh')
+        with open(self.regs, 'w') as fh:
+            fh.write('#include <cstdint>\n' +
+                     '#define c0 0x800\n' +
+                     'uint32_t READ_CUSTOM_REG(uint32_t reg);\n')
+
+        self.pch = PrecompiledHeader(os.path.join(self.folderpath, 'pch'),
+                                     ['<cstdint>', self.regs])
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testUmbrella(self):
+        self.assertEqual(self.pch.umbrella(),
+                         '#include <cstdint>\n' +
+                         '#include "{}"\n'.format(os.path.abspath(self.regs)))
+
+    def testDigestHeaderChanged(self):
+        digest = self.pch.digest()
+        self.assertEqual(digest, self.pch.digest())
+
+        with open(self.regs, 'a') as fh:
+            fh.write('#define c1 0xcc0\n')
+
+        self.assertNotEqual(digest, self.pch.digest())
+
+    def testBuild(self):
+        self.assertTrue(self.pch.build())
+        self.assertTrue(os.path.exists(self.pch.path))
+
+        # an up to date header is not built again
+        mtime = os.stat(self.pch.path).st_mtime
+        time.sleep(0.01)
+        self.assertTrue(self.pch.build())
+        self.assertEqual(mtime, os.stat(self.pch.path).st_mtime)
+
+    def testBuildReadonly(self):
+        pchdir = os.path.join(self.folderpath, 'pch')
+        readonly = PrecompiledHeader(pchdir, ['<cstdint>', self.regs],
+                                     readonly=True)
+        self.assertFalse(readonly.build())
+        self.assertFalse(os.path.exists(pchdir))
+
+        # an up to date header is used
+        self.assertTrue(self.pch.build())
+        readonly = PrecompiledHeader(pchdir, ['<cstdint>', self.regs],
+                                     readonly=True)
+        self.assertTrue(readonly.build())
+
+    def testModelWithPch(self):
+        filename = os.path.join(self.folderpath, 'pchmodel.cc')
+        ccmodel = CCModel('pchmodel', 'R', 'uint32_t', 0x02, 0x00, 0x01, [])
+        with open(filename, 'w') as fh:
+            fh.write(Template(filename=model_gen).render(model=ccmodel))
+
+        self.assertTrue(self.pch.build())
+        model = Model(filename, pch=self.pch)
+
+        self.assertEqual(model.name, ccmodel.name)
+        self.assertEqual(model.form, ccmodel.ftype)
+        self.assertEqual(model.funct7, ccmodel.funct7)
@@ -0,0 +1,220 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import json
+import os
+import shutil
+import sys
+import threading
+import unittest
+
+sys.path.append('..')
+from modelparsing import profiling
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestProfiling(unittest.TestCase):
+    '''
+    Tests for the stage-level profiling.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestProfiling, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.profiler = profiling.enable()
+
+    def tearDown(self):
+        profiling.disable()
+
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testNestedSpans(self):
+        with profiling.span('outer'):
+            with profiling.span('inner', 'io', file='a.h'):
+                pass
+
+        spans = self.profiler.spans
+        # spans are recorded, when they are closed
+        self.assertEqual([span['name'] for span in spans],
+                         ['inner', 'outer'])
+        inner, outer = spans
+        self.assertEqual(inner['cat'], 'io')
+        self.assertEqual(inner['args'], {'file': 'a.h'})
+        self.assertLessEqual(outer['start'], inner['start'])
+        self.assertGreaterEqual(outer['wall'], inner['wall'])
+        self.assertGreater(outer['rss'], 0)
+
+    def testDisabled(self):
+        profiling.disable()
+        self.assertIsNone(profiling.profiler())
+        with profiling.span('ignored'):
+            pass
+        self.assertEqual(self.profiler.spans, [])
+
+    def testProfiled(self):
+        @profiling.profiled('double')
+        def double(value):
+            return 2 * value
+
+        self.assertEqual(double(2), 4)
+        self.assertEqual(double(3), 6)
+        self.assertEqual([span['name'] for span in self.profiler.spans],
+                         ['double', 'double'])
+
+    def testTrace(self):
+        with profiling.span('parse models'):
+            with profiling.span('isa_parser', 'subprocess'):
+                pass
+
+        path = os.path.join(self.folderpath, 'trace.json')
+        self.profiler.write_trace(path)
+        with open(path, 'r') as fh:
+            trace = json.load(fh)
+
+        events = trace['traceEvents']
+        self.assertEqual([event['name'] for event in events],
+                         ['parse models', 'isa_parser'])
+        for event in events:
+            self.assertEqual(event['ph'], 'X')
+            for key in ('ts', 'dur', 'pid', 'tid', 'cat'):
+                self.assertIn(key, event)
+            self.assertIn('cpu_ms', event['args'])
+            self.assertIn('peak_rss_kb', event['args'])
+
+    def testSummary(self):
+        for _ in range(3):
+            with profiling.span('model', 'model'):
+                pass
+        with profiling.span('extend gem5'):
+            pass
+
+        lines = self.profiler.summary().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('wall ms', lines[0])
+        row = [line.split() for line in lines if ' model ' in line][0]
+        self.assertEqual(row[:3], ['model', 'model', '3'])
+
+    def testMerge(self):
+        mark = self.profiler.mark()
+        with profiling.span('model', 'model'):
+            pass
+        spans = self.profiler.collect(mark)
+        self.assertEqual(len(spans), 1)
+
+        # e.g. spans returned by a worker process
+        other = profiling.Profiler()
+        other.merge(spans)
+        self.assertEqual(other.spans, spans)
+
+    def testCProfile(self):
+        cprofile = os.path.join(self.folderpath, 'profile')
+        self.profiler = profiling.enable(cprofile)
+        with profiling.span('extend compiler'):
+            # nested stages are part of the outer profile
+            with profiling.span('restore'):
+                pass
+
+        self.assertEqual(os.listdir(cprofile), ['extend_compiler.prof'])
+
+    def testThreadSpans(self):
+        cprofile = os.path.join(self.folderpath, 'profile')
+        self.profiler = profiling.enable(cprofile)
+        started = threading.Event()
+        done = threading.Event()
+
+        def compiler():
+            with profiling.span('extend compiler'):
+                started.set()
+                done.wait()
+
+        def gem5():
+            started.wait()
+            with profiling.span('extend gem5'):
+                with profiling.span('gen decoder'):
+                    pass
+            done.set()
+
+        threads = [threading.Thread(target=compiler),
+                   threading.Thread(target=gem5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # the stages of both threads are recorded and, if the version of
+        # Python allows it, profiled
+        tids = dict((span['name'], span['tid'])
+                    for span in self.profiler.spans)
+        self.assertEqual(sorted(tids), ['extend compiler', 'extend gem5',
+                                        'gen decoder'])
+        self.assertEqual(tids['extend gem5'], tids['gen decoder'])
+        self.assertNotEqual(tids['extend compiler'], tids['extend gem5'])
+        profiles = ['extend_compiler.prof', 'extend_gem5.prof']
+        if sys.version_info >= (3, 12):
+            profiles = profiles[:1]
+        self.assertEqual(sorted(os.listdir(cprofile)), profiles)
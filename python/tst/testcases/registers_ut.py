@@ -95,9 +95,13 @@ class TestRegisters(unittest.TestCase):
     def tearDown(self):
         # remove generated file
         if hasattr(self, '_outcome'):  # Python 3.4+
-            # these 2 methods have no side effects
-            result = self.defaultTestResult()
-            self._feedErrorsToResult(result, self._outcome.errors)
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
         else:
             # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
             result = getattr(self, '_outcomeForDoCleanups',
@@ -126,4 +130,4 @@ class TestRegisters(unittest.TestCase):
         regs = Registers(self.regfile)
         expect = {'reg_0': 0x70000000, '__REG__1': 0x7000000c}
 
-        self.assertEquals(expect, regs.regmap)
+        self.assertEqual(expect, regs.regmap)
@@ -0,0 +1,278 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append('..')
+from modelparsing.parser import Parser
+from modelparsing.store import ArtifactStore
+from tst import folderpath
+sys.path.remove('..')
+
+EXTENSIONS = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                          '../../../extensions')
+
+
+class TestStore(unittest.TestCase):
+    '''
+    Tests for the store of generated files.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestStore, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.store = ArtifactStore(os.path.join(self.folderpath, 'store'))
+        self.files = [os.path.join(self.folderpath, 'out', name)
+                      for name in ['decoder.cc', 'sub/decoder.hh']]
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def generate(self, content, mtime):
+        # generated files are replaced, like the FileWriter does
+        for path in self.files:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path + '.tmp', 'w') as fh:
+                fh.write(content + path)
+            os.rename(path + '.tmp', path)
+            os.utime(path, (mtime, mtime))
+
+    def read(self):
+        contents = []
+        for path in self.files:
+            with open(path, 'r') as fh:
+                contents.append(fh.read())
+        return contents
+
+    def testStoreSwitch(self):
+        a = self.store.key('decoder', 'a')
+        b = self.store.key('decoder', 'b')
+        self.assertNotEqual(a, b)
+        self.assertIsNone(self.store.activate(a))
+
+        self.generate('a', 1000000000)
+        self.store.put(a, self.files)
+        contents = self.read()
+        self.generate('b', 1100000000)
+        self.store.put(b, self.files)
+        self.assertTrue(self.store.contains(a))
+
+        # the files of a are back, with their modification time
+        self.assertEqual(self.store.activate(a), sorted(self.files))
+        self.assertEqual(self.read(), contents)
+        self.assertEqual([os.stat(path).st_mtime for path in self.files],
+                         [1000000000] * 2)
+
+        # files, that are in place, are not touched
+        self.assertEqual(self.store.activate(a), [])
+
+        # the stored content is not changed by generating again
+        self.generate('c', 1200000000)
+        self.assertEqual(self.store.activate(a), sorted(self.files))
+        self.assertEqual(self.read(), contents)
+
+    def testStoreTouch(self):
+        key = self.store.key('opcodes', 'a')
+        self.generate('a', 1000000000)
+        self.store.put(key, self.files)
+        self.generate('b', 1100000000)
+        start = time.time() - 1
+        self.assertEqual(self.store.activate(key, touch=True),
+                         sorted(self.files))
+        self.assertTrue(all(os.stat(path).st_mtime >= start
+                            for path in self.files))
+
+    def testStoreCorrupted(self):
+        key = self.store.key('decoder', 'a')
+        self.generate('a', 1000000000)
+        self.store.put(key, self.files)
+
+        # a generated file, that was edited in place, changed the object
+        with open(self.files[0], 'a') as fh:
+            fh.write('edited')
+        self.generate('b', 1100000000)
+        self.assertIsNone(self.store.activate(key))
+        self.assertTrue(self.read()[0].startswith('b'))
+
+    def testStoreFiles(self):
+        top = self.tempdir()
+        parser = Parser(None, self.folderpath, store=self.store,
+                        buildpath=os.path.join(top, 'build'))
+        generated = os.path.join(top, 'build/generated')
+        os.makedirs(os.path.join(generated, 'sub'))
+        for name in ['decoder.cc', 'sub/decoder.hh', 'regsintr.hh']:
+            open(os.path.join(generated, name), 'w').close()
+
+        # the decoder does not include the register intrinsics
+        self.assertEqual(parser.files('decoder'),
+                         [os.path.join(os.path.abspath(generated), name)
+                          for name in ['decoder.cc', 'sub/decoder.hh']])
+        self.assertEqual(parser.files('regsintr'),
+                         [os.path.join(os.path.abspath(generated),
+                                       'regsintr.hh')])
+
+    def tempdir(self):
+        '''
+        Create a directory, that is removed after the test.
+        '''
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        return path
+
+    def toolchain(self):
+        '''
+        Create the files of the toolchain, that are extended.
+        '''
+        top = self.tempdir()
+        tc = os.path.join(top, 'toolchain')
+        inst = os.path.join(top, 'inst/riscv')
+        os.makedirs(os.path.join(tc, 'riscv-binutils-gdb/include/opcode'))
+        os.makedirs(os.path.join(tc, 'riscv-binutils-gdb/opcodes'))
+        os.makedirs(os.path.join(
+            inst, 'lib/gcc/riscv32-unknown-elf/7.2.0/include'))
+        with open(os.path.join(tc, 'Makefile'), 'w') as fh:
+            fh.write('INSTALL_DIR := {}\n'.format(inst))
+        with open(os.path.join(
+                tc, 'riscv-binutils-gdb/include/opcode/riscv-opc.h'),
+                'w') as fh:
+            fh.write('#ifndef RISCV_ENCODING_H\n' +
+                     '#define RISCV_ENCODING_H\n')
+        with open(os.path.join(tc, 'riscv-binutils-gdb/opcodes/riscv-opc.c'),
+                  'w') as fh:
+            fh.write('{\n' +
+                     '{ test },\n' +
+                     '\n' +
+                     '/* Terminate the list.  */\n' +
+                     '{0, 0, 0, 0, 0, 0, 0}\n' +
+                     '};')
+        return tc
+
+    def testStoreRestore(self):
+        tc = self.toolchain()
+        top = self.tempdir()
+        models = os.path.join(top, 'models')
+        shutil.copytree(EXTENSIONS, models)
+        build = os.path.join(top, 'build')
+
+        def parser():
+            parser = Parser(tc, models, cache=False, pch=False,
+                            store=self.store, buildpath=build)
+            parser.parse_models()
+            return parser
+
+        first = parser()
+        opch, opcc = first.compiler.opch, first.compiler.opcc
+        with open(opch, 'r') as fh:
+            header = fh.read()
+        with open(opcc, 'r') as fh:
+            source = fh.read()
+
+        first.extend_compiler()
+        first.restore()
+
+        # the opcodes are activated from the store, with the backups of
+        # the original files, that are restored again
+        second = parser()
+        second.extend_compiler()
+        self.assertIn(('activate', opcc), second.changes())
+        self.assertTrue(os.path.exists(opch + '_old'))
+        self.assertTrue(os.path.exists(opcc + '_old'))
+        second.restore()
+        with open(opch, 'r') as fh:
+            self.assertEqual(fh.read(), header)
+        with open(opcc, 'r') as fh:
+            self.assertEqual(fh.read(), source)
+        self.assertFalse(os.path.exists(opch + '_old'))
+        self.assertFalse(os.path.exists(opcc + '_old'))
+
+    def testRestoreWithoutGem5(self):
+        tc = self.toolchain()
+        top = self.tempdir()
+        models = os.path.join(top, 'models')
+        shutil.copytree(EXTENSIONS, models)
+        parser = Parser(tc, models, cache=False, pch=False,
+                        store=self.store, buildpath=os.path.join(top, 'build'))
+        parser.parse_models()
+        opcc = parser.compiler.opcc
+        with open(opcc, 'r') as fh:
+            source = fh.read()
+        parser.extend_compiler()
+
+        # the toolchain is restored, before the missing decoder fails
+        parser.decoder._isa_decoder = os.path.join(self.folderpath,
+                                                   'rv32.isa')
+        with self.assertRaises(AssertionError):
+            parser.restore()
+        with open(opcc, 'r') as fh:
+            self.assertEqual(fh.read(), source)
+        self.assertFalse(os.path.exists(opcc + '_old'))
@@ -0,0 +1,146 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append('..')
+from modelparsing import templating
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestTemplating(unittest.TestCase):
+    '''
+    Tests for the lookup of the compiled templates.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestTemplating, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        # a lookup, that caches the compiled templates in the test folder
+        self.cachehome = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.abspath(self.folderpath)
+        self.lookup = templating._lookup
+        templating._lookup = None
+
+    def tearDown(self):
+        templating._lookup = self.lookup
+        if self.cachehome is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.cachehome
+
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testTemplates(self):
+        names = sorted(os.listdir(templating.TEMPLATES))
+        self.assertEqual(names, ['custom.isa.mako',
+                                 'decoder-patch.isa.mako',
+                                 'minor_custom_timings.py.mako',
+                                 'opcodes-custom.mako',
+                                 'regsintr.hh.mako',
+                                 'riscvintr.h.mako'])
+        for name in names:
+            templating.template(name)
+
+        # compiled on first use and kept on disk
+        modules = templating.moduledir()
+        self.assertTrue(modules.startswith(os.path.abspath(self.folderpath)))
+        self.assertEqual(sorted(name for name in os.listdir(modules)
+                                if name.endswith('.mako.py')),
+                         [name + '.py' for name in names])
+
+    def testRender(self):
+        regsintr = templating.template('regsintr.hh.mako')
+        self.assertIs(templating.template('regsintr.hh.mako'), regsintr)
+        content = regsintr.render(regmap={'c1': 0x801, 'c0': 0x800})
+        self.assertIn('#define c0 0x800\n#define c1 0x801\n', content)
+
+        # a new process loads the compiled module instead of compiling
+        templating._lookup = None
+        self.assertEqual(templating.template('regsintr.hh.mako').render(
+            regmap={'c0': 0x800, 'c1': 0x801}), content)
+
+    def testModuleDir(self):
+        # templates of another checkout or version are compiled into
+        # another directory
+        top = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, top)
+        other = os.path.join(top, 'templates')
+        shutil.copytree(templating.TEMPLATES, other)
+        modules = templating.moduledir()
+        self.assertEqual(templating.moduledir(), modules)
+        self.assertNotEqual(templating.moduledir(other), modules)
+        copied = templating.moduledir(other)
+
+        with open(os.path.join(other, 'regsintr.hh.mako'), 'a') as fh:
+            fh.write('// edited\n')
+        self.assertNotIn(templating.moduledir(other), [modules, copied])
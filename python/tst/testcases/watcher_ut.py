@@ -0,0 +1,156 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.append('..')
+from modelparsing.watcher import Watcher
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestWatcher(unittest.TestCase):
+    '''
+    Tests for watching the model path.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestWatcher, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.top = os.path.join(self.folderpath, 'extensions')
+        os.mkdir(self.top)
+        self.model = os.path.join(self.top, 'model.cc')
+        self.write(self.model, 'int a;')
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def write(self, path, content):
+        with open(path, 'w') as fh:
+            fh.write(content)
+
+    def watchers(self):
+        '''
+        A polling watcher and the inotify one, if inotify is available.
+        Each is created, once the previous one is done.
+        '''
+        for poll in (True, False):
+            watcher = Watcher(self.top, debounce=0.05, interval=0.05,
+                              poll=poll)
+            if watcher.backend == 'poll' and not poll:
+                watcher.close()
+                break
+            yield watcher
+
+    def testChangedModel(self):
+        for watcher in self.watchers():
+            self.write(self.model, 'int changed_{};'.format(
+                watcher.backend))
+            self.assertEqual(watcher.wait(1), [self.model])
+            watcher.close()
+
+    def testDebounce(self):
+        header = os.path.join(self.top, 'registers.hh')
+        for watcher in self.watchers():
+            # a burst of edits is reported at once
+            self.write(header, '// {}'.format(watcher.backend))
+            self.write(self.model, 'int burst_{};'.format(watcher.backend))
+            self.assertEqual(watcher.wait(1), sorted([header, self.model]))
+            watcher.close()
+
+    def testIgnored(self):
+        for watcher in self.watchers():
+            self.write(os.path.join(self.top, 'notes.txt'), watcher.backend)
+            self.assertEqual(watcher.wait(0.2), [])
+            watcher.close()
+
+    def testNewDirectory(self):
+        for watcher in self.watchers():
+            subdir = os.path.join(self.top, watcher.backend)
+            os.mkdir(subdir)
+            model = os.path.join(subdir, 'model.cc')
+            self.write(model, 'int a;')
+            self.assertEqual(watcher.wait(1), [model])
+
+            # the new directory is watched from now on
+            self.write(model, 'int changed;')
+            self.assertEqual(watcher.wait(1), [model])
+            watcher.close()
+
+    def testSingleFile(self):
+        other = os.path.join(self.top, 'other.cc')
+        for poll in (True, False):
+            watcher = Watcher(self.model, debounce=0.05, interval=0.05,
+                              poll=poll)
+            # other models do not matter, only the file and headers
+            self.write(other, 'int b{};'.format(poll))
+            self.write(self.model, 'int a{};'.format(poll))
+            self.assertEqual(watcher.wait(1), [self.model])
+            watcher.close()
@@ -0,0 +1,204 @@
+# Copyright (c) 2018 TU Dresden
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# Authors: Robert Scheffel
+
+import json
+import os
+import shutil
+import stat
+import sys
+import threading
+import unittest
+
+sys.path.append('..')
+from modelparsing.writer import FileWriter
+from tst import folderpath
+sys.path.remove('..')
+
+
+class TestFileWriter(unittest.TestCase):
+    '''
+    Tests for writing generated files, only if they change.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(TestFileWriter, self).__init__(*args, **kwargs)
+        # create temp folder
+        if not os.path.isdir(folderpath):
+            os.mkdir(folderpath)
+        # test specific folder in temp folder
+        test = self._testMethodName + '/'
+        self.folderpath = os.path.join(folderpath, test)
+        if not os.path.isdir(self.folderpath):
+            os.mkdir(self.folderpath)
+
+    def __del__(self):
+        if os.path.isdir(folderpath) and not os.listdir(folderpath):
+            try:
+                os.rmdir(folderpath)
+            except OSError:
+                pass
+
+    def setUp(self):
+        self.manifest = os.path.join(self.folderpath, 'outputs.json')
+        self.file = os.path.abspath(
+            os.path.join(self.folderpath, 'generated/file.h'))
+
+    def tearDown(self):
+        # remove generated file
+        if hasattr(self, '_outcome'):  # Python 3.4+
+            if hasattr(self, '_feedErrorsToResult'):
+                # these 2 methods have no side effects
+                result = self.defaultTestResult()
+                self._feedErrorsToResult(result, self._outcome.errors)
+            else:
+                # Python 3.11+ adds the errors to the result directly
+                result = self._outcome.result
+        else:
+            # Python 3.2 - 3.3 or 3.0 - 3.1 and 2.7
+            result = getattr(self, '_outcomeForDoCleanups',
+                             self._resultForDoCleanups)
+
+        error = ''
+        if result.errors and result.errors[-1][0] is self:
+            error = result.errors[-1][1]
+
+        failure = ''
+        if result.failures and result.failures[-1][0] is self:
+            failure = result.failures[-1][1]
+
+        if not error and not failure:
+            shutil.rmtree(self.folderpath)
+
+    def testWriteIfChanged(self):
+        writer = FileWriter(self.manifest, defer=True)
+        writer.write(self.file, 'content')
+        self.assertEqual(writer.flush(), [('create', self.file)])
+
+        # back date the file, to detect a rewrite
+        os.utime(self.file, (0, 0))
+        writer = FileWriter(self.manifest)
+        writer.write(self.file, 'content')
+        self.assertEqual(writer.applied, [])
+        self.assertEqual(os.stat(self.file).st_mtime, 0)
+
+        # without defer, files are written immediately
+        writer.write(self.file, 'changed')
+        self.assertEqual(writer.applied, [('update', self.file)])
+        with open(self.file, 'r') as fh:
+            self.assertEqual(fh.read(), 'changed')
+
+    def testRestoreAndGenerate(self):
+        # a file, that is restored and generated again, is not touched
+        writer = FileWriter(self.manifest, defer=True)
+        writer.write(self.file, 'extended')
+        writer.write(self.file + '_old', 'original')
+        writer.flush()
+        os.utime(self.file, (0, 0))
+
+        writer.write(self.file, writer.read(self.file + '_old'))
+        writer.remove(self.file + '_old')
+        self.assertFalse(writer.exists(self.file + '_old'))
+        writer.write(self.file + '_old', writer.read(self.file))
+        writer.write(self.file, 'extended')
+
+        self.assertEqual(writer.flush(), [])
+        self.assertEqual(os.stat(self.file).st_mtime, 0)
+
+    def testRemove(self):
+        writer = FileWriter(self.manifest)
+        writer.write(self.file, 'content')
+        writer.flush()
+
+        writer.remove(self.file)
+        writer.remove(self.file + '_missing')
+        self.assertEqual(writer.applied, [('create', self.file),
+                                          ('remove', self.file)])
+        self.assertFalse(os.path.exists(self.file))
+
+    def testPlan(self):
+        writer = FileWriter(self.manifest)
+        writer.write(self.file, 'content')
+        writer.flush()
+
+        plan = FileWriter(self.manifest, plan=True)
+        plan.write(self.file, 'changed')
+        plan.write(self.file + '.new', 'new')
+        self.assertEqual(plan.flush(), [])
+        self.assertEqual(plan.changes(), [('update', self.file),
+                                          ('create', self.file + '.new')])
+        # nothing was touched
+        with open(self.file, 'r') as fh:
+            self.assertEqual(fh.read(), 'content')
+        self.assertFalse(os.path.exists(self.file + '.new'))
+
+    def testManifest(self):
+        writer = FileWriter(self.manifest)
+        writer.write(self.file, 'content')
+        writer.flush()
+
+        with open(self.manifest, 'r') as fh:
+            manifest = json.load(fh)
+        self.assertEqual(list(manifest), [self.file])
+        self.assertEqual(len(manifest[self.file]['sha1']), 40)
+
+    def testPermissionsKept(self):
+        writer = FileWriter(self.manifest)
+        writer.write(self.file, 'content')
+        writer.flush()
+        os.chmod(self.file, 0o755)
+
+        writer.write(self.file, 'changed')
+        writer.flush()
+        self.assertEqual(stat.S_IMODE(os.stat(self.file).st_mode), 0o755)
+
+    def testFlushOwnThread(self):
+        # a thread only flushes the files it staged itself
+        writer = FileWriter(self.manifest, defer=True)
+        staged = threading.Event()
+        done = threading.Event()
+
+        def generate():
+            writer.write(self.file + '.other', 'half')
+            staged.set()
+            done.wait()
+            writer.write(self.file + '.other', 'finished')
+
+        thread = threading.Thread(target=generate)
+        thread.start()
+        staged.wait()
+        writer.write(self.file, 'content')
+        self.assertEqual(writer.flush(), [('create', self.file)])
+        self.assertFalse(os.path.exists(self.file + '.other'))
+        self.assertEqual(writer.read(self.file + '.other'), 'half')
+
+        # the changes of a finished thread are flushed by any thread
+        done.set()
+        thread.join()
+        self.assertEqual(writer.flush(), [('create', self.file + '.other')])
+        with open(self.file + '.other', 'r') as fh:
+            self.assertEqual(fh.read(), 'finished')